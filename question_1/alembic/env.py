@@ -5,7 +5,9 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel
 
 from alembic import context
+from apps.accounts.models import *
 from apps.payments.models import *
+from apps.transactions.models import *
 from config.settings import get_settings
 
 # this is the Alembic Config object, which provides
@@ -25,7 +27,7 @@ if config.config_file_name is not None:
 # target_metadata = None
 target_metadata = SQLModel.metadata
 settings = get_settings()
-db_url = str(settings.ASYNC_SQLITE_URI)
+db_url = settings.async_database_uri
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
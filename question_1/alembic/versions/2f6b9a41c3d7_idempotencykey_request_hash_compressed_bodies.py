@@ -0,0 +1,62 @@
+"""idempotencykey request hash, compressed bodies
+
+Revision ID: 2f6b9a41c3d7
+Revises: 8c1d2e7f4a90
+Create Date: 2025-07-09 15:42:08.530117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6b9a41c3d7'
+down_revision: Union[str, Sequence[str], None] = '8c1d2e7f4a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows keep their (uncompressed) text as bytes, CompressedText reads both
+    with op.batch_alter_table('idempotencykey') as batch_op:
+        batch_op.add_column(sa.Column('request_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+        batch_op.alter_column(
+            'request_data',
+            existing_type=sqlmodel.sql.sqltypes.AutoString(),
+            type_=sa.LargeBinary(),
+            existing_nullable=False,
+            postgresql_using="convert_to(request_data, 'UTF8')",
+        )
+        batch_op.alter_column(
+            'response_data',
+            existing_type=sqlmodel.sql.sqltypes.AutoString(),
+            type_=sa.LargeBinary(),
+            existing_nullable=False,
+            postgresql_using="convert_to(response_data, 'UTF8')",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # compressed rows can not be converted back, drop them
+    op.execute("DELETE FROM idempotencykey WHERE substr(request_data, 1, 1) = x'00' OR substr(response_data, 1, 1) = x'00'")
+    with op.batch_alter_table('idempotencykey') as batch_op:
+        batch_op.alter_column(
+            'response_data',
+            existing_type=sa.LargeBinary(),
+            type_=sqlmodel.sql.sqltypes.AutoString(),
+            existing_nullable=False,
+            postgresql_using="convert_from(response_data, 'UTF8')",
+        )
+        batch_op.alter_column(
+            'request_data',
+            existing_type=sa.LargeBinary(),
+            type_=sqlmodel.sql.sqltypes.AutoString(),
+            existing_nullable=False,
+            postgresql_using="convert_from(request_data, 'UTF8')",
+        )
+        batch_op.drop_column('request_hash')
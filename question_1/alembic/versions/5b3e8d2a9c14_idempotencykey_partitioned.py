@@ -0,0 +1,43 @@
+"""idempotencykey partitioned by creation window
+
+Revision ID: 5b3e8d2a9c14
+Revises: 2f6b9a41c3d7
+Create Date: 2025-07-12 10:21:37.184402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b3e8d2a9c14'
+down_revision: Union[str, Sequence[str], None] = '2f6b9a41c3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # IDEMPOTENCY_STORAGE_MODE=partitioned on postgres, partitions are made at runtime.
+    # sqlite uses one table per window (created at runtime), this one stays empty there
+    op.create_table(
+        'idempotencykey_partitioned',
+        sa.Column('key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('request_data', sa.LargeBinary(), nullable=False),
+        sa.Column('request_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True),
+        sa.Column('response_data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('partition_window', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('key', 'partition_window'),
+        postgresql_partition_by='RANGE (partition_window)',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # partitions go with their parent
+    op.drop_table('idempotencykey_partitioned')
@@ -1,7 +1,11 @@
 from fastapi import APIRouter
 
+from apps.accounts.apis.v1 import router as account_router_v1
 from apps.payments.apis.v1 import router as payment_router_v1
+from apps.transactions.apis.v1 import router as transaction_router_v1
 
 api_router = APIRouter()
 
 api_router.include_router(payment_router_v1, prefix="/payment")
+api_router.include_router(account_router_v1, prefix="/account")
+api_router.include_router(transaction_router_v1, prefix="/transaction")
@@ -0,0 +1,6 @@
+from fastapi import APIRouter
+
+from apps.accounts.apis.v1.views import router as account_views
+
+router = APIRouter()
+router.include_router(account_views, prefix="/v1", tags=["Account v1"])
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.accounts.models import Account
+from apps.accounts.repositories import AccountRepo
+from apps.accounts.schemas import (
+    AccountCreate,
+    AccountRead,
+    TransferCreate,
+    TransferRead,
+)
+from apps.accounts.services.transfer_service import TransferService
+from common.idempotency import IDEMPOTENT_ROUTE
+from common.schemas.response import StandardResponse
+from config.db import get_session
+
+router = APIRouter()
+
+
+@router.post(
+    "/accounts",
+    response_model=StandardResponse[AccountRead],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_account(
+    payload: AccountCreate,
+    session: AsyncSession = Depends(get_session),
+):
+    repo = AccountRepo(session=session)
+    obj = await repo.create(obj_in=Account.model_validate(payload))
+    return StandardResponse(
+        data=obj,
+    )
+
+
+@router.get(
+    "/accounts/{account_number}",
+    response_model=StandardResponse[AccountRead],
+)
+async def get_account(
+    account_number: str,
+    session: AsyncSession = Depends(get_session),
+):
+    repo = AccountRepo(session=session)
+    obj = await repo.get(id=account_number)
+    if obj is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource Not Found",
+        )
+    return StandardResponse(
+        data=obj,
+    )
+
+
+@router.post(
+    "/transfers",
+    response_model=StandardResponse[TransferRead],
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=IDEMPOTENT_ROUTE,
+)
+async def transfer(
+    payload: TransferCreate,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    `status` is `rejected` when the balance does not cover the amount
+    """
+    service = TransferService(session=session)
+    is_created, data = await service.transfer(
+        payload=payload,
+    )
+
+    if not is_created:
+        response.status_code = status.HTTP_200_OK
+
+    return StandardResponse(
+        data=data,
+    )
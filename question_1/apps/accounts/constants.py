@@ -0,0 +1,9 @@
+# TRANSFER_HOT_ACCOUNT_MODE=batched: transfers touching a hot account are applied
+# in batches of at most this many, under one lock and one balance update per account
+TRANSFER_BATCH_MAX_SIZE = 200
+# how long the first transfer of a batch waits for others to join
+TRANSFER_BATCH_LINGER_SECONDS = 0.002
+
+# per worker cache of `Account.is_hot`, a changed flag is seen after this
+HOT_ACCOUNT_CACHE_TTL_SECONDS = 30
+HOT_ACCOUNT_CACHE_MAX_SIZE = 10_000
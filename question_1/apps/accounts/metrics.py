@@ -0,0 +1,11 @@
+"""
+Domain metrics of accounts, exposed on `/metrics`
+"""
+
+from prometheus_client import Histogram
+
+TRANSFER_BATCH_SIZE = Histogram(
+    "transfer_batch_size",
+    "Transfers applied together for a hot account",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
@@ -0,0 +1 @@
+from .account import *
@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+
+from sqlmodel import Field, SQLModel
+
+
+class TransferStatusEnum(str, Enum):
+    completed = "completed"
+    rejected = "rejected"  # insufficient funds, balances untouched
+
+
+class Account(SQLModel, table=True):
+    account_number: str = Field(primary_key=True)
+    # minor units (cents), no float rounding
+    balance: int = Field(default=0)
+    # involved in many concurrent transfers (e.g. corporate accounts),
+    # see TRANSFER_HOT_ACCOUNT_MODE
+    is_hot: bool = Field(default=False)
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class Transfer(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # a retried transfer is applied once
+    idempotency_key: str = Field(unique=True)
+    # sha256 of the request, replays must match it
+    request_hash: str = Field(max_length=64)
+    from_account_number: str = Field(foreign_key="account.account_number", index=True)
+    to_account_number: str = Field(foreign_key="account.account_number", index=True)
+    amount: int
+    status: TransferStatusEnum
+    created_at: datetime = Field(default_factory=datetime.now)
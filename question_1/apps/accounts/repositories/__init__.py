@@ -0,0 +1,2 @@
+from .account_repo import *
+from .transfer_repo import *
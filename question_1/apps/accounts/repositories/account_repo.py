@@ -0,0 +1,84 @@
+import os
+from datetime import datetime
+from typing import Iterable
+
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.accounts.constants import (
+    HOT_ACCOUNT_CACHE_MAX_SIZE,
+    HOT_ACCOUNT_CACHE_TTL_SECONDS,
+)
+from apps.accounts.models import Account
+from apps.accounts.schemas import AccountCreate, AccountUpdate
+from common.repository.base import CRUDBase
+from common.repository.routing import on_replica
+from common.utils.cache import TTLCache
+
+# account_number: is_hot, read on every transfer
+hot_account_cache: TTLCache[bool] = TTLCache(
+    maxsize=HOT_ACCOUNT_CACHE_MAX_SIZE,
+    ttl=HOT_ACCOUNT_CACHE_TTL_SECONDS,
+)
+os.register_at_fork(after_in_child=hot_account_cache.clear)
+
+
+class AccountRepo(CRUDBase[Account, AccountCreate, AccountUpdate]):
+    def __init__(self, session: AsyncSession, cache: TTLCache[bool] | None = None):
+        super().__init__(Account, session=session)
+        self.cache = hot_account_cache if cache is None else cache
+
+    async def get_hot_flags(self, account_numbers: Iterable[str]) -> dict[str, bool]:
+        """
+        account_number: is_hot, unknown accounts are left out
+        """
+        flags = {}
+        missing = []
+        for account_number in set(account_numbers):
+            is_hot = self.cache.get(account_number)
+            if is_hot is None:
+                missing.append(account_number)
+            else:
+                flags[account_number] = is_hot
+
+        if missing:
+            query = select(self.model.account_number, self.model.is_hot).where(
+                self.model.account_number.in_(missing)
+            )
+            response = await self.session.exec(on_replica(query))
+            for account_number, is_hot in response.all():
+                self.cache.set(account_number, is_hot)
+                flags[account_number] = is_hot
+        return flags
+
+    async def lock_accounts(self, account_numbers: Iterable[str]) -> dict[str, Account]:
+        """
+        Lock the rows in account_number order, so two transfers A -> B and B -> A
+        never wait on each other (no deadlock).
+        `FOR NO KEY UPDATE`: inserts of transfers referencing the account are not blocked.
+        sqlite has no row locks, a no-op update takes the database write lock instead.
+
+        Must be the first statement of its transaction, locks are held until commit
+        """
+        account_numbers = sorted(set(account_numbers))
+        if self.session.bind.dialect.name == "sqlite":
+            await self.session.exec(
+                update(self.model)
+                .where(self.model.account_number.in_(account_numbers))
+                .values(balance=self.model.balance)
+            )
+
+        query = (
+            select(self.model)
+            .where(self.model.account_number.in_(account_numbers))
+            .order_by(self.model.account_number)
+            .with_for_update(key_share=True)
+            # balances of a previous transaction in this session are stale
+            .execution_options(populate_existing=True)
+        )
+        response = await self.session.exec(query)
+        return {obj.account_number: obj for obj in response.all()}
+
+    def apply_delta(self, account: Account, delta: int, now: datetime) -> None:
+        account.balance += delta
+        account.updated_at = now
@@ -0,0 +1,28 @@
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.accounts.models import Transfer
+from apps.accounts.schemas import TransferCreate, TransferRead
+from common.repository.base import CRUDBase
+from common.repository.routing import on_replica
+
+
+class TransferRepo(CRUDBase[Transfer, TransferCreate, TransferRead]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(Transfer, session=session)
+
+    async def get_by_idempotency_key(self, idempotency_key: str) -> Transfer | None:
+        # a replica may lag, the key is checked again on the primary under the lock
+        query = select(self.model).where(self.model.idempotency_key == idempotency_key)
+        response = await self.session.exec(on_replica(query))
+        return response.one_or_none()
+
+    async def get_by_idempotency_keys(
+        self, idempotency_keys: list[str]
+    ) -> dict[str, Transfer]:
+        """
+        On the primary, idempotency_key: transfer
+        """
+        query = select(self.model).where(self.model.idempotency_key.in_(idempotency_keys))
+        response = await self.session.exec(query)
+        return {obj.idempotency_key: obj for obj in response.all()}
@@ -0,0 +1 @@
+from .account_schema import *
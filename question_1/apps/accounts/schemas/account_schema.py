@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from apps.accounts.models import TransferStatusEnum
+
+
+class AccountCreate(BaseModel):
+    # opens at 0, money only moves by transfers (funding: scripts/seed_accounts.py)
+    account_number: str
+    is_hot: bool = False
+
+
+class AccountUpdate(BaseModel):
+    is_hot: bool | None = None
+
+
+class AccountRead(BaseModel):
+    account_number: str
+    balance: int
+    is_hot: bool
+    updated_at: datetime
+
+
+class TransferCreate(BaseModel):
+    idempotency_id: str
+    from_account_number: str
+    to_account_number: str
+    amount: int = Field(gt=0)
+
+    def get_request_hash_data(self) -> str:
+        # what a replay must repeat, the key itself excluded
+        return self.model_dump_json(exclude={"idempotency_id"})
+
+
+class TransferRead(BaseModel):
+    id: uuid.UUID
+    idempotency_key: str
+    from_account_number: str
+    to_account_number: str
+    amount: int
+    status: TransferStatusEnum
+    created_at: datetime
@@ -0,0 +1,106 @@
+"""
+Micro-batching of transfers touching a hot account
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Tuple
+
+from apps.accounts.constants import (
+    TRANSFER_BATCH_LINGER_SECONDS,
+    TRANSFER_BATCH_MAX_SIZE,
+)
+from apps.accounts.metrics import TRANSFER_BATCH_SIZE
+from apps.accounts.models import Transfer
+from apps.accounts.schemas import TransferCreate
+
+logger = logging.getLogger(__name__)
+
+# is_created, transfer, or the error of that transfer only
+TransferResult = Tuple[bool, Transfer] | Exception
+
+
+class TransferBatcher:
+    """
+    Transfers touching a hot account queue up per account (per worker) and are
+    applied together by `apply`: one transaction, one lock and one balance update
+    per account for the whole batch, instead of one of each per transfer.
+
+    The first transfer of an empty queue starts a drain task: it waits `linger`
+    for others to join, applies up to `max_size` of them, and goes on while
+    the queue is not empty.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[list[TransferCreate]], Awaitable[list[TransferResult]]],
+        max_size: int = TRANSFER_BATCH_MAX_SIZE,
+        linger: float = TRANSFER_BATCH_LINGER_SECONDS,
+    ):
+        self.apply = apply
+        self.max_size = max_size
+        self.linger = linger
+        self._queues: dict[str, list[Tuple[TransferCreate, asyncio.Future]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def submit(
+        self, account_number: str, payload: TransferCreate
+    ) -> Tuple[bool, Transfer]:
+        """
+        Returns is_created, transfer once its batch is committed
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(account_number)
+        if queue is None:
+            self._queues[account_number] = [(payload, future)]
+            task = asyncio.create_task(
+                self.drain(account_number), name=f"transfer-batch-{account_number}"
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            queue.append((payload, future))
+        # shield: a cancelled request does not cancel the batch it is in
+        return await asyncio.shield(future)
+
+    async def drain(self, account_number: str) -> None:
+        queue = self._queues[account_number]
+        while True:
+            if len(queue) < self.max_size:
+                await asyncio.sleep(self.linger)
+            batch = queue[: self.max_size]
+            del queue[: self.max_size]
+            await self.apply_batch(batch)
+            if not queue:
+                del self._queues[account_number]
+                return
+
+    async def apply_batch(
+        self, batch: list[Tuple[TransferCreate, asyncio.Future]]
+    ) -> None:
+        TRANSFER_BATCH_SIZE.observe(len(batch))
+        try:
+            results = await self.apply([payload for payload, _ in batch])
+        except Exception as e:
+            logger.exception("transfer batch of %s failed", len(batch))
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                # the request may be gone, avoid "exception was never retrieved"
+                future.exception()
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """
+        Wait for the queued transfers to be applied
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,217 @@
+"""
+Business rules of transfers, uses repos
+"""
+
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import exc
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.accounts.models import Transfer, TransferStatusEnum
+from apps.accounts.repositories import AccountRepo, TransferRepo
+from apps.accounts.schemas import TransferCreate
+from apps.accounts.services.batcher import TransferBatcher, TransferResult
+from common.utils.hashing import fingerprint
+from common.utils.singleflight import SingleFlight
+from config.db import async_session_factory
+from config.settings import TransferHotAccountModeEnum, get_settings
+
+# concurrent requests (same worker) with the same idempotency id share one run
+transfer_flight: SingleFlight[Tuple[bool, Transfer]] = SingleFlight()
+
+
+class TransferService:
+    def __init__(
+        self,
+        session: AsyncSession,
+        mode: TransferHotAccountModeEnum | None = None,
+        batcher: TransferBatcher | None = None,
+    ):
+        self.session = session
+        self.account_repo = AccountRepo(session=session)
+        self.transfer_repo = TransferRepo(session=session)
+        self.mode = mode or get_settings().TRANSFER_HOT_ACCOUNT_MODE
+        self.batcher = batcher
+
+    def check_same_request(self, payload: TransferCreate, obj: Transfer):
+        if obj.request_hash != fingerprint(payload.get_request_hash_data()):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency key was already used with a different request",
+            )
+
+    async def transfer(self, payload: TransferCreate) -> Tuple[bool, Transfer]:
+        """
+        Applied once per idempotency id, concurrent duplicates of an in-flight
+        transfer wait for its result and are answered as a replay.
+        A transfer the balance cannot cover is stored as `rejected`
+
+        Returns is_created, transfer
+        """
+        if payload.from_account_number == payload.to_account_number:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Cannot transfer to the same account",
+            )
+
+        is_leader, (is_created, obj) = await transfer_flight.do(
+            payload.idempotency_id,
+            lambda: self._transfer(payload=payload),
+        )
+        is_created = is_leader and is_created
+        # a replay is only valid for the same request
+        if not is_created:
+            self.check_same_request(payload, obj)
+        return is_created, obj
+
+    async def _transfer(self, payload: TransferCreate) -> Tuple[bool, Transfer]:
+        existing = await self.transfer_repo.get_by_idempotency_key(payload.idempotency_id)
+        if existing is not None:
+            return False, existing
+
+        if self.mode == TransferHotAccountModeEnum.batched:
+            flags = await self.account_repo.get_hot_flags(
+                [payload.from_account_number, payload.to_account_number]
+            )
+            hot_accounts = sorted(number for number, is_hot in flags.items() if is_hot)
+            if hot_accounts:
+                # no connection held while queued, the batch has its own session
+                await self.session.commit()
+                batcher = (
+                    self.batcher if self.batcher is not None else get_transfer_batcher()
+                )
+                # queued under one hot account, whatever the other side is: all of its
+                # transfers batch together. Between two hot accounts, the other one
+                # may be in another batch at the same time, its row lock orders them
+                return await batcher.submit(hot_accounts[0], payload)
+
+        return await self.transfer_locked(payload)
+
+    async def transfer_locked(self, payload: TransferCreate) -> Tuple[bool, Transfer]:
+        """
+        Own transaction, both accounts locked until it commits
+        """
+        try:
+            result = (await self.apply_transfers([payload]))[0]
+        except exc.IntegrityError:
+            # the key was stored meanwhile (with other accounts, so other locks)
+            await self.session.rollback()
+            existing = await self.transfer_repo.get_by_idempotency_keys(
+                [payload.idempotency_id]
+            )
+            if payload.idempotency_id not in existing:
+                raise
+            return False, existing[payload.idempotency_id]
+
+        if isinstance(result, HTTPException):
+            raise result
+        return result
+
+    async def apply_batch(self, payloads: list[TransferCreate]) -> list[TransferResult]:
+        """
+        `apply_transfers`, or one transfer at a time when the batch cannot commit
+        """
+        try:
+            return await self.apply_transfers(payloads)
+        except exc.IntegrityError:
+            await self.session.rollback()
+
+        # an error is only that payload's, the ones before it are committed
+        results = []
+        for payload in payloads:
+            try:
+                results.append(await self.transfer_locked(payload))
+                # detached, a rollback for a later payload must not expire it
+                self.session.expunge_all()
+            except Exception as e:
+                await self.session.rollback()
+                results.append(e)
+        return results
+
+    async def apply_transfers(
+        self, payloads: list[TransferCreate]
+    ) -> list[TransferResult]:
+        """
+        All `payloads` in one transaction, in order: every account is locked once
+        and updated once, whatever the number of transfers touching it.
+        A transfer with an unknown account gets a 404, the others go on.
+
+        Returns one result per payload, same order
+        """
+        # the lookups so far ran in their own transaction, the locks start a new one
+        if self.session.in_transaction():
+            await self.session.commit()
+
+        accounts = await self.account_repo.lock_accounts(
+            number
+            for payload in payloads
+            for number in (payload.from_account_number, payload.to_account_number)
+        )
+        # under the locks: a concurrent transfer with the same key has committed by now
+        existing = await self.transfer_repo.get_by_idempotency_keys(
+            [payload.idempotency_id for payload in payloads]
+        )
+
+        now = datetime.now()
+        results = []
+        for payload in payloads:
+            obj = existing.get(payload.idempotency_id)
+            if obj is not None:
+                results.append((False, obj))
+                continue
+
+            source = accounts.get(payload.from_account_number)
+            destination = accounts.get(payload.to_account_number)
+            if source is None or destination is None:
+                results.append(
+                    HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Account not found",
+                    )
+                )
+                continue
+
+            transfer_status = TransferStatusEnum.rejected
+            if source.balance >= payload.amount:
+                transfer_status = TransferStatusEnum.completed
+                self.account_repo.apply_delta(source, -payload.amount, now=now)
+                self.account_repo.apply_delta(destination, payload.amount, now=now)
+
+            obj = Transfer(
+                idempotency_key=payload.idempotency_id,
+                request_hash=fingerprint(payload.get_request_hash_data()),
+                from_account_number=payload.from_account_number,
+                to_account_number=payload.to_account_number,
+                amount=payload.amount,
+                status=transfer_status,
+                created_at=now,
+            )
+            self.session.add(obj)
+            # a repeated key in the batch is a replay of the first one
+            existing[payload.idempotency_id] = obj
+            results.append((True, obj))
+
+        # one UPDATE per changed account, the transfers inserted together
+        await self.session.commit()
+        return results
+
+
+async def apply_transfer_batch(payloads: list[TransferCreate]) -> list[TransferResult]:
+    # a batch outlives the requests in it, it has its own session
+    async with async_session_factory() as session:
+        return await TransferService(session=session).apply_batch(payloads)
+
+
+@lru_cache
+def get_transfer_batcher() -> TransferBatcher:
+    """
+    One per worker process, flushed by the app lifespan
+    """
+    return TransferBatcher(apply=apply_transfer_batch)
+
+
+os.register_at_fork(after_in_child=get_transfer_batcher.cache_clear)
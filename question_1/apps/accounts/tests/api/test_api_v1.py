@@ -0,0 +1,63 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+from scripts.seed_accounts import seed_accounts
+
+
+class TestAccountV1:
+    @pytest.mark.asyncio
+    async def test_transfer(self, db_session):
+        async with AsyncClient(
+            transport=ASGITransport(app), base_url="http://test"
+        ) as ac:
+            # funding is not an API, seeded directly
+            await seed_accounts(["A"], balance=100)
+            res = await ac.post("/api/account/v1/accounts", json={"account_number": "B"})
+            assert res.status_code == 201
+            assert res.json()["data"]["balance"] == 0
+
+            payload = {
+                "idempotency_id": "1",
+                "from_account_number": "A",
+                "to_account_number": "B",
+                "amount": 30,
+            }
+            res = await ac.post("/api/account/v1/transfers", json=payload)
+            assert res.status_code == 201
+            assert res.json()["data"]["status"] == "completed"
+
+            replay = await ac.post("/api/account/v1/transfers", json=payload)
+            assert replay.status_code == 200
+            assert replay.json()["data"]["id"] == res.json()["data"]["id"]
+
+            res = await ac.get("/api/account/v1/accounts/B")
+            assert res.json()["data"]["balance"] == 30
+
+    @pytest.mark.asyncio
+    async def test_transfer_to_same_account(self, db_session):
+        async with AsyncClient(
+            transport=ASGITransport(app), base_url="http://test"
+        ) as ac:
+            res = await ac.post(
+                "/api/account/v1/transfers",
+                json={
+                    "idempotency_id": "1",
+                    "from_account_number": "A",
+                    "to_account_number": "A",
+                    "amount": 30,
+                },
+            )
+            assert res.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_create_account_ignores_balance(self, db_session):
+        async with AsyncClient(
+            transport=ASGITransport(app), base_url="http://test"
+        ) as ac:
+            res = await ac.post(
+                "/api/account/v1/accounts",
+                json={"account_number": "A", "balance": 1_000_000},
+            )
+            assert res.status_code == 201
+            assert res.json()["data"]["balance"] == 0
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import exc
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.accounts.models import Account, TransferStatusEnum
+from apps.accounts.repositories import AccountRepo
+from apps.accounts.schemas import TransferCreate
+from apps.accounts.services.batcher import TransferBatcher
+from apps.accounts.services.transfer_service import TransferService
+from config.settings import TransferHotAccountModeEnum
+
+
+async def create_accounts(
+    session: AsyncSession, balances: dict[str, int], hot: str | None = None
+):
+    repo = AccountRepo(session=session)
+    await repo.bulk_create(
+        objs_in=[
+            Account(account_number=number, balance=balance, is_hot=number == hot)
+            for number, balance in balances.items()
+        ],
+        return_objects=False,
+    )
+
+
+async def get_balances(session: AsyncSession) -> dict[str, int]:
+    session.expire_all()
+    return {
+        obj.account_number: obj.balance
+        for obj in await AccountRepo(session=session).get_multi()
+    }
+
+
+class TestTransferService:
+    @pytest.mark.asyncio
+    async def test_transfer_locked(self, db_session):
+        await create_accounts(db_session, {"A": 100, "B": 0})
+        service = TransferService(
+            session=db_session, mode=TransferHotAccountModeEnum.locked
+        )
+        payload = TransferCreate(
+            idempotency_id="1", from_account_number="A", to_account_number="B", amount=60
+        )
+
+        is_created, obj = await service.transfer(payload)
+        assert is_created and obj.status == TransferStatusEnum.completed
+        # replay, applied once
+        is_created, replay = await service.transfer(payload)
+        assert not is_created and replay.id == obj.id
+
+        # the balance does not cover it anymore
+        is_created, obj = await service.transfer(
+            payload.model_copy(update={"idempotency_id": "2"})
+        )
+        assert is_created and obj.status == TransferStatusEnum.rejected
+        assert await get_balances(db_session) == {"A": 40, "B": 60}
+
+    @pytest.mark.asyncio
+    async def test_transfer_key_reused_with_another_request(self, db_session):
+        await create_accounts(db_session, {"A": 100, "B": 0})
+        service = TransferService(session=db_session)
+        payload = TransferCreate(
+            idempotency_id="1", from_account_number="A", to_account_number="B", amount=10
+        )
+        await service.transfer(payload)
+
+        with pytest.raises(HTTPException) as e:
+            await service.transfer(payload.model_copy(update={"amount": 20}))
+        assert e.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_transfer_unknown_account(self, db_session):
+        await create_accounts(db_session, {"A": 100})
+        service = TransferService(session=db_session)
+
+        with pytest.raises(HTTPException) as e:
+            await service.transfer(
+                TransferCreate(
+                    idempotency_id="1",
+                    from_account_number="A",
+                    to_account_number="B",
+                    amount=10,
+                )
+            )
+        assert e.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_apply_batch_fallback_error_is_per_payload(self, db_session):
+        await create_accounts(db_session, {"A": 100, "B": 0})
+        service = TransferService(session=db_session)
+        apply_transfers = service.apply_transfers
+
+        async def failing_apply_transfers(payloads):
+            # the batch, then the second transfer alone, cannot commit
+            if len(payloads) > 1 or payloads[0].idempotency_id == "2":
+                raise exc.IntegrityError("INSERT", {}, Exception("constraint failed"))
+            return await apply_transfers(payloads)
+
+        service.apply_transfers = failing_apply_transfers
+        payloads = [
+            TransferCreate(
+                idempotency_id=key,
+                from_account_number="A",
+                to_account_number="B",
+                amount=10,
+            )
+            for key in ("1", "2")
+        ]
+
+        results = await service.apply_batch(payloads)
+
+        is_created, obj = results[0]
+        assert is_created and obj.status == TransferStatusEnum.completed
+        assert isinstance(results[1], exc.IntegrityError)
+        assert await get_balances(db_session) == {"A": 90, "B": 10}
+
+    @pytest.mark.parametrize(
+        "mode", [TransferHotAccountModeEnum.locked, TransferHotAccountModeEnum.batched]
+    )
+    @pytest.mark.asyncio
+    async def test_concurrent_transfers_with_hot_account(
+        self, async_db_engine, db_session, mode
+    ):
+        async_session = sessionmaker(
+            async_db_engine, class_=AsyncSession, expire_on_commit=False
+        )
+        balances = {"HOT": 1000, **{f"C{i}": 100 for i in range(10)}}
+        await create_accounts(db_session, balances, hot="HOT")
+
+        batch_sizes = []
+
+        async def apply(payloads):
+            batch_sizes.append(len(payloads))
+            async with async_session() as session:
+                return await TransferService(session=session).apply_batch(payloads)
+
+        batcher = TransferBatcher(apply=apply, max_size=8, linger=0.01)
+
+        async def transfer(i: int):
+            # both ways: into and out of the hot account
+            source, destination = (
+                ("HOT", f"C{i // 2}") if i % 2 else (f"C{i // 2}", "HOT")
+            )
+            async with async_session() as session:
+                service = TransferService(session=session, mode=mode, batcher=batcher)
+                return await service.transfer(
+                    TransferCreate(
+                        idempotency_id=str(i),
+                        from_account_number=source,
+                        to_account_number=destination,
+                        amount=10,
+                    )
+                )
+
+        results = await asyncio.gather(*(transfer(i) for i in range(20)))
+
+        assert all(is_created for is_created, _ in results)
+        # every transfer into HOT is paired with one out of it, for each account
+        assert await get_balances(db_session) == balances
+        if mode == TransferHotAccountModeEnum.batched:
+            assert sum(batch_sizes) == 20
+            assert max(batch_sizes) <= 8 and len(batch_sizes) < 20
+        else:
+            assert batch_sizes == []
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, status, Response
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from apps.payments.schemas.payment_schema import PaymentTransactionCreate, PaymentTransactionRead
+from apps.payments.constants import EXPORT_FETCH_SIZE, EXPORT_MAX_FETCH_SIZE
+from apps.payments.schemas.payment_schema import (
+    IdempotencyKeyFilter,
+    PaymentTransactionBatchItemRead,
+    PaymentTransactionCreate,
+    PaymentTransactionRead,
+)
 from apps.payments.services.core_service import PaymenTransactionService
+from apps.payments.services.export_service import export_records
+from common.idempotency import IDEMPOTENT_ROUTE
 from common.schemas.response import StandardResponse
-from config.db import get_session
+from config.db import async_session_factory, get_session
 
 router = APIRouter()
 
@@ -13,6 +22,7 @@ router = APIRouter()
     "/payments",
     response_model=StandardResponse[PaymentTransactionRead],
     status_code=status.HTTP_201_CREATED,
+    openapi_extra=IDEMPOTENT_ROUTE,
 )
 async def process_payment(
     payload: PaymentTransactionCreate,
@@ -30,3 +40,44 @@ async def process_payment(
     return StandardResponse(
         data=data,
     )
+
+
+@router.post(
+    "/payments/batch",
+    response_model=StandardResponse[list[PaymentTransactionBatchItemRead]],
+    status_code=status.HTTP_200_OK,
+    openapi_extra=IDEMPOTENT_ROUTE,
+)
+async def process_payments_batch(
+    payloads: list[PaymentTransactionCreate],
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Each item reports its own status: created, replayed or in_progress
+    """
+    service = PaymenTransactionService(session=session)
+    items = await service.process_payments_batch(
+        payloads=payloads,
+    )
+
+    return StandardResponse(
+        data=items,
+    )
+
+
+@router.get(
+    "/idempotency-keys/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_idempotency_keys(
+    filters: IdempotencyKeyFilter = Depends(),
+    fetch_size: int = Query(default=EXPORT_FETCH_SIZE, ge=1, le=EXPORT_MAX_FETCH_SIZE),
+):
+    """
+    Stored records as NDJSON, streamed from a server-side cursor
+    """
+    return StreamingResponse(
+        export_records(async_session_factory, filters=filters, fetch_size=fetch_size),
+        media_type="application/x-ndjson",
+    )
@@ -1 +1,21 @@
 IDEMPOTENCY_EXPIRY_SECONDS = 20
+
+# in-process cache of idempotency records, see IdempotencyKeyRepo
+IDEMPOTENCY_CACHE_MAX_SIZE = 10_000
+
+# "in progress" marker of the shared (redis) idempotency store
+IDEMPOTENCY_LOCK_TTL_MS = 10_000  # longer than processing a payment
+IDEMPOTENCY_LOCK_WAIT_SECONDS = 5  # how long a duplicate waits for the first request
+IDEMPOTENCY_LOCK_POLL_SECONDS = 0.01
+
+# max payments in one POST /payments/batch
+PAYMENT_BATCH_MAX_SIZE = 500
+
+# IDEMPOTENCY_STORAGE_MODE=partitioned: records are grouped by creation window of this size,
+# a whole window is dropped once all its records expired. At least IDEMPOTENCY_EXPIRY_SECONDS
+IDEMPOTENCY_PARTITION_SECONDS = 3600
+
+# GET /idempotency-keys/export: rows per round trip of the server-side cursor,
+# also lines per chunk of the response
+EXPORT_FETCH_SIZE = 1000
+EXPORT_MAX_FETCH_SIZE = 10_000
@@ -0,0 +1,38 @@
+"""
+Domain metrics of payments, exposed on `/metrics`
+"""
+
+from prometheus_client import Counter, Histogram
+
+# created: new payment, replayed: stored response returned,
+# conflict: key in progress elsewhere, mismatch: key reused with another request
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Payment requests by idempotency outcome",
+    ["outcome"],
+)
+
+# counted on each lookup (`TTLCache.get`), not read from the cache at scrape time:
+# callback gauges are not collected in multiprocess mode (several workers)
+IDEMPOTENCY_CACHE_HITS = Counter(
+    "idempotency_cache_hits_total",
+    "Hits of the in-process idempotency cache",
+)
+IDEMPOTENCY_CACHE_MISSES = Counter(
+    "idempotency_cache_misses_total",
+    "Misses of the in-process idempotency cache",
+)
+
+IDEMPOTENCY_SWEEP_PURGED = Counter(
+    "idempotency_sweep_purged_total",
+    "Expired idempotency keys deleted by the sweeper",
+)
+# partitioned mode (`IDEMPOTENCY_STORAGE_MODE`) drops whole windows, keys are not counted
+IDEMPOTENCY_SWEEP_PARTITIONS_DROPPED = Counter(
+    "idempotency_sweep_partitions_dropped_total",
+    "Expired idempotency key partitions dropped by the sweeper",
+)
+IDEMPOTENCY_SWEEP_DURATION = Histogram(
+    "idempotency_sweep_duration_seconds",
+    "Duration of a sweeper run",
+)
@@ -1 +1,2 @@
+from .partitioned import *
 from .payment import *
@@ -0,0 +1,50 @@
+"""
+Idempotency records partitioned by creation window (`IDEMPOTENCY_STORAGE=partitioned`)
+
+* postgres: `idempotencykey_partitioned`, native `PARTITION BY RANGE (partition_window)`,
+  one partition per window
+* sqlite: one table per window, `idempotencykey_w<window>`
+
+Same columns as `IdempotencyKey`, plus `partition_window` in the primary key
+"""
+
+from sqlalchemy import BigInteger, Column, MetaData, Table
+from sqlmodel import SQLModel
+
+from apps.payments.models.payment import IdempotencyKey
+
+PARTITIONED_TABLE_NAME = "idempotencykey_partitioned"
+WINDOW_TABLE_PREFIX = "idempotencykey_w"
+
+
+def copy_columns() -> list[Column]:
+    columns = []
+    for column in IdempotencyKey.__table__.columns:
+        column = column._copy()
+        # a partition is dropped whole, it needs no expiry index
+        column.index = None
+        columns.append(column)
+    columns.append(Column("partition_window", BigInteger, primary_key=True, nullable=False))
+    return columns
+
+
+idempotency_key_partitioned = Table(
+    PARTITIONED_TABLE_NAME,
+    SQLModel.metadata,
+    *copy_columns(),
+    postgresql_partition_by="RANGE (partition_window)",
+)
+
+# sqlite window tables are created / dropped at runtime, not by migrations
+window_metadata = MetaData()
+
+
+def get_window_table(window: int) -> Table:
+    name = f"{WINDOW_TABLE_PREFIX}{window}"
+    if name in window_metadata.tables:
+        return window_metadata.tables[name]
+    return Table(name, window_metadata, *copy_columns())
+
+
+def get_partition_name(window: int) -> str:
+    return f"{PARTITIONED_TABLE_NAME}_w{window}"
@@ -3,13 +3,31 @@ from datetime import datetime, timedelta
 from sqlmodel import Field, SQLModel
 
 from apps.payments.constants import IDEMPOTENCY_EXPIRY_SECONDS
+from common.utils.compression import CompressedText
+from config.settings import IdempotencyCompressionEnum, get_settings
+
+settings = get_settings()
+# column type, read once at import
+compressed_text = CompressedText(
+    (
+        None
+        if settings.IDEMPOTENCY_COMPRESSION == IdempotencyCompressionEnum.none
+        else settings.IDEMPOTENCY_COMPRESSION.value
+    ),
+    settings.IDEMPOTENCY_COMPRESSION_MIN_BYTES,
+)
 
 
 class IdempotencyKey(SQLModel, table=True):
     key: str = Field(primary_key=True)
-    request_data: str  # for this test, simplify data as string
-    response_data: str
+    # for this test, simplify data as string
+    request_data: str = Field(sa_type=compressed_text)
+    # sha256 of request_data, replays must match it
+    request_hash: str | None = Field(default=None, max_length=64)
+    response_data: str = Field(sa_type=compressed_text)
     created_at: datetime = Field(default_factory=datetime.now)
     expires_at: datetime = Field(
-        default_factory=lambda: datetime.now() + timedelta(seconds=IDEMPOTENCY_EXPIRY_SECONDS)
+        default_factory=lambda: datetime.now()
+        + timedelta(seconds=IDEMPOTENCY_EXPIRY_SECONDS),
+        index=True,  # for the expiry sweeper
     )
@@ -0,0 +1,48 @@
+import os
+from functools import lru_cache
+
+from config.settings import PaymentProcessorModeEnum, get_settings
+
+from .base import PaymentProcessor
+from .executors import (
+    AsyncPaymentProcessor,
+    BoundedProcessor,
+    ExecutorPaymentProcessor,
+    ProcessPoolPaymentProcessor,
+    ThreadPoolPaymentProcessor,
+)
+
+__all__ = [
+    "PaymentProcessor",
+    "BoundedProcessor",
+    "AsyncPaymentProcessor",
+    "ExecutorPaymentProcessor",
+    "ThreadPoolPaymentProcessor",
+    "ProcessPoolPaymentProcessor",
+    "get_payment_processor",
+]
+
+
+@lru_cache
+def get_payment_processor() -> PaymentProcessor:
+    """
+    One per worker process, closed by the app lifespan
+    """
+    settings = get_settings()
+    options = dict(
+        max_pending=settings.PAYMENT_PROCESSOR_MAX_PENDING,
+        timeout=settings.PAYMENT_PROCESSOR_TIMEOUT_SECONDS,
+    )
+    if settings.PAYMENT_PROCESSOR_MODE == PaymentProcessorModeEnum.thread:
+        return ThreadPoolPaymentProcessor(
+            max_workers=settings.PAYMENT_PROCESSOR_WORKERS, **options
+        )
+    if settings.PAYMENT_PROCESSOR_MODE == PaymentProcessorModeEnum.process:
+        return ProcessPoolPaymentProcessor(
+            max_workers=settings.PAYMENT_PROCESSOR_WORKERS, **options
+        )
+    return AsyncPaymentProcessor(**options)
+
+
+# pool threads / processes are not forked with the parent
+os.register_at_fork(after_in_child=get_payment_processor.cache_clear)
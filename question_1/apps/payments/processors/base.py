@@ -0,0 +1,22 @@
+from typing import Protocol
+
+from apps.payments.schemas import PaymentTransactionCreate
+
+
+class PaymentProcessor(Protocol):
+    """
+    Does the actual payment work (signing, fraud scoring, PSP call, ...)
+    for a request that is not a replay, off the idempotency logic.
+    """
+
+    async def calculate_response(self, payload: PaymentTransactionCreate) -> str: ...
+
+    async def calculate_responses(
+        self, payloads: list[PaymentTransactionCreate]
+    ) -> list[str]:
+        """
+        Same order as `payloads`, submitted as one unit of work
+        """
+        ...
+
+    async def close(self) -> None: ...
@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, TypeVar
+
+from fastapi import HTTPException, status
+
+from apps.payments.processors import work
+from apps.payments.schemas import PaymentTransactionCreate
+
+ResultType = TypeVar("ResultType")
+
+
+class BoundedProcessor:
+    """
+    At most `max_pending` calls queued / running, more are rejected with 503
+    instead of piling up. A call running longer than `timeout` seconds gets a 504.
+    """
+
+    def __init__(self, max_pending: int, timeout: float):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+
+    def reserve(self) -> None:
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Payment processor is busy, retry later",
+            )
+        self.pending += 1
+
+    def done(self) -> None:
+        self.pending -= 1
+
+    async def wait(self, awaitable: Awaitable[ResultType]) -> ResultType:
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Payment processing timed out",
+            )
+
+
+class AsyncPaymentProcessor(BoundedProcessor):
+    """
+    Runs on the event loop: only for work that awaits (PSP calls) or is negligible
+    """
+
+    async def run(self, fn: Callable[..., ResultType], *args) -> ResultType:
+        self.reserve()
+        try:
+            return await self.wait(self.call(fn, *args))
+        finally:
+            self.done()
+
+    async def call(self, fn: Callable[..., ResultType], *args) -> ResultType:
+        return fn(*args)
+
+    async def calculate_response(self, payload: PaymentTransactionCreate) -> str:
+        return await self.run(work.calculate_response, payload.request_data)
+
+    async def calculate_responses(
+        self, payloads: list[PaymentTransactionCreate]
+    ) -> list[str]:
+        return await self.run(
+            work.calculate_responses, [payload.request_data for payload in payloads]
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+class ExecutorPaymentProcessor(AsyncPaymentProcessor):
+    """
+    Runs in `executor`, the loop keeps serving other requests meanwhile.
+    A call is pending until the executor finishes it, even after a timeout,
+    so `max_pending` really bounds the executor queue.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int, timeout: float):
+        super().__init__(max_pending=max_pending, timeout=timeout)
+        self.executor = executor
+
+    async def run(self, fn: Callable[..., ResultType], *args) -> ResultType:
+        self.reserve()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.done()
+            raise
+        loop = asyncio.get_running_loop()
+
+        def on_done(_):
+            # called from an executor thread
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self.done)
+
+        future.add_done_callback(on_done)
+        return await self.wait(asyncio.wrap_future(future))
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.executor.shutdown, wait=True, cancel_futures=True)
+
+
+class ThreadPoolPaymentProcessor(ExecutorPaymentProcessor):
+    """
+    For blocking I/O (sync PSP clients) and C code releasing the GIL
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float):
+        super().__init__(
+            executor=ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="payment-processor",
+                initializer=work.warm_up,
+            ),
+            max_pending=max_pending,
+            timeout=timeout,
+        )
+
+
+class ProcessPoolPaymentProcessor(ExecutorPaymentProcessor):
+    """
+    For CPU bound work (signing, scoring). Payloads and results are pickled,
+    only plain data crosses the process boundary.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float):
+        super().__init__(
+            executor=ProcessPoolExecutor(
+                max_workers=max_workers,
+                # no fork of a process running an event loop / threads
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=work.warm_up,
+            ),
+            max_pending=max_pending,
+            timeout=timeout,
+        )
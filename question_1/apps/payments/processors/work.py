@@ -0,0 +1,31 @@
+"""
+The processing itself, plain functions so a process pool can run them
+"""
+
+from functools import lru_cache
+
+
+@lru_cache
+def get_faker():
+    # built once per process, import included
+    import faker
+
+    return faker.Faker()
+
+
+def warm_up() -> None:
+    """
+    Pool initializer, pays the setup before the first request
+    """
+    get_faker()
+
+
+def calculate_response(request_data: str) -> str:
+    """
+    For this test, I'll return some random values
+    """
+    return get_faker().name()
+
+
+def calculate_responses(requests_data: list[str]) -> list[str]:
+    return [calculate_response(request_data) for request_data in requests_data]
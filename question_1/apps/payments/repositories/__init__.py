@@ -1 +1,22 @@
-from .payment_repo import *
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config.settings import IdempotencyStorageModeEnum, get_settings
+
+from .partitioned_repo import PartitionedIdempotencyKeyRepo, known_partitions
+from .payment_repo import IdempotencyKeyRepo, get_filter_clauses, idempotency_cache
+
+__all__ = [
+    "IdempotencyKeyRepo",
+    "PartitionedIdempotencyKeyRepo",
+    "get_filter_clauses",
+    "get_idempotency_repo",
+    "idempotency_cache",
+    "known_partitions",
+]
+
+
+def get_idempotency_repo(session: AsyncSession) -> IdempotencyKeyRepo:
+    settings = get_settings()
+    if settings.IDEMPOTENCY_STORAGE_MODE == IdempotencyStorageModeEnum.partitioned:
+        return PartitionedIdempotencyKeyRepo(session=session)
+    return IdempotencyKeyRepo(session=session)
@@ -0,0 +1,311 @@
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Tuple
+
+from sqlalchemy import Table, exc, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from apps.payments.constants import (
+    EXPORT_FETCH_SIZE,
+    IDEMPOTENCY_EXPIRY_SECONDS,
+    IDEMPOTENCY_PARTITION_SECONDS,
+)
+from apps.payments.models import IdempotencyKey
+from apps.payments.models.partitioned import (
+    PARTITIONED_TABLE_NAME,
+    WINDOW_TABLE_PREFIX,
+    get_partition_name,
+    get_window_table,
+    idempotency_key_partitioned,
+    window_metadata,
+)
+from apps.payments.repositories.payment_repo import (
+    IdempotencyKeyRepo,
+    get_filter_clauses,
+)
+from apps.payments.schemas import IdempotencyKeyFilter, PaymentTransactionCreate
+from common.repository.routing import on_replica
+
+# (database, window) known to exist, skips the DDL on the hot path
+known_partitions: set[Tuple[str, int]] = set()
+os.register_at_fork(after_in_child=known_partitions.clear)
+
+
+class PartitionedIdempotencyKeyRepo(IdempotencyKeyRepo):
+    """
+    Records live in the partition of their creation window (`window_seconds` long).
+    A record expires at most one window after its own, so lookups read the current
+    and the previous window, and every older window is dropped whole
+    (`drop_expired_partitions`) instead of deleted row by row.
+
+    A key is unique per window: a retry in the next window finds the record
+    of the previous one by the lookup, before any insert.
+    """
+
+    def __init__(
+        self, *args: Any, window_seconds: int = IDEMPOTENCY_PARTITION_SECONDS, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.window_seconds = max(window_seconds, IDEMPOTENCY_EXPIRY_SECONDS)
+
+    @property
+    def dialect(self) -> str:
+        return self.session.bind.dialect.name
+
+    def window_of(self, moment: datetime) -> int:
+        return int(moment.timestamp() // self.window_seconds)
+
+    def table_for(self, window: int) -> Table:
+        if self.dialect == "postgresql":
+            return idempotency_key_partitioned
+        return get_window_table(window)
+
+    def get_insert(self, table: Table):
+        if self.dialect == "postgresql":
+            return postgresql.insert(table)
+        return sqlite.insert(table)
+
+    def to_record(self, row) -> IdempotencyKey:
+        return IdempotencyKey(
+            **{
+                field: value
+                for field, value in row.items()
+                if field != "partition_window"
+            }
+        )
+
+    async def ensure_partitions(self, now: datetime | None = None) -> None:
+        """
+        Previous, current and next window exist (the next one is made ahead of time)
+        """
+        current = self.window_of(now or datetime.now())
+        database = str(self.session.bind.url)
+        missing = [
+            window
+            for window in (current - 1, current, current + 1)
+            if (database, window) not in known_partitions
+        ]
+        if not missing:
+            return
+
+        for window in missing:
+            try:
+                if self.dialect == "postgresql":
+                    await self.session.exec(
+                        text(
+                            f'CREATE TABLE IF NOT EXISTS "{get_partition_name(window)}" '
+                            f"PARTITION OF {PARTITIONED_TABLE_NAME} "
+                            f"FOR VALUES FROM ({window}) TO ({window + 1})"
+                        )
+                    )
+                else:
+                    table = get_window_table(window)
+                    await self.session.run_sync(
+                        lambda session: table.create(
+                            session.connection(), checkfirst=True
+                        )
+                    )
+                await self.session.commit()
+            except (exc.IntegrityError, exc.ProgrammingError, exc.OperationalError):
+                # another worker created it meanwhile
+                await self.session.rollback()
+            known_partitions.add((database, window))
+
+    async def select_records(
+        self, idempotency_ids: list[str], now: datetime | None = None
+    ) -> dict[str, IdempotencyKey]:
+        """
+        Newest record per key, from the current then the previous window
+        """
+        await self.ensure_partitions(now)
+        current = self.window_of(now or datetime.now())
+
+        records: dict[str, IdempotencyKey] = {}
+        for window in (current, current - 1):
+            table = self.table_for(window)
+            query = select(table).where(
+                table.c.key.in_([key for key in idempotency_ids if key not in records]),
+                # prunes the other partitions on postgres
+                table.c.partition_window == window,
+            )
+            result = await self.session.exec(on_replica(query))
+            for row in result.mappings().all():
+                records[row["key"]] = self.to_record(row)
+            if len(records) == len(idempotency_ids):
+                break
+        return records
+
+    async def get_by_idempotency_id(self, idempotency_id: str) -> IdempotencyKey | None:
+        cached = self.cache.get(idempotency_id)
+        if cached is not None:
+            return cached
+
+        obj = (await self.select_records([idempotency_id])).get(idempotency_id)
+        if obj is not None:
+            self.cache_record(obj)
+        return obj
+
+    async def get_by_idempotency_ids(
+        self, idempotency_ids: list[str]
+    ) -> list[IdempotencyKey]:
+        objs = []
+        missing_ids = []
+        for idempotency_id in idempotency_ids:
+            cached = self.cache.get(idempotency_id)
+            if cached is not None:
+                objs.append(cached)
+            else:
+                missing_ids.append(idempotency_id)
+
+        if missing_ids:
+            for obj in (await self.select_records(missing_ids)).values():
+                self.cache_record(obj)
+                objs.append(obj)
+        return objs
+
+    async def store_request_data(
+        self, payload: PaymentTransactionCreate, response_data: str
+    ):
+        _, obj = await self.upsert_request_data(
+            payload=payload, response_data=response_data
+        )
+        return obj
+
+    async def upsert_request_data(
+        self, payload: PaymentTransactionCreate, response_data: str
+    ) -> Tuple[bool, IdempotencyKey]:
+        is_created, obj = (
+            await self.bulk_upsert_request_data([(payload, response_data)])
+        )[0]
+        return is_created, obj
+
+    async def bulk_upsert_request_data(
+        self, items: list[Tuple[PaymentTransactionCreate, str]]
+    ) -> list[Tuple[bool, IdempotencyKey]]:
+        """
+        `IdempotencyKeyRepo.bulk_upsert_request_data` into the current window
+        """
+        now = datetime.now()
+        await self.ensure_partitions(now)
+        window = self.window_of(now)
+        table = self.table_for(window)
+
+        rows = [
+            {
+                **self.build_record(
+                    payload=payload, response_data=response_data
+                ).model_dump(),
+                "partition_window": window,
+            }
+            for payload, response_data in items
+        ]
+        insert_stmt = self.get_insert(table)
+        stmt = (
+            insert_stmt.values(rows)
+            .on_conflict_do_update(
+                index_elements=[table.c.key, table.c.partition_window],
+                set_={
+                    field: insert_stmt.excluded[field]
+                    for field in rows[0]
+                    if field not in ("key", "partition_window")
+                },
+                where=table.c.expires_at < now,
+            )
+            .returning(*table.c)
+        )
+        result = await self.session.exec(stmt)
+        created = {row["key"]: self.to_record(row) for row in result.mappings().all()}
+        await self.session.commit()
+
+        replayed_ids = [row["key"] for row in rows if row["key"] not in created]
+        replayed = {}
+        if replayed_ids:
+            result = await self.session.exec(
+                select(table).where(
+                    table.c.key.in_(replayed_ids), table.c.partition_window == window
+                )
+            )
+            replayed = {
+                row["key"]: self.to_record(row) for row in result.mappings().all()
+            }
+
+        results = []
+        for row in rows:
+            is_created = row["key"] in created
+            obj = created[row["key"]] if is_created else replayed[row["key"]]
+            self.cache_record(obj)
+            results.append((is_created, obj))
+        return results
+
+    async def stream_records(
+        self,
+        filters: IdempotencyKeyFilter,
+        fetch_size: int = EXPORT_FETCH_SIZE,
+    ) -> AsyncIterator[IdempotencyKey]:
+        """
+        The parent table on postgres, every window table in turn on sqlite
+        """
+        if self.dialect == "postgresql":
+            tables = [idempotency_key_partitioned]
+        else:
+            tables = [
+                get_window_table(window)
+                for window in sorted(await self.list_partitions())
+            ]
+
+        for table in tables:
+            query = (
+                select(table)
+                .where(*get_filter_clauses(table.c, filters))
+                .order_by(table.c.key)
+            )
+            result = await self.session.stream(
+                on_replica(query).execution_options(yield_per=fetch_size)
+            )
+            async for row in result.mappings():
+                yield self.to_record(row)
+
+    async def list_partitions(self) -> dict[int, str]:
+        """
+        window: table name
+        """
+        if self.dialect == "postgresql":
+            query = text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                f"WHERE pg_inherits.inhparent = '{PARTITIONED_TABLE_NAME}'::regclass"
+            )
+            prefix = f"{PARTITIONED_TABLE_NAME}_w"
+        else:
+            query = text("SELECT name FROM sqlite_master WHERE type = 'table'")
+            prefix = WINDOW_TABLE_PREFIX
+
+        result = await self.session.exec(query)
+        partitions = {}
+        for (name,) in result.all():
+            suffix = name[len(prefix) :]
+            if name.startswith(prefix) and suffix.isdigit():
+                partitions[int(suffix)] = name
+        return partitions
+
+    async def drop_expired_partitions(self, now: datetime | None = None) -> int:
+        """
+        Drop every window older than the previous one, all their records expired.
+        One `DROP TABLE` per window, whatever the number of rows.
+
+        Returns number of dropped partitions
+        """
+        current = self.window_of(now or datetime.now())
+        database = str(self.session.bind.url)
+
+        dropped = 0
+        for window, name in sorted((await self.list_partitions()).items()):
+            if window >= current - 1:
+                continue
+            await self.session.exec(text(f'DROP TABLE IF EXISTS "{name}"'))
+            await self.session.commit()
+            known_partitions.discard((database, window))
+            if name in window_metadata.tables:
+                window_metadata.remove(window_metadata.tables[name])
+            dropped += 1
+        return dropped
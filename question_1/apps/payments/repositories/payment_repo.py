@@ -1,29 +1,249 @@
-from sqlmodel import select
+import os
+from datetime import datetime
+from typing import AsyncIterator, Tuple
+
+from sqlalchemy import ColumnCollection
+from sqlmodel import delete, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from apps.payments.constants import (
+    EXPORT_FETCH_SIZE,
+    IDEMPOTENCY_CACHE_MAX_SIZE,
+    IDEMPOTENCY_EXPIRY_SECONDS,
+)
+from apps.payments.metrics import IDEMPOTENCY_CACHE_HITS, IDEMPOTENCY_CACHE_MISSES
 from apps.payments.models import IdempotencyKey
-from apps.payments.schemas import PaymentTransactionCreate, PaymentTransactionRead
+from apps.payments.schemas import (
+    IdempotencyKeyFilter,
+    PaymentTransactionCreate,
+    PaymentTransactionRead,
+)
 from common.repository.base import CRUDBase
+from common.repository.routing import on_replica
+from common.utils.cache import TTLCache
+from common.utils.hashing import fingerprint
+
+# read-through cache, per worker process.
+# A stored response never changes before `expires_at`, so replays can skip the db
+idempotency_cache: TTLCache[IdempotencyKey] = TTLCache(
+    maxsize=IDEMPOTENCY_CACHE_MAX_SIZE,
+    ttl=IDEMPOTENCY_EXPIRY_SECONDS,
+    on_hit=IDEMPOTENCY_CACHE_HITS.inc,
+    on_miss=IDEMPOTENCY_CACHE_MISSES.inc,
+)
+# a forked worker starts empty, like a spawned one
+os.register_at_fork(after_in_child=idempotency_cache.clear)
+
 
+def get_filter_clauses(columns: ColumnCollection, filters: IdempotencyKeyFilter) -> list:
+    clauses = []
+    if filters.created_from is not None:
+        clauses.append(columns.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        clauses.append(columns.created_at < filters.created_to)
+    if filters.expires_from is not None:
+        clauses.append(columns.expires_at >= filters.expires_from)
+    if filters.expires_to is not None:
+        clauses.append(columns.expires_at < filters.expires_to)
+    return clauses
 
-class IdempotencyKeyRepo(CRUDBase[IdempotencyKey, PaymentTransactionRead, PaymentTransactionCreate]):
-    def __init__(self, session: AsyncSession):
+
+class IdempotencyKeyRepo(
+    CRUDBase[IdempotencyKey, PaymentTransactionRead, PaymentTransactionCreate]
+):
+    def __init__(
+        self, session: AsyncSession, cache: TTLCache[IdempotencyKey] | None = None
+    ):
         super().__init__(IdempotencyKey, session=session)
+        self.cache = idempotency_cache if cache is None else cache
+
+    def build_record(
+        self, payload: PaymentTransactionCreate, response_data: str
+    ) -> IdempotencyKey:
+        return IdempotencyKey(
+            key=payload.idempotency_id,
+            request_data=payload.request_data,
+            request_hash=fingerprint(payload.request_data),
+            response_data=response_data,
+        )
+
+    def cache_record(self, obj: IdempotencyKey) -> None:
+        # keep a detached copy, so the cached value is not tied to this session
+        ttl = (obj.expires_at - datetime.now()).total_seconds()
+        self.cache.set(obj.key, IdempotencyKey.model_validate(obj.model_dump()), ttl=ttl)
 
     async def get_by_idempotency_id(self, idempotency_id: str) -> IdempotencyKey:
+        cached = self.cache.get(idempotency_id)
+        if cached is not None:
+            return cached
+
+        # a replica may lag, an upsert on the primary still settles a race
         query = select(self.model).where(self.model.key == idempotency_id)
-        result = await self.session.exec(query)
-        return result.one_or_none()
+        result = await self.session.exec(on_replica(query))
+        obj = result.one_or_none()
+        if obj is not None:
+            self.cache_record(obj)
+        return obj
+
+    async def get_by_idempotency_ids(
+        self, idempotency_ids: list[str]
+    ) -> list[IdempotencyKey]:
+        """
+        Cached ones first, then a single `IN` query for the rest
+        """
+        objs = []
+        missing_ids = []
+        for idempotency_id in idempotency_ids:
+            cached = self.cache.get(idempotency_id)
+            if cached is not None:
+                objs.append(cached)
+            else:
+                missing_ids.append(idempotency_id)
+
+        if missing_ids:
+            for obj in await self.get_by_ids(list_ids=missing_ids):
+                self.cache_record(obj)
+                objs.append(obj)
+        return objs
 
     async def store_request_data(
         self, payload: PaymentTransactionCreate, response_data: str
     ):
         # we have db constaints (idempotency as primary key)
         # so concurrency already handled
-        obj_in = IdempotencyKey(
-            key=payload.idempotency_id,
-            request_data=payload.request_data,
-            response_data=response_data,
-        )
+        obj_in = self.build_record(payload=payload, response_data=response_data)
         result = await self.create(obj_in=obj_in)
+        self.cache_record(result)
         return result
+
+    async def upsert_request_data(
+        self, payload: PaymentTransactionCreate, response_data: str
+    ) -> Tuple[bool, IdempotencyKey]:
+        """
+        Single `INSERT ... ON CONFLICT (key) DO UPDATE ... WHERE expired RETURNING *`.
+        A new key is inserted, an expired key is overwritten.
+        If the key is still alive (another request won the race) nothing is written
+        and the stored record is returned instead.
+
+        Returns is_created, record
+        """
+        now = datetime.now()
+        values = self.build_record(
+            payload=payload, response_data=response_data
+        ).model_dump()
+
+        insert_stmt = self.get_insert()
+        stmt = (
+            insert_stmt.values(**values)
+            .on_conflict_do_update(
+                index_elements=[self.model.key],
+                set_={
+                    field: insert_stmt.excluded[field]
+                    for field in values
+                    if field != "key"
+                },
+                where=self.model.expires_at < now,
+            )
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.exec(stmt)
+        obj = result.scalars().one_or_none()
+        await self.session.commit()
+
+        is_created = obj is not None
+        if not is_created:
+            query = select(self.model).where(self.model.key == payload.idempotency_id)
+            result = await self.session.exec(query)
+            obj = result.one()
+
+        self.cache_record(obj)
+        return is_created, obj
+
+    async def bulk_upsert_request_data(
+        self, items: list[Tuple[PaymentTransactionCreate, str]]
+    ) -> list[Tuple[bool, IdempotencyKey]]:
+        """
+        `upsert_request_data` for many keys (unique), one multi-row statement.
+        Keys that are still alive are fetched back with one `IN` query.
+
+        `items`: payload, response_data
+        Returns is_created, record (same order as `items`)
+        """
+        now = datetime.now()
+        rows = [
+            self.build_record(payload=payload, response_data=response_data).model_dump()
+            for payload, response_data in items
+        ]
+
+        insert_stmt = self.get_insert()
+        stmt = (
+            insert_stmt.values(rows)
+            .on_conflict_do_update(
+                index_elements=[self.model.key],
+                set_={
+                    field: insert_stmt.excluded[field]
+                    for field in rows[0]
+                    if field != "key"
+                },
+                where=self.model.expires_at < now,
+            )
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.exec(stmt)
+        created = {obj.key: obj for obj in result.scalars().all()}
+        await self.session.commit()
+
+        replayed_ids = [row["key"] for row in rows if row["key"] not in created]
+        replayed = {}
+        if replayed_ids:
+            replayed = {
+                obj.key: obj for obj in await self.get_by_ids(list_ids=replayed_ids)
+            }
+
+        results = []
+        for row in rows:
+            is_created = row["key"] in created
+            obj = created[row["key"]] if is_created else replayed[row["key"]]
+            self.cache_record(obj)
+            results.append((is_created, obj))
+        return results
+
+    async def stream_records(
+        self,
+        filters: IdempotencyKeyFilter,
+        fetch_size: int = EXPORT_FETCH_SIZE,
+    ) -> AsyncIterator[IdempotencyKey]:
+        """
+        Matching records by key, from a server-side cursor (`CRUDBase.stream`).
+        Not cached, an export would only evict the replays
+        """
+        query = (
+            select(self.model)
+            .where(*get_filter_clauses(self.model.__table__.c, filters))
+            .order_by(self.model.key)
+        )
+        async for obj in self.stream(query=query, fetch_size=fetch_size):
+            yield obj
+
+    async def delete_expired(self, batch_size: int, now: datetime | None = None) -> int:
+        """
+        Delete at most `batch_size` expired keys, in its own short transaction.
+        Uses the `expires_at` index, so the write lock is held only briefly.
+
+        Returns number of deleted rows
+        """
+        now = now or datetime.now()
+        # SKIP LOCKED (postgres): do not wait on rows another sweeper or an upsert holds.
+        # sqlite has no row locks, the clause is not rendered there
+        expired_keys = (
+            select(self.model.key)
+            .where(self.model.expires_at < now)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = delete(self.model).where(self.model.key.in_(expired_keys))
+        result = await self.session.exec(stmt)
+        await self.session.commit()
+        return result.rowcount
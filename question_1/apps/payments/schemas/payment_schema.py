@@ -1,5 +1,8 @@
 # schemas.py
 import uuid
+from datetime import datetime
+from enum import Enum
+
 from pydantic import BaseModel
 
 
@@ -10,3 +13,40 @@ class PaymentTransactionCreate(BaseModel):
 
 class PaymentTransactionRead(BaseModel):
     response_data: str
+
+
+class PaymentBatchItemStatusEnum(str, Enum):
+    created = "created"
+    replayed = "replayed"
+    payload_mismatch = "payload_mismatch"  # key reused with a different request
+    in_progress = "in_progress"  # same key is being processed by another node
+
+
+class PaymentTransactionBatchItemRead(BaseModel):
+    idempotency_id: str
+    status: PaymentBatchItemStatusEnum
+    response_data: str | None = None
+
+
+class IdempotencyKeyRecord(BaseModel):
+    """
+    Serialized IdempotencyKey, e.g. in redis (table models do not parse json)
+    """
+
+    key: str
+    request_data: str
+    request_hash: str | None = None
+    response_data: str
+    created_at: datetime
+    expires_at: datetime
+
+
+class IdempotencyKeyFilter(BaseModel):
+    """
+    Creation / expiry window, `from` included, `to` excluded
+    """
+
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    expires_from: datetime | None = None
+    expires_to: datetime | None = None
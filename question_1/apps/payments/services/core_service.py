@@ -2,43 +2,124 @@
 Business rules for writing operations, uses repo
 """
 
+import asyncio
 from datetime import datetime
 from typing import Tuple
-import faker
 
+from fastapi import HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.payments.constants import PAYMENT_BATCH_MAX_SIZE
+from apps.payments.metrics import IDEMPOTENCY_REQUESTS
+from apps.payments.models.payment import IdempotencyKey
+from apps.payments.processors import PaymentProcessor, get_payment_processor
+from apps.payments.repositories import get_idempotency_repo
 from apps.payments.schemas import (
+    PaymentBatchItemStatusEnum,
+    PaymentTransactionBatchItemRead,
     PaymentTransactionCreate,
     PaymentTransactionRead,
 )
-from apps.payments.repositories.payment_repo import IdempotencyKeyRepo
-from apps.payments.models.payment import IdempotencyKey
+from apps.payments.stores import IdempotencyStore, get_idempotency_store
+from common.utils.hashing import fingerprint
+from common.utils.singleflight import SingleFlight
+
+# `idempotency_requests_total` label of a batch item
+BATCH_ITEM_OUTCOMES = {
+    PaymentBatchItemStatusEnum.created: "created",
+    PaymentBatchItemStatusEnum.replayed: "replayed",
+    PaymentBatchItemStatusEnum.in_progress: "conflict",
+    PaymentBatchItemStatusEnum.payload_mismatch: "mismatch",
+}
+
+# concurrent requests (same worker) with the same idempotency id share one run
+payment_flight: SingleFlight[Tuple[bool, IdempotencyKey]] = SingleFlight()
 
 
 class PaymenTransactionService:
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        store: IdempotencyStore | None = None,
+        processor: PaymentProcessor | None = None,
+    ):
         self.session = session
-        self.repo = IdempotencyKeyRepo(session=session)
+        self.repo = get_idempotency_repo(session=session)
+        self.store = store or get_idempotency_store()
+        self.processor = processor or get_payment_processor()
 
     @property
     def model(self) -> IdempotencyKey:
         return self.repo.model
 
-    def calculate_response(self) -> str:
+    async def calculate_response(self, payload: PaymentTransactionCreate) -> str:
         """
-        For this test, I'll return some random values
+        Runs in the configured processor (`PAYMENT_PROCESSOR_MODE`), not on the event loop
         """
-        fake = faker.Faker()
-        return fake.name()
+        return await self.processor.calculate_response(payload)
 
     def is_expired(self, expires_at: datetime) -> bool:
         now = datetime.now()
         return now > expires_at
 
+    def is_same_request(self, payload: PaymentTransactionCreate, obj: IdempotencyKey) -> bool:
+        # records stored before fingerprints existed have no hash
+        if obj.request_hash is None:
+            return obj.request_data == payload.request_data
+        return obj.request_hash == fingerprint(payload.request_data)
+
+    def check_same_request(self, payload: PaymentTransactionCreate, obj: IdempotencyKey):
+        if not self.is_same_request(payload, obj):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency key was already used with a different request",
+            )
+
     async def process_payment(
         self,
         payload: PaymentTransactionCreate,
     ) -> Tuple[bool, PaymentTransactionRead]:
+        """
+        Concurrent duplicates of an in-flight request wait for its result
+        instead of racing it, and are answered as a replay
+
+        Returns is_created, read_data
+        """
+        try:
+            is_created, data = await self._process_payment_once(payload=payload)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_409_CONFLICT:
+                IDEMPOTENCY_REQUESTS.labels("conflict").inc()
+            elif e.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY:
+                IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+            raise
+        IDEMPOTENCY_REQUESTS.labels("created" if is_created else "replayed").inc()
+        return is_created, data
+
+    async def _process_payment_once(
+        self,
+        payload: PaymentTransactionCreate,
+    ) -> Tuple[bool, PaymentTransactionRead]:
+        # replays are answered by the shared store when there is one, no db
+        stored = await self.store.get(payload.idempotency_id)
+        if stored is not None and not self.is_expired(stored.expires_at):
+            self.check_same_request(payload, stored)
+            return False, stored
+
+        is_leader, (is_created, data) = await payment_flight.do(
+            payload.idempotency_id,
+            lambda: self._process_payment(payload=payload),
+        )
+        is_created = is_leader and is_created
+        # a replay is only valid for the same request
+        if not is_created:
+            self.check_same_request(payload, data)
+        return is_created, data
+
+    async def _process_payment(
+        self,
+        payload: PaymentTransactionCreate,
+    ) -> Tuple[bool, IdempotencyKey]:
         """
         Try to find record with itempotency
         If exists and not expire yet, return existing response
@@ -54,14 +135,120 @@ class PaymenTransactionService:
         )
 
         if idempotency_data and not self.is_expired(idempotency_data.expires_at):
+            await self.store.set(idempotency_data)
             return is_created, idempotency_data
 
-        # make new data
-        response_data = self.calculate_response()
-        new_idempotency_data = await self.repo.store_request_data(
-            payload=payload,
-            response_data=response_data,
-        )
+        # another node is processing this key, wait for its response
+        lock_token = await self.store.acquire(payload.idempotency_id)
+        if lock_token is None:
+            stored = await self.store.wait(payload.idempotency_id)
+            if stored is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this idempotency key is in progress",
+                )
+            return is_created, stored
+
+        try:
+            # make new data, an expired record is overwritten.
+            # if another worker stored this key meanwhile, its response wins
+            response_data = await self.calculate_response(payload)
+            is_created, idempotency_data = await self.repo.upsert_request_data(
+                payload=payload,
+                response_data=response_data,
+            )
+            await self.store.set(idempotency_data)
+        finally:
+            await self.store.release(payload.idempotency_id, lock_token)
+
+        return is_created, idempotency_data
+
+    async def process_payments_batch(
+        self,
+        payloads: list[PaymentTransactionCreate],
+    ) -> list[PaymentTransactionBatchItemRead]:
+        """
+        `process_payment` for many keys at once:
+        one `IN` lookup, compute only the missing / expired ones,
+        one multi-row upsert for them.
+        A key repeated in the batch is processed once, the repeats are replays.
+
+        Returns one item per payload, same order
+        """
+        if len(payloads) > PAYMENT_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"At most {PAYMENT_BATCH_MAX_SIZE} payments per batch",
+            )
+
+        unique_payloads = {}
+        for payload in payloads:
+            unique_payloads.setdefault(payload.idempotency_id, payload)
+
+        existing = await self.repo.get_by_idempotency_ids(list(unique_payloads))
+        results: dict[str, Tuple[PaymentBatchItemStatusEnum, IdempotencyKey | None]] = {
+            obj.key: (PaymentBatchItemStatusEnum.replayed, obj)
+            for obj in existing
+            if not self.is_expired(obj.expires_at)
+        }
+
+        # keys another node is processing, wait for those
+        missing_ids = [key for key in unique_payloads if key not in results]
+        tokens = await asyncio.gather(*(self.store.acquire(key) for key in missing_ids))
+        busy_ids = [key for key, token in zip(missing_ids, tokens) if token is None]
+        lock_tokens = {
+            key: token for key, token in zip(missing_ids, tokens) if token is not None
+        }
+        missing_ids = list(lock_tokens)
+
+        try:
+            if missing_ids:
+                missing_payloads = [unique_payloads[key] for key in missing_ids]
+                # the whole batch is one unit of work for the processor
+                responses = await self.processor.calculate_responses(missing_payloads)
+                items = list(zip(missing_payloads, responses))
+                for is_created, obj in await self.repo.bulk_upsert_request_data(items):
+                    item_status = (
+                        PaymentBatchItemStatusEnum.created
+                        if is_created
+                        else PaymentBatchItemStatusEnum.replayed
+                    )
+                    results[obj.key] = (item_status, obj)
+                    await self.store.set(obj)
+        finally:
+            await asyncio.gather(
+                *(self.store.release(key, token) for key, token in lock_tokens.items())
+            )
+
+        for key, obj in zip(
+            busy_ids, await asyncio.gather(*(self.store.wait(key) for key in busy_ids))
+        ):
+            if obj is None:
+                results[key] = (PaymentBatchItemStatusEnum.in_progress, None)
+            else:
+                results[key] = (PaymentBatchItemStatusEnum.replayed, obj)
+
+        items = []
+        seen_ids = set()
+        for payload in payloads:
+            item_status, obj = results[payload.idempotency_id]
+            # only the first occurrence of a key in the batch can create it
+            if payload.idempotency_id in seen_ids and item_status == PaymentBatchItemStatusEnum.created:
+                item_status = PaymentBatchItemStatusEnum.replayed
+            seen_ids.add(payload.idempotency_id)
+
+            if (
+                item_status == PaymentBatchItemStatusEnum.replayed
+                and not self.is_same_request(payload, obj)
+            ):
+                item_status, obj = PaymentBatchItemStatusEnum.payload_mismatch, None
 
-        is_created = True
-        return is_created, new_idempotency_data 
+            IDEMPOTENCY_REQUESTS.labels(BATCH_ITEM_OUTCOMES[item_status]).inc()
+            items.append(
+                PaymentTransactionBatchItemRead(
+                    idempotency_id=payload.idempotency_id,
+                    status=item_status,
+                    response_data=obj.response_data if obj is not None else None,
+                )
+            )
+        return items
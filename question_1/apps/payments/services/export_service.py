@@ -0,0 +1,36 @@
+"""
+NDJSON export of idempotency records
+"""
+
+from typing import AsyncIterator, Callable
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.payments.constants import EXPORT_FETCH_SIZE
+from apps.payments.repositories import get_idempotency_repo
+from apps.payments.schemas import IdempotencyKeyFilter, IdempotencyKeyRecord
+
+
+async def export_records(
+    session_factory: Callable[[], AsyncSession],
+    filters: IdempotencyKeyFilter,
+    fetch_size: int = EXPORT_FETCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    One json object per line, sent by chunks of `fetch_size` lines.
+    At most one chunk is held in memory, whatever the number of records.
+
+    Uses its own session: the request's one (`get_session`) is closed
+    before a streaming response body is sent
+    """
+    async with session_factory() as session:
+        repo = get_idempotency_repo(session=session)
+        lines = []
+        async for obj in repo.stream_records(filters=filters, fetch_size=fetch_size):
+            record = IdempotencyKeyRecord.model_validate(obj, from_attributes=True)
+            lines.append(record.model_dump_json())
+            if len(lines) >= fetch_size:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,120 @@
+"""
+Background task deleting expired idempotency keys
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.payments.metrics import (
+    IDEMPOTENCY_SWEEP_DURATION,
+    IDEMPOTENCY_SWEEP_PARTITIONS_DROPPED,
+    IDEMPOTENCY_SWEEP_PURGED,
+)
+from apps.payments.repositories import (
+    IdempotencyKeyRepo,
+    PartitionedIdempotencyKeyRepo,
+    get_idempotency_repo,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeySweeper:
+    """
+    Every `interval` seconds, delete expired keys in batches of `batch_size`.
+    Each batch is its own transaction, and the loop yields between batches,
+    so a big backlog never holds a long write lock.
+    In partitioned mode (`IDEMPOTENCY_STORAGE_MODE`) expired windows are dropped instead.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        interval: float,
+        batch_size: int,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+        # metrics
+        self.runs = 0
+        self.total_purged = 0
+        self.last_purged = 0
+        self.last_duration_seconds = 0.0
+
+    async def sweep_once(self) -> int:
+        """
+        Returns number of purged keys (of dropped partitions in partitioned mode)
+        """
+        started = time.perf_counter()
+
+        async with self.session_factory() as session:
+            repo = get_idempotency_repo(session=session)
+            if isinstance(repo, PartitionedIdempotencyKeyRepo):
+                purged = await self.drop_partitions(repo)
+                unit = "partitions"
+                IDEMPOTENCY_SWEEP_PARTITIONS_DROPPED.inc(purged)
+            else:
+                purged = await self.delete_keys(repo)
+                unit = "keys"
+                IDEMPOTENCY_SWEEP_PURGED.inc(purged)
+
+        self.runs += 1
+        self.last_purged = purged
+        self.total_purged += purged
+        self.last_duration_seconds = time.perf_counter() - started
+        IDEMPOTENCY_SWEEP_DURATION.observe(self.last_duration_seconds)
+        logger.info(
+            "idempotency sweeper purged %s %s in %.3fs",
+            purged,
+            unit,
+            self.last_duration_seconds,
+        )
+        return purged
+
+    async def delete_keys(self, repo: IdempotencyKeyRepo) -> int:
+        purged = 0
+        while True:
+            deleted = await repo.delete_expired(batch_size=self.batch_size)
+            purged += deleted
+            if deleted < self.batch_size:
+                return purged
+            # let requests waiting on the db go first
+            await asyncio.sleep(0)
+
+    async def drop_partitions(self, repo: PartitionedIdempotencyKeyRepo) -> int:
+        # the next window is made ahead of time, requests do not pay for its DDL
+        await repo.ensure_partitions()
+        return await repo.drop_expired_partitions()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # keep sweeping on the next tick
+                logger.exception("idempotency sweeper failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="idempotency-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,20 @@
+from config.redis import get_redis
+from config.settings import IdempotencyStoreEnum, get_settings
+
+from .base import IdempotencyStore
+from .database_store import DatabaseIdempotencyStore
+from .redis_store import RedisIdempotencyStore
+
+__all__ = [
+    "IdempotencyStore",
+    "DatabaseIdempotencyStore",
+    "RedisIdempotencyStore",
+    "get_idempotency_store",
+]
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    settings = get_settings()
+    if settings.IDEMPOTENCY_STORE == IdempotencyStoreEnum.redis:
+        return RedisIdempotencyStore(client=get_redis())
+    return DatabaseIdempotencyStore()
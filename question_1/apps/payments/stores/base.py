@@ -0,0 +1,41 @@
+from typing import Protocol
+
+from apps.payments.models import IdempotencyKey
+
+
+class IdempotencyStore(Protocol):
+    """
+    Fast, shared layer in front of the database for idempotency records.
+    The database always keeps the durable record.
+    """
+
+    async def get(self, key: str) -> IdempotencyKey | None:
+        """
+        Stored record, if still alive
+        """
+        ...
+
+    async def set(self, obj: IdempotencyKey) -> None:
+        """
+        Keep the record until its `expires_at`
+        """
+        ...
+
+    async def acquire(self, key: str) -> str | None:
+        """
+        Take the "in progress" marker for `key`.
+        Returns the holder's token, None if someone else holds it
+        """
+        ...
+
+    async def release(self, key: str, token: str) -> None:
+        """
+        Free the marker, only if `token` still holds it
+        """
+        ...
+
+    async def wait(self, key: str) -> IdempotencyKey | None:
+        """
+        Wait for the holder of the marker to store its record, None on timeout
+        """
+        ...
@@ -0,0 +1,23 @@
+from apps.payments.models import IdempotencyKey
+
+
+class DatabaseIdempotencyStore:
+    """
+    Default store: nothing outside the database (and the per-worker cache of
+    IdempotencyKeyRepo). Concurrency across workers is left to the db constraint.
+    """
+
+    async def get(self, key: str) -> IdempotencyKey | None:
+        return None
+
+    async def set(self, obj: IdempotencyKey) -> None:
+        pass
+
+    async def acquire(self, key: str) -> str | None:
+        return key
+
+    async def release(self, key: str, token: str) -> None:
+        pass
+
+    async def wait(self, key: str) -> IdempotencyKey | None:
+        return None
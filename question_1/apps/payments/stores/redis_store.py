@@ -0,0 +1,76 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from apps.payments.constants import (
+    IDEMPOTENCY_EXPIRY_SECONDS,
+    IDEMPOTENCY_LOCK_POLL_SECONDS,
+    IDEMPOTENCY_LOCK_TTL_MS,
+    IDEMPOTENCY_LOCK_WAIT_SECONDS,
+)
+from apps.payments.models import IdempotencyKey
+from apps.payments.schemas import IdempotencyKeyRecord
+from common.utils.redis_lock import RedisLock
+
+if TYPE_CHECKING:
+    # redis is only imported when a redis store is used
+    from redis.asyncio import Redis
+
+
+class RedisIdempotencyStore:
+    """
+    Shared between all nodes:
+    * `{prefix}:{key}` holds the record (json), expires with it
+    * `{prefix}:lock:{key}` is the "in progress" marker (`RedisLock`)
+    """
+
+    def __init__(
+        self,
+        client: "Redis",
+        prefix: str = "idempotency",
+        lock_ttl_ms: int = IDEMPOTENCY_LOCK_TTL_MS,
+        wait_seconds: float = IDEMPOTENCY_LOCK_WAIT_SECONDS,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.lock = RedisLock(client, ttl_ms=lock_ttl_ms)
+        self.wait_seconds = wait_seconds
+
+    def record_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def lock_key(self, key: str) -> str:
+        return f"{self.prefix}:lock:{key}"
+
+    async def get(self, key: str) -> IdempotencyKey | None:
+        value = await self.client.get(self.record_key(key))
+        if value is None:
+            return None
+        record = IdempotencyKeyRecord.model_validate_json(value)
+        return IdempotencyKey(**record.model_dump())
+
+    async def set(self, obj: IdempotencyKey) -> None:
+        ttl_ms = int((obj.expires_at - datetime.now()).total_seconds() * 1000)
+        ttl_ms = min(ttl_ms, IDEMPOTENCY_EXPIRY_SECONDS * 1000)
+        if ttl_ms <= 0:
+            return
+        await self.client.set(self.record_key(obj.key), obj.model_dump_json(), px=ttl_ms)
+
+    async def acquire(self, key: str) -> str | None:
+        return await self.lock.acquire(self.lock_key(key))
+
+    async def release(self, key: str, token: str) -> None:
+        await self.lock.release(self.lock_key(key), token)
+
+    async def wait(self, key: str) -> IdempotencyKey | None:
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            obj = await self.get(key)
+            if obj is not None:
+                return obj
+            # holder gave up (error or lock expired) without storing a record
+            if not await self.lock.is_locked(self.lock_key(key)):
+                return None
+            await asyncio.sleep(IDEMPOTENCY_LOCK_POLL_SECONDS)
+        return None
@@ -1,6 +1,9 @@
+import json
 from datetime import datetime, timedelta
+
 import pytest
 from httpx import ASGITransport, AsyncClient
+from sqlmodel import delete
 
 from apps.payments.models.payment import IdempotencyKey
 from apps.payments.repositories import IdempotencyKeyRepo
@@ -30,7 +33,7 @@ class TestPaymentV1:
         # create and hit with another request with same idempotency
         obj_in = IdempotencyKey(
             key="1",
-            request_data="request",
+            request_data="request_data",
             response_data="response",
         )
         repo = IdempotencyKeyRepo(session=db_session)
@@ -46,6 +49,23 @@ class TestPaymentV1:
             assert res.json()["data"]["response_data"] is not None
 
 
+    @pytest.mark.asyncio
+    async def test_process_payment_api_case_existing_idempotency_other_request(self, db_session):
+        async with AsyncClient(transport= ASGITransport(app), base_url="http://test") as ac:
+            res = await ac.post("/api/payment/v1/payments", json={
+                "request_data": "request_data",
+                "idempotency_id": "1"
+            })
+            assert res.status_code == 201
+
+            # same key, different body
+            res = await ac.post("/api/payment/v1/payments", json={
+                "request_data": "other request_data",
+                "idempotency_id": "1"
+            })
+            assert res.status_code == 422
+
+
     @pytest.mark.asyncio
     async def test_process_payment_api_case_expired_idempotency(self, db_session):
         # create and hit with another request with same idempotency
@@ -56,11 +76,101 @@ class TestPaymentV1:
             expires_at=datetime.now() - timedelta(seconds=10),
         )
         repo = IdempotencyKeyRepo(session=db_session)
-        await repo.create(obj_in=obj_in)
+        key = await repo.create(obj_in=obj_in)
 
         async with AsyncClient(transport= ASGITransport(app), base_url="http://test") as ac:
             res = await ac.post("/api/payment/v1/payments", json={
                 "request_data": "request_data",
                 "idempotency_id": "1"
             })
-            assert res.status_code == 409
+            # expired record is overwritten with the new request
+            assert res.status_code == 201
+            assert res.json()["data"]["response_data"] != "response"
+
+            await db_session.refresh(key)
+            assert key.request_data == "request_data"
+            assert key.expires_at > datetime.now()
+
+
+    @pytest.mark.asyncio
+    async def test_process_payments_batch(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await repo.create(obj_in=IdempotencyKey(
+            key="existing",
+            request_data="request_data",
+            response_data="response",
+        ))
+        await repo.create(obj_in=IdempotencyKey(
+            key="other request",
+            request_data="request",
+            response_data="response",
+        ))
+        await repo.create(obj_in=IdempotencyKey(
+            key="expired",
+            request_data="request",
+            response_data="response",
+            expires_at=datetime.now() - timedelta(seconds=10),
+        ))
+
+        async with AsyncClient(transport= ASGITransport(app), base_url="http://test") as ac:
+            res = await ac.post("/api/payment/v1/payments/batch", json=[
+                {"idempotency_id": "new", "request_data": "request_data"},
+                {"idempotency_id": "existing", "request_data": "request_data"},
+                {"idempotency_id": "expired", "request_data": "request_data"},
+                {"idempotency_id": "new", "request_data": "request_data"},
+                {"idempotency_id": "other request", "request_data": "request_data"},
+            ])
+            assert res.status_code == 200
+            items = res.json()["data"]
+            assert [item["status"] for item in items] == [
+                "created", "replayed", "created", "replayed", "payload_mismatch",
+            ]
+            assert items[1]["response_data"] == "response"
+            assert items[2]["response_data"] != "response"
+            assert items[0]["response_data"] == items[3]["response_data"]
+
+            assert await repo.get_count() == 4
+
+
+    @pytest.mark.asyncio
+    async def test_process_payment_api_idempotency_key_header(self, db_session):
+        headers = {"Idempotency-Key": "header-1"}
+        payload = {"request_data": "request_data", "idempotency_id": "1"}
+
+        async with AsyncClient(transport= ASGITransport(app), base_url="http://test") as ac:
+            res = await ac.post("/api/payment/v1/payments", json=payload, headers=headers)
+            assert res.status_code == 201
+
+            # replayed before routing, the db is not read anymore
+            await db_session.exec(delete(IdempotencyKey))
+            await db_session.commit()
+            replay = await ac.post("/api/payment/v1/payments", json=payload, headers=headers)
+            assert replay.status_code == 201
+            assert replay.content == res.content
+            assert replay.headers["idempotent-replayed"] == "true"
+
+
+    @pytest.mark.asyncio
+    async def test_export_idempotency_keys(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        created_at = datetime(2025, 1, 1)
+        await repo.bulk_create(objs_in=[
+            IdempotencyKey(
+                key=str(i),
+                request_data="request_data",
+                response_data=f"response {i}",
+                created_at=created_at + timedelta(hours=i),
+            )
+            for i in range(3)
+        ])
+
+        async with AsyncClient(transport= ASGITransport(app), base_url="http://test") as ac:
+            res = await ac.get(
+                "/api/payment/v1/idempotency-keys/export",
+                params={"created_from": "2025-01-01T01:00:00", "fetch_size": 1},
+            )
+            assert res.status_code == 200
+            assert res.headers["content-type"] == "application/x-ndjson"
+            records = [json.loads(line) for line in res.text.splitlines()]
+            assert [record["key"] for record in records] == ["1", "2"]
+            assert records[0]["response_data"] == "response 1"
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from apps.payments.processors import (
+    AsyncPaymentProcessor,
+    ProcessPoolPaymentProcessor,
+    ThreadPoolPaymentProcessor,
+)
+from apps.payments.schemas import PaymentTransactionCreate
+
+payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+
+
+class TestPaymentProcessors:
+    @pytest.mark.parametrize(
+        "processor_class",
+        [AsyncPaymentProcessor, ThreadPoolPaymentProcessor, ProcessPoolPaymentProcessor],
+    )
+    @pytest.mark.asyncio
+    async def test_calculate_response(self, processor_class):
+        options = dict(max_pending=10, timeout=30)
+        if processor_class is not AsyncPaymentProcessor:
+            options["max_workers"] = 1
+        processor = processor_class(**options)
+        try:
+            assert isinstance(await processor.calculate_response(payload), str)
+            responses = await processor.calculate_responses([payload, payload])
+            assert len(responses) == 2
+            assert processor.pending == 0
+        finally:
+            await processor.close()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self):
+        processor = ThreadPoolPaymentProcessor(max_workers=1, max_pending=1, timeout=5)
+        try:
+            running = asyncio.ensure_future(processor.run(time.sleep, 0.1))
+            await asyncio.sleep(0)
+
+            with pytest.raises(HTTPException) as e:
+                await processor.calculate_response(payload)
+            assert e.value.status_code == 503
+
+            await running
+            assert isinstance(await processor.calculate_response(payload), str)
+        finally:
+            await processor.close()
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        processor = ThreadPoolPaymentProcessor(
+            max_workers=1, max_pending=10, timeout=0.01
+        )
+        try:
+            with pytest.raises(HTTPException) as e:
+                await processor.run(time.sleep, 0.2)
+            assert e.value.status_code == 504
+            # still running in the pool, still counted
+            assert processor.pending == 1
+        finally:
+            await processor.close()
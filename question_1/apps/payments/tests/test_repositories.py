@@ -0,0 +1,371 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi_pagination import Params
+from fastapi_pagination.cursor import CursorParams
+from sqlalchemy import text
+from sqlmodel import delete, select
+
+from apps.payments.models import IdempotencyKey
+from apps.payments.repositories import (
+    IdempotencyKeyRepo,
+    PartitionedIdempotencyKeyRepo,
+    known_partitions,
+)
+from apps.payments.schemas import IdempotencyKeyFilter, PaymentTransactionCreate
+from common.schemas.enums import CountStrategyEnum, OrderEnum
+from config.settings import DatabaseBackendEnum, get_settings
+
+settings = get_settings()
+
+
+class TestIdempotencyKeyRepo:
+    @pytest.mark.asyncio
+    async def test_store_request_data_fills_cache(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+        await repo.store_request_data(payload=payload, response_data="response")
+
+        # row is gone from db, but replay is still answered from cache
+        await db_session.exec(delete(IdempotencyKey))
+        await db_session.commit()
+
+        obj = await repo.get_by_idempotency_id("1")
+        assert obj.response_data == "response"
+        assert repo.cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_short_value_with_leading_nul(self, db_session):
+        # valid json ("\u0000z"), stored uncompressed, must not be read as zlib
+        repo = IdempotencyKeyRepo(session=db_session)
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="\x00z")
+        await repo.store_request_data(payload=payload, response_data="\x00s")
+        repo.cache.clear()
+        db_session.expire_all()
+
+        obj = await repo.get_by_idempotency_id("1")
+        assert obj.request_data == "\x00z"
+        assert obj.response_data == "\x00s"
+
+    @pytest.mark.asyncio
+    async def test_get_by_idempotency_id_does_not_cache_expired(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await repo.create(
+            obj_in=IdempotencyKey(
+                key="1",
+                request_data="request",
+                response_data="response",
+                expires_at=datetime.now() - timedelta(seconds=10),
+            )
+        )
+
+        assert await repo.get_by_idempotency_id("1") is not None
+        assert "1" not in repo.cache
+
+    @pytest.mark.asyncio
+    async def test_upsert_request_data(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+
+        is_created, obj = await repo.upsert_request_data(
+            payload=payload, response_data="first"
+        )
+        assert is_created
+        assert obj.response_data == "first"
+
+        # key still alive, stored record wins
+        is_created, obj = await repo.upsert_request_data(
+            payload=payload, response_data="second"
+        )
+        assert not is_created
+        assert obj.response_data == "first"
+
+    @pytest.mark.asyncio
+    async def test_upsert_request_data_overwrites_expired(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await repo.create(
+            obj_in=IdempotencyKey(
+                key="1",
+                request_data="old request",
+                response_data="old response",
+                expires_at=datetime.now() - timedelta(seconds=10),
+            )
+        )
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+
+        is_created, obj = await repo.upsert_request_data(
+            payload=payload, response_data="response"
+        )
+        assert is_created
+        assert obj.request_data == "request"
+        assert obj.response_data == "response"
+        assert obj.expires_at > datetime.now()
+
+
+class TestPartitionedIdempotencyKeyRepo:
+    @pytest.fixture
+    async def repo(self, db_session):
+        repo = PartitionedIdempotencyKeyRepo(session=db_session, window_seconds=3600)
+        yield repo
+        await repo.drop_expired_partitions(now=datetime.now() + timedelta(days=1))
+        known_partitions.clear()
+
+    @pytest.mark.asyncio
+    async def test_upsert_and_lookup(self, repo):
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+
+        is_created, obj = await repo.upsert_request_data(payload=payload, response_data="first")
+        assert is_created
+        # key still alive, stored record wins
+        is_created, obj = await repo.upsert_request_data(payload=payload, response_data="second")
+        assert not is_created
+        assert obj.response_data == "first"
+
+        repo.cache.clear()
+        assert (await repo.get_by_idempotency_id("1")).response_data == "first"
+        assert [obj.key for obj in await repo.get_by_idempotency_ids(["1", "2"])] == ["1"]
+
+    @pytest.mark.asyncio
+    async def test_lookup_reads_current_and_previous_window(self, repo):
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+        await repo.upsert_request_data(payload=payload, response_data="response")
+        now = datetime.now()
+
+        next_window = await repo.select_records(["1"], now=now + timedelta(hours=1))
+        assert next_window["1"].response_data == "response"
+        assert await repo.select_records(["1"], now=now + timedelta(hours=2)) == {}
+
+    @pytest.mark.asyncio
+    async def test_drop_expired_partitions(self, repo):
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+        await repo.upsert_request_data(payload=payload, response_data="response")
+        now = datetime.now()
+        window = repo.window_of(now)
+
+        assert await repo.drop_expired_partitions(now=now) == 0
+        # two windows later, the window of the record and the one before it
+        assert await repo.drop_expired_partitions(now=now + timedelta(hours=2)) == 2
+        assert window not in await repo.list_partitions()
+        assert window + 1 in await repo.list_partitions()
+
+    @pytest.mark.asyncio
+    async def test_stream_records(self, repo):
+        for key in ("1", "2"):
+            payload = PaymentTransactionCreate(idempotency_id=key, request_data="request")
+            await repo.upsert_request_data(payload=payload, response_data="response")
+
+        records = [
+            obj async for obj in repo.stream_records(IdempotencyKeyFilter(), fetch_size=1)
+        ]
+        assert [obj.key for obj in records] == ["1", "2"]
+        assert records[0].response_data == "response"
+
+
+class TestCursorPagination:
+    async def create_keys(self, repo: IdempotencyKeyRepo, count: int):
+        created_at = datetime(2025, 1, 1)
+        for i in range(count):
+            await repo.create(
+                obj_in=IdempotencyKey(
+                    key=str(i),
+                    request_data="request",
+                    response_data="response",
+                    # two rows per timestamp, pk breaks the tie
+                    created_at=created_at + timedelta(seconds=i // 2),
+                )
+            )
+
+    @pytest.mark.asyncio
+    async def test_get_multi_cursor_ordered(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await self.create_keys(repo, count=5)
+
+        keys, cursor = [], None
+        for _ in range(3):
+            items, cursor = await repo.get_multi_cursor_ordered(
+                cursor=cursor, limit=2, order_by="created_at", order=OrderEnum.desc
+            )
+            keys += [item.key for item in items]
+
+        assert keys == ["4", "3", "2", "1", "0"]
+        assert cursor is None
+
+    @pytest.mark.asyncio
+    async def test_get_multi_cursor_paginated_ordered(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await self.create_keys(repo, count=3)
+
+        page = await repo.get_multi_cursor_paginated_ordered(
+            params=CursorParams(size=2), order_by="created_at"
+        )
+        assert [item.key for item in page.items] == ["0", "1"]
+        assert page.next_page is not None
+
+        page = await repo.get_multi_cursor_paginated_ordered(
+            params=CursorParams(cursor=page.next_page, size=2), order_by="created_at"
+        )
+        assert [item.key for item in page.items] == ["2"]
+        assert page.next_page is None
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+
+        with pytest.raises(HTTPException) as e:
+            await repo.get_multi_cursor_ordered(cursor="not a cursor")
+        assert e.value.status_code == 400
+
+
+class TestBulkCreate:
+    def make_keys(self, count: int) -> list[IdempotencyKey]:
+        return [
+            IdempotencyKey(key=str(i), request_data=f"request {i}", response_data="response")
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_in_chunks(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+
+        objs = await repo.bulk_create(objs_in=self.make_keys(5), chunk_size=2)
+
+        assert [obj.key for obj in objs] == ["0", "1", "2", "3", "4"]
+        assert objs[3].request_data == "request 3"
+        assert objs[3].expires_at is not None
+        assert await repo.get_count() == 5
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_keys_only(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+
+        keys = await repo.bulk_create(
+            objs_in=self.make_keys(3), chunk_size=2, return_objects=False
+        )
+
+        assert keys == ["0", "1", "2"]
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_conflict(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await repo.bulk_create(objs_in=self.make_keys(1))
+
+        with pytest.raises(HTTPException) as e:
+            await repo.bulk_create(objs_in=self.make_keys(2))
+        assert e.value.status_code == 409
+
+
+class TestCount:
+    async def create_keys(self, repo: IdempotencyKeyRepo, count: int, start: int = 0):
+        await repo.bulk_create(
+            objs_in=[
+                IdempotencyKey(key=str(i), request_data="request", response_data="response")
+                for i in range(start, start + count)
+            ],
+            return_objects=False,
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_count_cached(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await self.create_keys(repo, count=3)
+        assert await repo.get_count(strategy=CountStrategyEnum.cached) == 3
+
+        await self.create_keys(repo, count=2, start=3)
+        assert await repo.get_count(strategy=CountStrategyEnum.cached) == 3
+        assert await repo.get_count(strategy=CountStrategyEnum.exact) == 5
+
+    @pytest.mark.skipif(
+        settings.DATABASE_BACKEND != DatabaseBackendEnum.sqlite, reason="sqlite statistics"
+    )
+    @pytest.mark.asyncio
+    async def test_get_count_estimated(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await self.create_keys(repo, count=3)
+        # no statistics yet, exact count
+        await db_session.exec(text("DROP TABLE IF EXISTS sqlite_stat1"))
+        assert await repo.get_count(strategy=CountStrategyEnum.estimated) == 3
+
+        await db_session.exec(text("ANALYZE"))
+        await self.create_keys(repo, count=2, start=3)
+        assert await repo.get_count(strategy=CountStrategyEnum.estimated) == 3
+
+    @pytest.mark.skipif(
+        settings.DATABASE_BACKEND != DatabaseBackendEnum.sqlite, reason="sqlite statistics"
+    )
+    @pytest.mark.asyncio
+    async def test_get_multi_paginated_estimated_filtered(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await self.create_keys(repo, count=5)
+        await db_session.exec(text("ANALYZE"))
+        await self.create_keys(repo, count=2, start=5)
+
+        page = await repo.get_multi_paginated(count_strategy=CountStrategyEnum.estimated)
+        assert page.total == 5
+
+        # a filtered query is counted exactly, not the table estimate
+        query = select(IdempotencyKey).where(IdempotencyKey.key.in_(["1", "2", "6"]))
+        page = await repo.get_multi_paginated(
+            query=query, count_strategy=CountStrategyEnum.estimated
+        )
+        assert len(page.items) == 3
+        assert page.total == 3
+
+    @pytest.mark.asyncio
+    async def test_get_multi_paginated_without_total(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await self.create_keys(repo, count=3)
+
+        page = await repo.get_multi_paginated(
+            params=Params(page=2, size=2), count_strategy=CountStrategyEnum.none
+        )
+        assert len(page.items) == 1
+        assert page.total is None
+
+        page = await repo.get_multi_paginated(
+            params=Params(page=1, size=2), count_strategy=CountStrategyEnum.cached
+        )
+        assert len(page.items) == 2
+        assert page.total == 3
+        assert page.pages == 2
+
+
+class TestStream:
+    @pytest.mark.asyncio
+    async def test_stream(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        await repo.bulk_create(
+            objs_in=[
+                IdempotencyKey(key=str(i), request_data="request", response_data="response")
+                for i in range(5)
+            ],
+            return_objects=False,
+        )
+
+        # more rows than one fetch
+        keys = [obj.key async for obj in repo.stream(fetch_size=2)]
+        assert keys == ["0", "1", "2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_stream_records_filters(self, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        created_at = datetime(2025, 1, 1)
+        await repo.bulk_create(
+            objs_in=[
+                IdempotencyKey(
+                    key=str(i),
+                    request_data="request",
+                    response_data="response",
+                    created_at=created_at + timedelta(hours=i),
+                    expires_at=created_at + timedelta(hours=i + 1),
+                )
+                for i in range(4)
+            ]
+        )
+
+        filters = IdempotencyKeyFilter(
+            created_from=created_at + timedelta(hours=1),
+            expires_to=created_at + timedelta(hours=4),
+        )
+        keys = [obj.key async for obj in repo.stream_records(filters, fetch_size=1)]
+        assert keys == ["1", "2"]
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.payments.models import IdempotencyKey
+from apps.payments.repositories import IdempotencyKeyRepo, idempotency_cache
+from apps.payments.schemas import PaymentTransactionCreate
+from apps.payments.services.core_service import PaymenTransactionService
+from apps.payments.services.sweeper import IdempotencyKeySweeper
+from apps.payments.stores import RedisIdempotencyStore
+
+
+@pytest.fixture
+def redis_store():
+    # in-process fake, point `client` at a real Redis to test against it
+    return RedisIdempotencyStore(client=FakeAsyncRedis(server=FakeServer()), wait_seconds=1)
+
+
+class TestPaymenTransactionService:
+    @pytest.mark.asyncio
+    async def test_process_payment_concurrent_duplicates(self, async_db_engine):
+        async_session = sessionmaker(
+            async_db_engine, class_=AsyncSession, expire_on_commit=False
+        )
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+        calls = 0
+
+        async def process(session):
+            service = PaymenTransactionService(session=session)
+            calculate_response = service.calculate_response
+
+            async def counted_calculate_response(payload):
+                nonlocal calls
+                calls += 1
+                return await calculate_response(payload)
+
+            service.calculate_response = counted_calculate_response
+            return await service.process_payment(payload=payload)
+
+        async with async_session() as s1, async_session() as s2, async_session() as s3:
+            results = await asyncio.gather(process(s1), process(s2), process(s3))
+
+        # only one request does the work, the others get the same response
+        assert calls == 1
+        assert sorted(is_created for is_created, _ in results) == [False, False, True]
+        assert len({data.response_data for _, data in results}) == 1
+
+
+class TestIdempotencyKeySweeper:
+    @pytest.mark.asyncio
+    async def test_sweep_once_purges_expired_in_batches(self, async_db_engine, db_session):
+        repo = IdempotencyKeyRepo(session=db_session)
+        expired_at = datetime.now() - timedelta(seconds=10)
+        for key in range(5):
+            await repo.create(
+                obj_in=IdempotencyKey(
+                    key=str(key),
+                    request_data="request",
+                    response_data="response",
+                    expires_at=expired_at,
+                )
+            )
+        await repo.create(
+            obj_in=IdempotencyKey(key="alive", request_data="request", response_data="response")
+        )
+
+        sweeper = IdempotencyKeySweeper(
+            session_factory=sessionmaker(
+                async_db_engine, class_=AsyncSession, expire_on_commit=False
+            ),
+            interval=60,
+            batch_size=2,
+        )
+        assert await sweeper.sweep_once() == 5
+        assert sweeper.total_purged == 5
+
+        keys = (await db_session.exec(select(IdempotencyKey.key))).all()
+        assert keys == ["alive"]
+
+
+class TestRedisIdempotencyStore:
+    @pytest.mark.asyncio
+    async def test_set_and_get(self, redis_store):
+        obj = IdempotencyKey(key="1", request_data="request", response_data="response")
+        await redis_store.set(obj)
+
+        stored = await redis_store.get("1")
+        assert stored.response_data == "response"
+        assert stored.expires_at == obj.expires_at
+        assert await redis_store.get("2") is None
+
+    @pytest.mark.asyncio
+    async def test_acquire_is_exclusive(self, redis_store):
+        token = await redis_store.acquire("1")
+        assert token is not None
+        assert await redis_store.acquire("1") is None
+
+        await redis_store.release("1", token)
+        assert await redis_store.acquire("1") is not None
+
+    @pytest.mark.asyncio
+    async def test_release_after_expiry_keeps_new_holder(self, redis_store):
+        token = await redis_store.acquire("1")
+        # marker expired while the first holder was still running, another node took it
+        await redis_store.client.delete(redis_store.lock_key("1"))
+        other_token = await redis_store.acquire("1")
+
+        await redis_store.release("1", token)
+        assert await redis_store.acquire("1") is None
+
+        await redis_store.release("1", other_token)
+        assert await redis_store.acquire("1") is not None
+
+    @pytest.mark.asyncio
+    async def test_process_payment_replay_from_redis(self, db_session, redis_store):
+        service = PaymenTransactionService(session=db_session, store=redis_store)
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+        is_created, data = await service.process_payment(payload=payload)
+        assert is_created
+
+        # durable record is in the db, replay does not need it
+        await db_session.exec(delete(IdempotencyKey))
+        await db_session.commit()
+        idempotency_cache.clear()
+
+        is_created, replay = await service.process_payment(payload=payload)
+        assert not is_created
+        assert replay.response_data == data.response_data
+
+    @pytest.mark.asyncio
+    async def test_process_payment_waits_for_other_node(self, db_session, redis_store):
+        # another node holds the marker, and stores its response a bit later
+        token = await redis_store.acquire("1")
+        other_node_data = IdempotencyKey(
+            key="1", request_data="request", response_data="other node"
+        )
+
+        async def other_node():
+            await asyncio.sleep(0.05)
+            await redis_store.set(other_node_data)
+            await redis_store.release("1", token)
+
+        service = PaymenTransactionService(session=db_session, store=redis_store)
+        payload = PaymentTransactionCreate(idempotency_id="1", request_data="request")
+        (is_created, data), _ = await asyncio.gather(
+            service.process_payment(payload=payload), other_node()
+        )
+
+        assert not is_created
+        assert data.response_data == "other node"
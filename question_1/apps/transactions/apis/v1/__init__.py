@@ -0,0 +1,6 @@
+from fastapi import APIRouter
+
+from apps.transactions.apis.v1.views import router as transaction_views
+
+router = APIRouter()
+router.include_router(transaction_views, prefix="/v1", tags=["Transaction v1"])
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from fastapi_pagination.cursor import CursorPage, CursorParams
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.transactions.repositories import TransactionRepo
+from apps.transactions.schemas import TransactionRead
+from common.schemas.response import StandardResponse
+from config.db import get_session
+
+router = APIRouter()
+
+
+@router.get(
+    "/accounts/{account_number}/transactions",
+    response_model=StandardResponse[CursorPage[TransactionRead]],
+)
+async def get_account_history(
+    account_number: str,
+    params: CursorParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Newest first. Pass `next_page` of a response as `cursor` for the page after it
+    """
+    repo = TransactionRepo(session=session)
+    page = await repo.get_account_history(account_number=account_number, params=params)
+    return StandardResponse(
+        data=page,
+    )
@@ -0,0 +1,27 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class Transaction(SQLModel, table=True):
+    __tablename__ = "transactions"
+
+    transaction_id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    account_number: str = Field(max_length=50)
+    transaction_amount: Decimal = Field(max_digits=19, decimal_places=4)
+    transaction_type: str = Field(max_length=20)
+    booking_date: date
+    entry_date: datetime = Field(default_factory=datetime.now)
+
+
+# account history, newest first: an index range scan from the cursor position,
+# no sort and no OFFSET (see TransactionRepo.get_account_history)
+Index(
+    "idx_transactions_account_entry_date",
+    Transaction.account_number,
+    Transaction.entry_date.desc(),
+    Transaction.transaction_id,
+)
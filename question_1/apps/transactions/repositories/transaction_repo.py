@@ -0,0 +1,31 @@
+from fastapi_pagination.cursor import CursorPage, CursorParams
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.transactions.models import Transaction
+from apps.transactions.schemas import TransactionCreate, TransactionRead
+from common.repository.base import CRUDBase
+from common.schemas.enums import OrderEnum
+
+
+class TransactionRepo(CRUDBase[Transaction, TransactionCreate, TransactionRead]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(Transaction, session=session)
+
+    async def get_account_history(
+        self,
+        account_number: str,
+        params: CursorParams | None = CursorParams(),
+    ) -> CursorPage[Transaction]:
+        """
+        Newest first, `ORDER BY entry_date DESC, transaction_id` like the
+        `(account_number, entry_date DESC, transaction_id)` index:
+        the last page costs the same as the first one
+        """
+        return await self.get_multi_cursor_paginated_ordered(
+            params=params,
+            order_by="entry_date",
+            order=OrderEnum.desc,
+            pk_order=OrderEnum.asc,
+            query=select(self.model).where(self.model.account_number == account_number),
+        )
@@ -0,0 +1 @@
+from .transaction_schema import *
@@ -0,0 +1,22 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+
+class TransactionCreate(BaseModel):
+    account_number: str
+    transaction_amount: Decimal
+    transaction_type: str
+    booking_date: date
+    entry_date: datetime
+
+
+class TransactionRead(BaseModel):
+    transaction_id: uuid.UUID
+    account_number: str
+    transaction_amount: Decimal
+    transaction_type: str
+    booking_date: date
+    entry_date: datetime
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from apps.transactions.repositories import TransactionRepo
+from main import app
+from scripts.generate_transactions import make_transactions
+
+
+class TestTransactionV1:
+    @pytest.mark.asyncio
+    async def test_get_account_history(self, db_session):
+        repo = TransactionRepo(session=db_session)
+        await repo.bulk_create(
+            objs_in=list(make_transactions("A", 3, random.Random(0))),
+            return_objects=False,
+        )
+
+        async with AsyncClient(
+            transport=ASGITransport(app), base_url="http://test"
+        ) as ac:
+            url = "/api/transaction/v1/accounts/A/transactions"
+            res = await ac.get(url, params={"size": 2})
+            assert res.status_code == 200
+            page = res.json()["data"]
+            assert len(page["items"]) == 2
+
+            res = await ac.get(url, params={"size": 2, "cursor": page["next_page"]})
+            page = res.json()["data"]
+            assert len(page["items"]) == 1
+            assert page["next_page"] is None
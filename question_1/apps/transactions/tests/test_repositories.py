@@ -0,0 +1,62 @@
+import random
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi_pagination.cursor import CursorParams
+
+from apps.transactions.models import Transaction
+from apps.transactions.repositories import TransactionRepo
+from scripts.generate_transactions import make_transactions
+
+
+class TestTransactionRepo:
+    @pytest.mark.asyncio
+    async def test_get_account_history(self, db_session):
+        repo = TransactionRepo(session=db_session)
+        rows = list(make_transactions("A", 25, random.Random(0)))
+        await repo.bulk_create(objs_in=rows, return_objects=False)
+        await repo.bulk_create(
+            objs_in=list(make_transactions("B", 5, random.Random(1))),
+            return_objects=False,
+        )
+
+        ids, cursor = [], None
+        for _ in range(3):
+            page = await repo.get_account_history(
+                account_number="A", params=CursorParams(cursor=cursor, size=10)
+            )
+            ids += [row.transaction_id for row in page.items]
+            cursor = page.next_page
+
+        expected = sorted(rows, key=lambda row: row.transaction_id)
+        expected.sort(key=lambda row: row.entry_date, reverse=True)
+        assert ids == [row.transaction_id for row in expected]
+        assert cursor is None
+
+    @pytest.mark.asyncio
+    async def test_get_account_history_same_entry_date(self, db_session):
+        repo = TransactionRepo(session=db_session)
+        entry_date = datetime(2025, 1, 1)
+        rows = [
+            Transaction(
+                account_number="A",
+                transaction_amount=Decimal("1.5"),
+                transaction_type="credit",
+                booking_date=entry_date.date(),
+                entry_date=entry_date,
+            )
+            for _ in range(3)
+        ]
+        await repo.bulk_create(objs_in=rows, return_objects=False)
+
+        ids, cursor = [], None
+        for _ in range(3):
+            page = await repo.get_account_history(
+                account_number="A", params=CursorParams(cursor=cursor, size=1)
+            )
+            ids += [row.transaction_id for row in page.items]
+            cursor = page.next_page
+
+        # ties broken by transaction_id, ascending like the index
+        assert ids == sorted(row.transaction_id for row in rows)
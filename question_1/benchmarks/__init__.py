@@ -0,0 +1,3 @@
+"""
+Load tests / benchmarks, not collected by pytest (see `make bench`)
+"""
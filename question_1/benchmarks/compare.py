@@ -0,0 +1,59 @@
+"""
+Compare two benchmark result files
+
+>>> python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+
+def delta(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    lines = [
+        f"{old.get('commit')} -> {new.get('commit')}",
+        f"{'scenario':>22} {'metric':>8} {'old':>10} {'new':>10} {'change':>8}",
+    ]
+    for name, new_result in new["results"].items():
+        old_result = old["results"].get(name)
+        if old_result is None:
+            continue
+
+        metrics = [
+            (
+                "req/s",
+                old_result["requests_per_second"],
+                new_result["requests_per_second"],
+            )
+        ]
+        for q in ("p50", "p95", "p99"):
+            metrics.append(
+                (f"{q} ms", old_result["latency_ms"][q], new_result["latency_ms"][q])
+            )
+        for metric, old_value, new_value in metrics:
+            lines.append(
+                f"{name:>22} {metric:>8} {old_value:>10} {new_value:>10} "
+                f"{delta(old_value, new_value):>8}"
+            )
+    return lines
+
+
+def run(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    args = parser.parse_args(argv)
+
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+    print("\n".join(compare(old, new)))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,283 @@
+"""
+Throughput / latency of POST /api/payment/v1/payments
+
+Examples:
+>>> python -m benchmarks.payments_bench                          # in-process (ASGI transport)
+>>> python -m benchmarks.payments_bench --target server          # real uvicorn server
+>>> python -m benchmarks.payments_bench --scenarios fresh,replay -n 5000 -c 100
+
+Results are saved as json in `benchmarks/results/`, compare two runs with
+>>> python -m benchmarks.compare old.json new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable
+
+# own database, before any app module reads the settings
+os.environ.setdefault("ASYNC_SQLITE_URI", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("IDEMPOTENCY_SWEEP_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from apps.payments.repositories import (  # noqa: E402
+    IdempotencyKeyRepo,
+    idempotency_cache,
+)
+from apps.payments.schemas import PaymentTransactionCreate  # noqa: E402
+from config.db import async_session_factory, dispose_db, get_async_engine  # noqa: E402
+
+PAYMENTS_URL = "/api/payment/v1/payments"
+RESULTS_DIR = Path(__file__).parent / "results"
+SCENARIOS = ("fresh", "replay", "concurrent_duplicates", "expired_reuse")
+
+Send = Callable[[httpx.AsyncClient, str], Awaitable[httpx.Response]]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], statuses: list[int], elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    status_counts: dict[str, int] = {}
+    for code in statuses:
+        status_counts[str(code)] = status_counts.get(str(code), 0) + 1
+
+    return {
+        "requests": len(statuses),
+        "elapsed_seconds": round(elapsed, 4),
+        "requests_per_second": round(len(statuses) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "status_codes": status_counts,
+    }
+
+
+async def reset_db() -> None:
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    idempotency_cache.clear()
+
+
+async def seed_keys(keys: list[str], expired: bool = False) -> None:
+    async with async_session_factory() as session:
+        repo = IdempotencyKeyRepo(session=session)
+        objs = []
+        for key in keys:
+            obj = repo.build_record(
+                payload=PaymentTransactionCreate(
+                    idempotency_id=key, request_data="bench"
+                ),
+                response_data="seeded",
+            )
+            if expired:
+                obj.expires_at = datetime.now() - timedelta(seconds=10)
+            objs.append(obj)
+        await repo.bulk_create(objs_in=objs, return_objects=False)
+    idempotency_cache.clear()
+
+
+async def post_payment(client: httpx.AsyncClient, key: str) -> httpx.Response:
+    return await client.post(
+        PAYMENTS_URL, json={"idempotency_id": key, "request_data": "bench"}
+    )
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    keys: list[str],
+    concurrency: int,
+    send: Send = post_payment,
+) -> dict:
+    """
+    Sends one request per key, at most `concurrency` in flight
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    statuses: list[int] = []
+
+    async def one(key: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await send(client, key)
+                statuses.append(response.status_code)
+            except httpx.HTTPError:
+                statuses.append(0)  # transport error
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(key) for key in keys))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def run_scenario(
+    name: str, client: httpx.AsyncClient, requests: int, concurrency: int
+) -> dict:
+    await reset_db()
+    run_id = uuid.uuid4().hex[:8]
+
+    if name == "fresh":
+        keys = [f"{run_id}-{i}" for i in range(requests)]
+    elif name == "replay":
+        # a small set of keys, replayed over and over
+        seeded = [f"{run_id}-{i}" for i in range(max(1, requests // 100))]
+        await seed_keys(seeded)
+        keys = [seeded[i % len(seeded)] for i in range(requests)]
+    elif name == "concurrent_duplicates":
+        # `concurrency` requests in flight share one key
+        keys = [f"{run_id}-{i // concurrency}" for i in range(requests)]
+    elif name == "expired_reuse":
+        keys = [f"{run_id}-{i}" for i in range(requests)]
+        await seed_keys(keys, expired=True)
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+
+    # warm up connections / caches of the app, not measured
+    await run_load(
+        client, [f"warmup-{run_id}-{i}" for i in range(concurrency)], concurrency
+    )
+    return await run_load(client, keys, concurrency)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/openapi.json")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> dict:
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    server = None
+
+    if args.target == "server":
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+                "--workers",
+                str(args.workers),
+            ],
+            env=os.environ.copy(),
+        )
+        transport = None
+    else:
+        from main import create_app
+
+        base_url = "http://bench"
+        transport = httpx.ASGITransport(create_app())
+
+    try:
+        if server is not None:
+            await reset_db()
+            await wait_until_up(base_url)
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            transport=transport, base_url=base_url, limits=limits, timeout=30
+        ) as client:
+            results = {}
+            for name in scenarios:
+                results[name] = await run_scenario(
+                    name, client, args.requests, args.concurrency
+                )
+                print(
+                    f"{name:>22}: {results[name]['requests_per_second']:>9} req/s  "
+                    f"p50 {results[name]['latency_ms']['p50']}ms  "
+                    f"p95 {results[name]['latency_ms']['p95']}ms  "
+                    f"p99 {results[name]['latency_ms']['p99']}ms  "
+                    f"{results[name]['status_codes']}"
+                )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        database = get_async_engine().url.render_as_string(hide_password=True)
+        await dispose_db()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": args.target,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "workers": args.workers if args.target == "server" else None,
+        "database": database,
+        "results": results,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--target", choices=("asgi", "server"), default="asgi")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (server)")
+    parser.add_argument("--output", type=Path, default=None, help="json file to write")
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(main(args))
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{report['commit'] or 'nogit'}-{args.target}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"saved {output}")
+
+
+if __name__ == "__main__":
+    run()
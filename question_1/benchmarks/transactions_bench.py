@@ -0,0 +1,196 @@
+"""
+Account history page latency: keyset cursor vs OFFSET, first page vs deep page
+
+Examples:
+>>> python -m benchmarks.transactions_bench                       # 1M rows, pages 1 and 50,000
+>>> python -m benchmarks.transactions_bench --transactions 100000 --pages 1,100,5000
+>>> DATABASE_BACKEND=postgres python -m benchmarks.transactions_bench
+
+The account is generated once (`scripts/generate_transactions.py`) and kept in
+`bench.db` between runs, `--regenerate` starts over.
+Results are saved as json in `benchmarks/results/`, like `payments_bench`
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+# own database, before any app module reads the settings
+os.environ.setdefault("ASYNC_SQLITE_URI", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("IDEMPOTENCY_SWEEP_ENABLED", "false")
+
+from fastapi_pagination.cursor import CursorParams  # noqa: E402
+from sqlmodel import SQLModel, delete, func, select  # noqa: E402
+
+from apps.transactions.models import Transaction  # noqa: E402
+from apps.transactions.repositories import TransactionRepo  # noqa: E402
+from benchmarks.payments_bench import RESULTS_DIR, git_commit, percentile  # noqa: E402
+from common.repository.base import encode_keyset_cursor  # noqa: E402
+from config.db import async_session_factory, dispose_db, get_async_engine  # noqa: E402
+from scripts.generate_transactions import generate  # noqa: E402
+
+BENCH_ACCOUNT = "BENCH-ACCOUNT"
+
+
+async def prepare(transactions: int, regenerate: bool) -> None:
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async with async_session_factory() as session:
+        query = select(func.count()).where(Transaction.account_number == BENCH_ACCOUNT)
+        count = (await session.exec(query)).one()
+        if count == transactions and not regenerate:
+            return
+        await session.exec(
+            delete(Transaction).where(Transaction.account_number == BENCH_ACCOUNT)
+        )
+        await session.commit()
+
+    started = time.perf_counter()
+    await generate([BENCH_ACCOUNT], transactions)
+    print(
+        f"generated {transactions} transactions in {time.perf_counter() - started:.1f}s"
+    )
+
+
+def history_query():
+    return select(Transaction).where(Transaction.account_number == BENCH_ACCOUNT)
+
+
+async def cursor_of_page(repo: TransactionRepo, page: int, size: int) -> str | None:
+    """
+    What a client holds after reading `page - 1` pages: the position of the last row
+    (found with OFFSET once, not measured)
+    """
+    if page == 1:
+        return None
+    query = (
+        history_query()
+        .order_by(Transaction.entry_date.desc(), Transaction.transaction_id.asc())
+        .offset((page - 1) * size - 1)
+        .limit(1)
+    )
+    last = (await repo.session.exec(query)).one()
+    return CursorParams().encode_cursor(
+        encode_keyset_cursor([last.entry_date, last.transaction_id])
+    )
+
+
+async def fetch_keyset(repo: TransactionRepo, cursor: str | None, size: int) -> list:
+    page = await repo.get_account_history(
+        account_number=BENCH_ACCOUNT, params=CursorParams(cursor=cursor, size=size)
+    )
+    return page.items
+
+
+async def fetch_offset(repo: TransactionRepo, page: int, size: int) -> list:
+    query = (
+        history_query()
+        .order_by(Transaction.entry_date.desc(), Transaction.transaction_id.asc())
+        .offset((page - 1) * size)
+        .limit(size)
+    )
+    return await repo.get_multi(query=query)
+
+
+def summarize(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "p50": round(percentile(latencies, 50) * 1000, 3),
+        "p95": round(percentile(latencies, 95) * 1000, 3),
+        "max": round(latencies[-1] * 1000, 3),
+    }
+
+
+async def measure(pages: list[int], size: int, repeat: int) -> dict:
+    results = {}
+    async with async_session_factory() as session:
+        repo = TransactionRepo(session=session)
+        for page in pages:
+            cursor = await cursor_of_page(repo, page, size)
+            fetches = {
+                "keyset": lambda: fetch_keyset(repo, cursor, size),
+                "offset": lambda: fetch_offset(repo, page, size),
+            }
+            rows = {}
+            for method, fetch in fetches.items():
+                rows[method] = await fetch()  # warm up
+                latencies = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    await fetch()
+                    latencies.append(time.perf_counter() - started)
+                results[f"{method}_page_{page}"] = summarize(latencies)
+
+            # both ways read the same rows
+            results[f"page_{page}_same_rows"] = [
+                row.transaction_id for row in rows["keyset"]
+            ] == [row.transaction_id for row in rows["offset"]]
+    return results
+
+
+async def main(args: argparse.Namespace) -> dict:
+    pages = [int(page) for page in args.pages.split(",")]
+    if max(pages) * args.page_size > args.transactions:
+        raise SystemExit(
+            f"page {max(pages)} is past the {args.transactions} transactions"
+        )
+
+    try:
+        await prepare(args.transactions, args.regenerate)
+        results = await measure(pages, args.page_size, args.repeat)
+    finally:
+        database = get_async_engine().url.render_as_string(hide_password=True)
+        await dispose_db()
+
+    for page in pages:
+        print(
+            f"page {page:>7}: keyset p50 {results[f'keyset_page_{page}']['p50']:>8}ms  "
+            f"offset p50 {results[f'offset_page_{page}']['p50']:>9}ms  "
+            f"same rows {results[f'page_{page}_same_rows']}"
+        )
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": "transactions",
+        "transactions": args.transactions,
+        "page_size": args.page_size,
+        "repeat": args.repeat,
+        "database": database,
+        "results": results,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--transactions", type=int, default=1_000_000, help="of the account"
+    )
+    parser.add_argument("--pages", default="1,50000", help="comma separated page numbers")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--output", type=Path, default=None, help="json file to write")
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(main(args))
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{report['commit'] or 'nogit'}-transactions.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"saved {output}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,190 @@
+"""
+Transfers under contention on a hot account: per-transfer row locks vs micro-batches
+
+Examples:
+>>> python -m benchmarks.transfers_bench
+>>> python -m benchmarks.transfers_bench -n 5000 -c 200 --accounts 100
+>>> DATABASE_BACKEND=postgres python -m benchmarks.transfers_bench   # real row locks
+
+Every transfer moves money between the hot account and one of `--accounts` others,
+both ways, and the total balance is checked after each run.
+Results are saved as json in `benchmarks/results/`, like `payments_bench`
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# own database, before any app module reads the settings
+os.environ.setdefault("ASYNC_SQLITE_URI", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("IDEMPOTENCY_SWEEP_ENABLED", "false")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlmodel import func, select  # noqa: E402
+
+from apps.accounts.models import Account  # noqa: E402
+from apps.accounts.repositories import AccountRepo, hot_account_cache  # noqa: E402
+from apps.accounts.schemas import TransferCreate  # noqa: E402
+from apps.accounts.services.batcher import TransferBatcher  # noqa: E402
+from apps.accounts.services.transfer_service import (  # noqa: E402
+    TransferService,
+    apply_transfer_batch,
+)
+from benchmarks.payments_bench import (  # noqa: E402
+    RESULTS_DIR,
+    git_commit,
+    reset_db,
+    summarize,
+)
+from config.db import async_session_factory, dispose_db, get_async_engine  # noqa: E402
+from config.settings import TransferHotAccountModeEnum  # noqa: E402
+
+HOT_ACCOUNT = "HOT"
+MODES = tuple(mode.value for mode in TransferHotAccountModeEnum)
+
+
+async def seed_accounts(accounts: int, balance: int) -> None:
+    async with async_session_factory() as session:
+        await AccountRepo(session=session).bulk_create(
+            objs_in=[
+                Account(account_number=HOT_ACCOUNT, balance=balance, is_hot=True),
+                *(
+                    Account(account_number=f"C{i}", balance=balance)
+                    for i in range(accounts)
+                ),
+            ],
+            return_objects=False,
+        )
+    hot_account_cache.clear()
+
+
+async def total_balance() -> int:
+    async with async_session_factory() as session:
+        response = await session.exec(select(func.sum(Account.balance)))
+        return response.one()
+
+
+async def run_mode(
+    mode: TransferHotAccountModeEnum, requests: int, concurrency: int, accounts: int
+) -> dict:
+    await reset_db()
+    await seed_accounts(accounts, balance=requests * 10)
+    expected_total = await total_balance()
+    run_id = uuid.uuid4().hex[:8]
+
+    batch_sizes: list[int] = []
+
+    async def apply(payloads):
+        batch_sizes.append(len(payloads))
+        return await apply_transfer_batch(payloads)
+
+    batcher = TransferBatcher(apply=apply)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    statuses: list[int] = []
+
+    async def one(i: int):
+        counterpart = f"C{i % accounts}"
+        source, destination = (
+            (HOT_ACCOUNT, counterpart) if i % 2 else (counterpart, HOT_ACCOUNT)
+        )
+        payload = TransferCreate(
+            idempotency_id=f"{run_id}-{i}",
+            from_account_number=source,
+            to_account_number=destination,
+            amount=1,
+        )
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with async_session_factory() as session:
+                    service = TransferService(session=session, mode=mode, batcher=batcher)
+                    await service.transfer(payload)
+                statuses.append(201)
+            except HTTPException as e:
+                statuses.append(e.status_code)
+            except Exception:
+                statuses.append(500)  # e.g. lock / pool timeout
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    result = summarize(latencies, statuses, time.perf_counter() - started)
+    await batcher.close()
+
+    result["batches"] = len(batch_sizes)
+    result["mean_batch_size"] = (
+        round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else None
+    )
+    result["balance_conserved"] = await total_balance() == expected_total
+    return result
+
+
+async def main(args: argparse.Namespace) -> dict:
+    modes = [
+        TransferHotAccountModeEnum(name.strip())
+        for name in args.modes.split(",")
+        if name.strip()
+    ]
+    results = {}
+    try:
+        for mode in modes:
+            result = await run_mode(mode, args.requests, args.concurrency, args.accounts)
+            results[mode.value] = result
+            print(
+                f"{mode.value:>10}: {result['requests_per_second']:>9} transfers/s  "
+                f"p50 {result['latency_ms']['p50']}ms  "
+                f"p95 {result['latency_ms']['p95']}ms  "
+                f"p99 {result['latency_ms']['p99']}ms  "
+                f"batches {result['batches']}  "
+                f"{result['status_codes']}  "
+                f"conserved {result['balance_conserved']}"
+            )
+    finally:
+        database = get_async_engine().url.render_as_string(hide_password=True)
+        await dispose_db()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": "transfers",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "accounts": args.accounts,
+        "database": database,
+        "results": results,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--accounts", type=int, default=50, help="counterparts of the hot account"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="json file to write")
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(main(args))
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{report['commit'] or 'nogit'}-transfers.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"saved {output}")
+
+
+if __name__ == "__main__":
+    run()
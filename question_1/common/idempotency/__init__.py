@@ -0,0 +1,2 @@
+from .middleware import *
+from .store import *
@@ -0,0 +1,246 @@
+"""
+`Idempotency-Key` header support for any opted-in POST route, at the ASGI level
+"""
+
+import json
+
+from fastapi.routing import APIRoute
+from prometheus_client import Counter
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.idempotency.store import ResponseStore, StoredResponse
+from common.utils.hashing import fingerprint
+from common.utils.singleflight import SingleFlight
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = b"idempotent-replayed"
+
+# `openapi_extra` of a route that honours the header, also documents it
+IDEMPOTENT_ROUTE = {
+    "x-idempotent": True,
+    "parameters": [
+        {
+            "name": IDEMPOTENCY_KEY_HEADER,
+            "in": "header",
+            "required": False,
+            "schema": {"type": "string"},
+        }
+    ],
+}
+
+# conflicts / rate limits are transient, the client is expected to retry them
+NOT_STORED_STATUS_CODES = {409, 429}
+
+IDEMPOTENT_RESPONSES = Counter(
+    "idempotent_responses_total",
+    "Requests with an Idempotency-Key header by outcome",
+    ["route", "outcome"],
+)
+
+# stored: ran and kept, not_stored: ran but not kept (5xx / 409 / 429),
+# replayed: answered from the store, conflict_timeout: in progress elsewhere for too long
+response_flight: SingleFlight[tuple[StoredResponse, str]] = SingleFlight()
+
+
+class IdempotencyMiddleware:
+    """
+    A POST with an `Idempotency-Key` header on a route declared with
+    `openapi_extra=IDEMPOTENT_ROUTE` runs once, its status, headers and body bytes are kept
+    for `ttl_seconds`. A retry is answered from the store before routing:
+    no dependencies, no session, no validation, no serialization.
+
+    * same key, other body: 422
+    * same key still in progress on another node: wait for it, 409 if it never finishes
+    * 5xx (and 409 / 429) responses are not stored, a retry runs the endpoint again
+    """
+
+    def __init__(self, app: ASGIApp, store: ResponseStore, ttl_seconds: float):
+        self.app = app
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._routes: list[APIRoute] | None = None
+
+    def idempotent_routes(self, scope: Scope) -> list[APIRoute]:
+        # found once, from the routes of the app
+        if self._routes is None:
+            self._routes = [
+                route
+                for route in scope["app"].routes
+                if isinstance(route, APIRoute)
+                and (route.openapi_extra or {}).get("x-idempotent")
+                and "POST" in route.methods
+            ]
+        return self._routes
+
+    def match(self, scope: Scope) -> APIRoute | None:
+        for route in self.idempotent_routes(scope):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        key = get_header(scope, IDEMPOTENCY_KEY_HEADER.lower().encode())
+        route = self.match(scope) if key else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        # the route label for metrics, the router is skipped on a replay
+        scope["route_path"] = route.path
+        body = await read_body(receive)
+        request_hash = fingerprint(body)
+        store_key = f"{scope['path']}:{key.decode('latin-1')}"
+
+        stored = await self.store.get(store_key)
+        if stored is not None:
+            outcome = "replayed"
+        else:
+            is_leader, (stored, outcome) = await response_flight.do(
+                store_key,
+                lambda: self.run_once(scope, receive, body, request_hash, store_key),
+            )
+            # concurrent duplicates get the leader's response, replayed only if it was kept
+            if not is_leader and outcome == "stored":
+                outcome = "replayed"
+
+        if stored.request_hash != request_hash:
+            outcome = "mismatch"
+            stored = error_response(
+                422, "Idempotency key was already used with a different request"
+            )
+        elif outcome == "replayed":
+            stored = StoredResponse(
+                status_code=stored.status_code,
+                headers=[*stored.headers, (REPLAYED_HEADER, b"true")],
+                body=stored.body,
+                request_hash=stored.request_hash,
+            )
+
+        IDEMPOTENT_RESPONSES.labels(route.path, outcome).inc()
+        await send_response(send, stored)
+
+    async def run_once(
+        self,
+        scope: Scope,
+        receive: Receive,
+        body: bytes,
+        request_hash: str,
+        store_key: str,
+    ) -> tuple[StoredResponse, str]:
+        """
+        Returns the response and its outcome
+        """
+        # another node is processing this key, wait for its response
+        lock_token = await self.store.acquire(store_key)
+        if lock_token is None:
+            stored = await self.store.wait(store_key)
+            if stored is None:
+                response = error_response(
+                    409,
+                    "A request with this idempotency key is in progress",
+                    request_hash,
+                )
+                return response, "conflict_timeout"
+            return stored, "replayed"
+
+        try:
+            response = await self.call_app(scope, receive, body, request_hash)
+            outcome = "not_stored"
+            if (
+                response.status_code < 500
+                and response.status_code not in NOT_STORED_STATUS_CODES
+            ):
+                await self.store.set(store_key, response, ttl=self.ttl_seconds)
+                outcome = "stored"
+        finally:
+            await self.store.release(store_key, lock_token)
+        return response, outcome
+
+    async def call_app(
+        self, scope: Scope, receive: Receive, body: bytes, request_hash: str
+    ) -> StoredResponse:
+        """
+        Run the app with the already read body, keep what it sends
+        """
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # body already read, only a disconnect can come from the client now
+            return await receive()
+
+        status_code = 500
+        headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    (bytes(name), bytes(value)) for name, value in message["headers"]
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, replay_receive, capture_send)
+        return StoredResponse(
+            status_code=status_code,
+            headers=headers,
+            body=b"".join(chunks),
+            request_hash=request_hash,
+        )
+
+
+def get_header(scope: Scope, name: bytes) -> bytes | None:
+    for header_name, value in scope["headers"]:
+        if header_name == name:
+            return value
+    return None
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def error_response(
+    status_code: int, detail: str, request_hash: str = ""
+) -> StoredResponse:
+    body = json.dumps({"detail": detail}).encode()
+    return StoredResponse(
+        status_code=status_code,
+        headers=[
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        body=body,
+        request_hash=request_hash,
+    )
+
+
+async def send_response(send: Send, response: StoredResponse) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": response.headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": response.body})
@@ -0,0 +1,178 @@
+"""
+Where the idempotency middleware keeps raw responses
+"""
+
+import asyncio
+import json
+import time
+from typing import TYPE_CHECKING, Protocol
+
+from pydantic import BaseModel
+
+from common.utils.cache import TTLCache
+from common.utils.redis_lock import RedisLock
+
+if TYPE_CHECKING:
+    # redis is only imported when a redis store is used
+    from redis.asyncio import Redis
+
+
+class StoredResponse(BaseModel):
+    """
+    A response exactly as it was sent, replayed byte for byte
+    """
+
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    request_hash: str
+
+
+class ResponseStore(Protocol):
+    async def get(self, key: str) -> StoredResponse | None: ...
+
+    async def set(self, key: str, response: StoredResponse, ttl: float) -> None: ...
+
+    async def acquire(self, key: str) -> str | None:
+        """
+        Take the "in progress" marker for `key`.
+        Returns the holder's token, None if someone else holds it
+        """
+        ...
+
+    async def release(self, key: str, token: str) -> None:
+        """
+        Free the marker, only if `token` still holds it
+        """
+        ...
+
+    async def wait(self, key: str) -> StoredResponse | None:
+        """
+        Wait for the holder of the marker to store its response, None on timeout
+        """
+        ...
+
+
+class MemoryResponseStore:
+    """
+    Per worker, no extra infrastructure. Other workers do not see the responses,
+    they fall back to the endpoint's own idempotency handling.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        wait_seconds: float = 5,
+        poll_seconds: float = 0.01,
+    ):
+        self.cache: TTLCache[StoredResponse] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._locks: set[str] = set()
+
+    async def get(self, key: str) -> StoredResponse | None:
+        return self.cache.get(key)
+
+    async def set(self, key: str, response: StoredResponse, ttl: float) -> None:
+        self.cache.set(key, response, ttl=ttl)
+
+    async def acquire(self, key: str) -> str | None:
+        if key in self._locks:
+            return None
+        self._locks.add(key)
+        return key
+
+    async def release(self, key: str, token: str) -> None:
+        self._locks.discard(key)
+
+    async def wait(self, key: str) -> StoredResponse | None:
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            response = self.cache.get(key, count=False)
+            if response is not None or key not in self._locks:
+                return response
+            await asyncio.sleep(self.poll_seconds)
+        return None
+
+
+class RedisResponseStore:
+    """
+    Shared between all nodes:
+    * `{prefix}:{key}` hash with status / headers / body / request_hash, expires with the key
+    * `{prefix}:lock:{key}` is the "in progress" marker (`RedisLock`)
+    """
+
+    def __init__(
+        self,
+        client: "Redis",
+        prefix: str = "idempotency:response",
+        lock_ttl_ms: int = 10_000,
+        wait_seconds: float = 5,
+        poll_seconds: float = 0.01,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.lock = RedisLock(client, ttl_ms=lock_ttl_ms)
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+
+    def response_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def lock_key(self, key: str) -> str:
+        return f"{self.prefix}:lock:{key}"
+
+    async def get(self, key: str) -> StoredResponse | None:
+        value = await self.client.hgetall(self.response_key(key))
+        if not value:
+            return None
+        return StoredResponse(
+            status_code=int(value[b"status_code"]),
+            headers=[
+                (name.encode("latin-1"), header.encode("latin-1"))
+                for name, header in json.loads(value[b"headers"])
+            ],
+            body=value[b"body"],
+            request_hash=value[b"request_hash"].decode(),
+        )
+
+    async def set(self, key: str, response: StoredResponse, ttl: float) -> None:
+        ttl_ms = int(ttl * 1000)
+        if ttl_ms <= 0:
+            return
+
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response.headers
+        ]
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self.response_key(key),
+                mapping={
+                    "status_code": response.status_code,
+                    "headers": json.dumps(headers),
+                    "body": response.body,
+                    "request_hash": response.request_hash,
+                },
+            )
+            pipe.pexpire(self.response_key(key), ttl_ms)
+            await pipe.execute()
+
+    async def acquire(self, key: str) -> str | None:
+        return await self.lock.acquire(self.lock_key(key))
+
+    async def release(self, key: str, token: str) -> None:
+        await self.lock.release(self.lock_key(key), token)
+
+    async def wait(self, key: str) -> StoredResponse | None:
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            response = await self.get(key)
+            if response is not None:
+                return response
+            # holder gave up (error or lock expired) without storing a response
+            if not await self.lock.is_locked(self.lock_key(key)):
+                return None
+            await asyncio.sleep(self.poll_seconds)
+        return None
@@ -1,16 +1,23 @@
-from typing import Any, Generic, Optional, Sequence, TypeVar
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Generic, Optional, Sequence, Tuple, TypeVar
 from uuid import UUID
 
 from fastapi import HTTPException, status
 from fastapi_pagination import Page, Params
-from fastapi_pagination.ext.sqlmodel import paginate
+from fastapi_pagination.cursor import CursorPage, CursorParams
 from pydantic import BaseModel
-from sqlalchemy import exc
+from sqlalchemy import Column, and_, exc, insert, or_, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import SQLModel, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
 
-from common.schemas.enums import OrderEnum
+from common.repository.routing import on_replica
+from common.schemas.enums import CountStrategyEnum, OrderEnum
+from common.utils.cache import TTLCache
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -18,6 +25,80 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 SchemaType = TypeVar("SchemaType", bound=BaseModel)
 T = TypeVar("T", bound=SQLModel)
 
+# totals for CountStrategyEnum.cached, per table / query
+COUNT_CACHE_TTL_SECONDS = 10
+count_cache: TTLCache[int] = TTLCache(maxsize=1024, ttl=COUNT_CACHE_TTL_SECONDS)
+os.register_at_fork(after_in_child=count_cache.clear)
+
+
+def encode_keyset_cursor(values: Sequence[Any]) -> str:
+    """
+    Opaque (to the client) cursor, values of the order by column(s) of the last row
+    """
+    return json.dumps(
+        [
+            value.isoformat() if isinstance(value, (date, datetime)) else value
+            for value in values
+        ],
+        default=str,
+    )
+
+
+def decode_keyset_cursor(cursor: str, columns: Sequence[Column]) -> list[Any]:
+    try:
+        raw_values = json.loads(cursor)
+        if not isinstance(raw_values, list) or len(raw_values) != len(columns):
+            raise ValueError
+
+        values = []
+        for column, value in zip(columns, raw_values):
+            # only what encode_keyset_cursor writes, never a list / object into SQL
+            if not isinstance(value, (str, int, float, bool, type(None))):
+                raise ValueError
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:  # e.g. custom types, use value as is
+                python_type = object
+            if value is None or isinstance(value, python_type):
+                values.append(value)
+            elif python_type in (datetime, date):
+                values.append(python_type.fromisoformat(value))
+            elif python_type in (Decimal, UUID, int, float):
+                values.append(python_type(value))
+            else:
+                values.append(value)
+        return values
+    # ArithmeticError: decimal.InvalidOperation, e.g. Decimal("abc")
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor value",
+        )
+
+
+def get_keyset_clause(
+    keys: Sequence[Column], orders: Sequence[OrderEnum], values: Sequence[Any]
+):
+    """
+    Rows after `values` in the `keys` / `orders` ordering
+    """
+    if len(set(orders)) == 1:
+        if orders[0] == OrderEnum.desc:
+            return tuple_(*keys) < tuple_(*values)
+        return tuple_(*keys) > tuple_(*values)
+
+    # mixed directions are not one row value comparison. The first key bounds
+    # the index range, the second one breaks the tie
+    (key, tie_key), (order, tie_order), (value, tie_value) = keys, orders, values
+    if order == OrderEnum.desc:
+        bound, after = key <= value, key < value
+    else:
+        bound, after = key >= value, key > value
+    tie_after = (
+        tie_key < tie_value if tie_order == OrderEnum.desc else tie_key > tie_value
+    )
+    return and_(bound, or_(after, tie_after))
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
@@ -34,12 +115,28 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
         self.session = session
 
+    @property
+    def pk_column(self) -> Column:
+        return list(self.model.__table__.primary_key.columns)[0]
+
+    def get_insert(self, db_session: AsyncSession | None = None):
+        """
+        Dialect specific `INSERT` for the model, with `on_conflict_do_*` support
+        """
+        db_session = db_session or self.session
+        dialect = db_session.bind.dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(self.model)
+        if dialect == "sqlite":
+            return sqlite.insert(self.model)
+        raise NotImplementedError(f"Upsert is not supported for {dialect}")
+
     async def get(
         self, *, id: UUID | str, db_session: AsyncSession | None = None
     ) -> ModelType | None:
         db_session = db_session or self.session
-        query = select(self.model).where(self.model.id == id)
-        response = await db_session.exec(query)
+        query = select(self.model).where(self.pk_column == id)
+        response = await db_session.exec(on_replica(query))
         return response.one_or_none()
 
     async def get_by_ids(
@@ -50,16 +147,84 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> list[ModelType] | None:
         db_session = db_session or self.session
         response = await db_session.exec(
-            select(self.model).where(self.model.id.in_(list_ids))
+            on_replica(select(self.model).where(self.pk_column.in_(list_ids)))
         )
         return response.all()
 
-    async def get_count(self, db_session: AsyncSession | None = None) -> ModelType | None:
+    async def get_count(
+        self,
+        db_session: AsyncSession | None = None,
+        *,
+        strategy: CountStrategyEnum | None = CountStrategyEnum.exact,
+        query: T | Select[T] | None = None,
+    ) -> int | None:
+        """
+        * `exact`: `COUNT(*)`, a full scan on big tables
+        * `cached`: `exact`, kept `COUNT_CACHE_TTL_SECONDS` in-process
+        * `estimated`: row count from planner statistics (`pg_class.reltuples` on
+          postgres, `sqlite_stat1` after `ANALYZE` on sqlite), whole table only.
+          Falls back to `exact` when there is no statistics or a `query` is given
+        * `none`: no count, returns None
+        """
         db_session = db_session or self.session
-        response = await db_session.exec(
-            select(func.count()).select_from(select(self.model).subquery())
+        if strategy == CountStrategyEnum.none:
+            return None
+
+        if strategy == CountStrategyEnum.estimated and query is None:
+            estimated = await self.get_estimated_count(db_session=db_session)
+            if estimated is not None:
+                return estimated
+
+        if query is None:
+            query = select(self.model)
+        count_query = on_replica(
+            select(func.count()).select_from(query.order_by(None).subquery())
         )
-        return response.one()
+
+        if strategy != CountStrategyEnum.cached:
+            response = await db_session.exec(count_query)
+            return response.one()
+
+        compiled = count_query.compile(dialect=db_session.bind.dialect)
+        cache_key = (str(compiled), repr(sorted(compiled.params.items())))
+        count = count_cache.get(cache_key)
+        if count is None:
+            response = await db_session.exec(count_query)
+            count = response.one()
+            count_cache.set(cache_key, count)
+        return count
+
+    async def get_estimated_count(
+        self, db_session: AsyncSession | None = None
+    ) -> int | None:
+        """
+        None when the database has no statistics for the table yet
+        """
+        db_session = db_session or self.session
+        dialect = db_session.bind.dialect.name
+        if dialect == "postgresql":
+            query = text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+            )
+        elif dialect == "sqlite":
+            query = text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table LIMIT 1")
+        else:
+            return None
+
+        try:
+            response = await db_session.exec(
+                on_replica(query), params={"table": self.model.__tablename__}
+            )
+            value = response.scalar()
+        except exc.OperationalError:
+            # sqlite_stat1 only exists after the first ANALYZE
+            return None
+
+        if value is None:
+            return None
+        # sqlite: "<rows> <rows per index key>...", postgres: -1 when never analyzed
+        count = int(str(value).split()[0])
+        return count if count >= 0 else None
 
     async def get_multi(
         self,
@@ -71,22 +236,80 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> list[ModelType]:
         db_session = db_session or self.session
         if query is None:
-            query = select(self.model).offset(skip).limit(limit).order_by(self.model.id)
-        response = await db_session.exec(query)
+            query = select(self.model).offset(skip).limit(limit).order_by(self.pk_column)
+        response = await db_session.exec(on_replica(query))
         return response.all()
 
+    async def stream(
+        self,
+        *,
+        query: T | Select[T] | None = None,
+        fetch_size: int = 1000,
+        db_session: AsyncSession | None = None,
+    ) -> AsyncIterator[ModelType]:
+        """
+        Rows one by one from a server-side cursor, `fetch_size` rows per round trip,
+        instead of `.all()`: memory stays flat whatever the table size.
+        The session's connection is busy until the iteration ends
+        """
+        db_session = db_session or self.session
+        if query is None:
+            query = select(self.model).order_by(self.pk_column)
+        response = await db_session.stream_scalars(
+            on_replica(query).execution_options(yield_per=fetch_size)
+        )
+        async for obj in response:
+            yield obj
+
+    async def paginate(
+        self,
+        *,
+        query: T | Select[T],
+        params: Params,
+        count_strategy: CountStrategyEnum | None = CountStrategyEnum.exact,
+        db_session: AsyncSession | None = None,
+    ) -> Page[ModelType]:
+        """
+        fastapi_pagination `Page`, the total comes from `get_count`
+        with `count_strategy` (`none`: page without total / pages).
+        Both queries may run on a replica
+        """
+        db_session = db_session or self.session
+        # the estimate is the whole table's, a filtered query is counted exactly
+        is_estimated = (
+            count_strategy == CountStrategyEnum.estimated
+            and query.whereclause is None
+            and query.get_final_froms() == [self.model.__table__]
+        )
+        total = await self.get_count(
+            strategy=count_strategy or CountStrategyEnum.exact,
+            query=None if is_estimated else query,
+            db_session=db_session,
+        )
+        raw_params = params.to_raw_params()
+        response = await db_session.exec(
+            on_replica(query.offset(raw_params.offset).limit(raw_params.limit))
+        )
+        return Page.create(response.all(), params, total=total)
+
     async def get_multi_paginated(
         self,
         *,
         params: Params | None = Params(),
         query: T | Select[T] | None = None,
+        count_strategy: CountStrategyEnum | None = CountStrategyEnum.exact,
         db_session: AsyncSession | None = None,
     ) -> Page[ModelType]:
         db_session = db_session or self.session
         if query is None:
             query = select(self.model)
 
-        output = await paginate(db_session, query, params)
+        output = await self.paginate(
+            query=query,
+            params=params,
+            count_strategy=count_strategy,
+            db_session=db_session,
+        )
         return output
 
     async def get_multi_paginated_ordered(
@@ -96,13 +319,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         order_by: str | None = None,
         order: OrderEnum | None = OrderEnum.asc,
         query: T | Select[T] | None = None,
+        count_strategy: CountStrategyEnum | None = CountStrategyEnum.exact,
         db_session: AsyncSession | None = None,
     ) -> Page[ModelType]:
         db_session = db_session or self.session
         columns = self.model.__table__.columns
 
         if order_by is None or order_by not in columns:
-            order_by = "id"
+            order_by = self.pk_column.name
 
         if query is None:
             if order == OrderEnum.asc:
@@ -110,7 +334,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             else:
                 query = select(self.model).order_by(columns[order_by].desc())
 
-        return await paginate(db_session, query, params)
+        return await self.paginate(
+            query=query,
+            params=params,
+            count_strategy=count_strategy,
+            db_session=db_session,
+        )
 
     async def get_multi_ordered(
         self,
@@ -125,7 +354,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         columns = self.model.__table__.columns
 
         if order_by is None or order_by not in columns:
-            order_by = "id"
+            order_by = self.pk_column.name
 
         if order == OrderEnum.asc:
             query = (
@@ -142,9 +371,103 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 .order_by(columns[order_by].desc())
             )
 
-        response = await db_session.exec(query)
+        response = await db_session.exec(on_replica(query))
         return response.all()
 
+    async def get_multi_cursor_ordered(
+        self,
+        *,
+        cursor: str | None = None,
+        limit: int = 100,
+        order_by: str | None = None,
+        order: OrderEnum | None = OrderEnum.asc,
+        pk_order: OrderEnum | None = None,
+        query: T | Select[T] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> Tuple[list[ModelType], str | None]:
+        """
+        Keyset (seek) pagination: instead of `OFFSET`, continue after the last row
+        with `WHERE (order_by, pk) > (:last_order_by, :last_pk)`.
+        Cost per page does not depend on how deep the page is
+        (with an index on `(order_by, pk)`). `order_by` column should not be nullable.
+
+        `pk_order`: direction of the tie breaker, `order` by default. Set it to match
+        an index like `(order_by DESC, pk)`, the seek is then
+        `order_by <= :last AND (order_by < :last OR pk > :last_pk)`.
+
+        `query` may add filters, ordering and limit are added here.
+
+        Returns items, next_cursor (None on the last page)
+        """
+        db_session = db_session or self.session
+        columns = self.model.__table__.columns
+        pk_column = self.pk_column
+
+        if order_by is None or order_by not in columns:
+            order_by = pk_column.name
+
+        keys = [columns[order_by]]
+        orders = [order]
+        if columns[order_by] is not pk_column:
+            keys.append(pk_column)  # tie breaker, makes the position unique
+            orders.append(pk_order or order)
+
+        if query is None:
+            query = select(self.model)
+
+        if cursor:
+            values = decode_keyset_cursor(cursor, keys)
+            query = query.where(get_keyset_clause(keys, orders, values))
+
+        query = query.order_by(
+            *(
+                key.desc() if key_order == OrderEnum.desc else key.asc()
+                for key, key_order in zip(keys, orders)
+            )
+        )
+
+        # one extra row tells whether there is a next page
+        response = await db_session.exec(on_replica(query.limit(limit + 1)))
+        items = response.all()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_keyset_cursor([getattr(last, key.name) for key in keys])
+        return items, next_cursor
+
+    async def get_multi_cursor_paginated_ordered(
+        self,
+        *,
+        params: CursorParams | None = CursorParams(),
+        order_by: str | None = None,
+        order: OrderEnum | None = OrderEnum.asc,
+        pk_order: OrderEnum | None = None,
+        query: T | Select[T] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> CursorPage[ModelType]:
+        """
+        `get_multi_cursor_ordered` as a fastapi_pagination `CursorPage`,
+        alternative to `get_multi_paginated_ordered`
+        """
+        raw_params = params.to_raw_params()
+        items, next_cursor = await self.get_multi_cursor_ordered(
+            cursor=raw_params.cursor,
+            limit=raw_params.size,
+            order_by=order_by,
+            order=order,
+            pk_order=pk_order,
+            query=query,
+            db_session=db_session,
+        )
+        return CursorPage.create(
+            items,
+            params,
+            current=raw_params.cursor,
+            next_=next_cursor,
+        )
+
     async def create(
         self,
         *,
@@ -177,31 +500,76 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         *,
         objs_in: Sequence[CreateSchemaType | ModelType],
         created_by_id: UUID | str | None = None,
+        chunk_size: int = 1000,
+        return_objects: bool = True,
         db_session: AsyncSession | None = None,
-    ):
-        db_session = db_session or self.session
-
-        # case there is created-by-id Field
-        db_objects = []
-        for obj_in in objs_in:
-            db_obj = self.model.model_validate(obj_in)  # type: ignore
-            if created_by_id:
-                db_obj.created_by_id = created_by_id
-            db_objects.append(db_obj)
+    ) -> list[ModelType] | list[Any]:
+        """
+        One multi-row `INSERT ... RETURNING` (and one commit) per `chunk_size` rows,
+        no refresh per object.
+        A failing chunk is rolled back, the chunks before it stay committed.
 
-        try:
-            db_session.add_all(db_objects)
-            await db_session.commit()
-        except exc.IntegrityError:
-            await db_session.rollback()
-            raise HTTPException(
-                status_code=409,
-                detail="Resource already exists",
-            )
+        `return_objects=False` skips building ORM objects and returns
+        the primary keys only (tuples for a composite key)
+        """
+        db_session = db_session or self.session
+        table = self.model.__table__
+        pk_columns = list(table.primary_key.columns)
 
-        for obj in db_objects:
-            await db_session.refresh(obj)
-        return db_objects
+        # rows come back in parameter order, each one is put back at its own index
+        if return_objects:
+            stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        else:
+            stmt = insert(table).returning(*pk_columns, sort_by_parameter_order=True)
+
+        results = []
+        for start in range(0, len(objs_in), chunk_size):
+            rows = []
+            for obj_in in objs_in[start : start + chunk_size]:
+                # model instances already have their defaults (ids, timestamps),
+                # validating them again is the slowest part of a big import
+                if isinstance(obj_in, self.model):
+                    db_obj = obj_in
+                else:
+                    db_obj = self.model.model_validate(obj_in)  # type: ignore
+                row = db_obj.model_dump()
+                # case there is created-by-id Field
+                if created_by_id:
+                    row["created_by_id"] = created_by_id
+                for column in pk_columns:
+                    # let the db generate autoincrement keys
+                    if row.get(column.name) is None:
+                        row.pop(column.name, None)
+                rows.append(row)
+
+            # an executemany needs the same columns in every row: rows with and without
+            # a generated key are inserted separately
+            groups: dict[tuple[str, ...], list[int]] = {}
+            for index, row in enumerate(rows):
+                groups.setdefault(tuple(row), []).append(index)
+
+            chunk_results: list[Any] = [None] * len(rows)
+            try:
+                for indexes in groups.values():
+                    response = await db_session.exec(
+                        stmt, params=[rows[index] for index in indexes]
+                    )
+                    if return_objects or len(pk_columns) == 1:
+                        values = response.scalars().all()
+                    else:
+                        values = [tuple(row) for row in response.all()]
+                    for index, value in zip(indexes, values):
+                        chunk_results[index] = value
+                await db_session.commit()
+                results += chunk_results
+            except exc.IntegrityError:
+                await db_session.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail="Resource already exists",
+                )
+
+        return results
 
     async def update(
         self,
@@ -236,7 +604,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self, *, id: UUID | str, db_session: AsyncSession | None = None
     ) -> ModelType:
         db_session = db_session or self.session
-        response = await db_session.exec(select(self.model).where(self.model.id == id))
+        response = await db_session.exec(select(self.model).where(self.pk_column == id))
         obj = response.one_or_none()
         if not obj:
             raise HTTPException(
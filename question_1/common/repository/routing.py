@@ -0,0 +1,54 @@
+"""
+Read / write splitting: marked SELECTs go to a replica, everything else to the primary
+"""
+
+import random
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlalchemy.sql import Executable, Select
+from sqlmodel import Session
+
+# execution option of a statement that may be answered by a replica
+READ_REPLICA_OPTION = "read_replica"
+
+
+def on_replica(query: Executable) -> Executable:
+    """
+    Allow `query` to run on a replica, it then may see data a little behind the primary
+    """
+    return query.execution_options(**{READ_REPLICA_OPTION: True})
+
+
+class RoutingSession(Session):
+    """
+    Sync session behind `AsyncSession(sync_session_class=RoutingSession)`.
+    The primary is the session `bind`, replica engines are given in `info["replicas"]`.
+
+    * statements marked with `on_replica` run on one replica (picked once per session)
+    * everything else (writes, flush, refresh, unmarked reads) runs on the primary
+    * read-your-writes: once the session wrote, all its statements stay on the primary
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.has_written = False
+        replicas = self.info.get("replicas") or []
+        self.replica: Engine | None = random.choice(replicas) if replicas else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs: Any):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.replica is None or self.has_written:
+            return primary
+
+        if self._flushing:
+            self.has_written = True
+            return primary
+
+        if clause is not None and clause.get_execution_options().get(READ_REPLICA_OPTION):
+            return self.replica
+
+        if not isinstance(clause, Select):
+            # DML, DDL or raw sql: may write
+            self.has_written = True
+        return primary
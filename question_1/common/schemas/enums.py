@@ -4,3 +4,10 @@ from enum import Enum
 class OrderEnum(str, Enum):
     asc = "asc"
     desc = "desc"
+
+
+class CountStrategyEnum(str, Enum):
+    exact = "exact"  # COUNT(*)
+    cached = "cached"  # COUNT(*), reused for a few seconds
+    estimated = "estimated"  # planner statistics, falls back to exact
+    none = "none"  # no total at all
@@ -0,0 +1,58 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from apps.transactions.models import Transaction
+from common.repository.base import CRUDBase
+
+
+class RecordingSession:
+    """
+    Keeps the parameters of each INSERT, returns the given keys (or a generated one)
+    """
+
+    def __init__(self):
+        self.inserts: list[list[dict]] = []
+
+    async def exec(self, stmt, params):
+        self.inserts.append(params)
+        response = MagicMock()
+        response.scalars.return_value.all.return_value = [
+            row.get("transaction_id", "generated") for row in params
+        ]
+        return response
+
+    async def commit(self):
+        pass
+
+
+class TestBulkCreate:
+    @pytest.mark.asyncio
+    async def test_rows_with_and_without_key_are_inserted_separately(self):
+        ids = [uuid.uuid4(), uuid.uuid4()]
+        rows = [
+            Transaction(
+                transaction_id=transaction_id,
+                account_number="A",
+                transaction_amount=Decimal("1"),
+                transaction_type="credit",
+                booking_date=date(2025, 1, 1),
+            )
+            for transaction_id in (ids[0], None, ids[1])
+        ]
+        session = RecordingSession()
+
+        keys = await CRUDBase(Transaction, session=session).bulk_create(
+            objs_in=rows, return_objects=False
+        )
+
+        # same columns in every row of an executemany
+        assert [len({tuple(row) for row in params}) for params in session.inserts] == [
+            1,
+            1,
+        ]
+        # in the order of `objs_in`
+        assert keys == [ids[0], "generated", ids[1]]
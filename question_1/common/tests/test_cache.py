@@ -0,0 +1,50 @@
+import time
+
+from common.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_hit_and_miss_callbacks(self):
+        calls = []
+        cache = TTLCache(
+            maxsize=2,
+            ttl=10,
+            on_hit=lambda: calls.append("hit"),
+            on_miss=lambda: calls.append("miss"),
+        )
+        cache.set("a", 1)
+
+        cache.get("a")
+        cache.get("b")
+        assert "a" in cache  # not counted
+        assert calls == ["hit", "miss"]
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now the oldest
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_entry_ttl(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1, ttl=0.01)
+        cache.set("b", 2, ttl=-1)  # already expired, not cached
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert len(cache) == 0
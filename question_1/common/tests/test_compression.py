@@ -0,0 +1,32 @@
+import pytest
+
+from common.utils.compression import RAW_HEADER, ZLIB_HEADER, compress, decompress
+
+
+class TestCompression:
+    def test_compress_above_min_size(self):
+        data = b"payment " * 200
+
+        compressed = compress(data, "zlib", min_size=512)
+
+        assert compressed.startswith(ZLIB_HEADER)
+        assert len(compressed) < len(data)
+        assert decompress(compressed) == data
+
+    def test_small_or_disabled_stored_as_is(self):
+        data = b"payment " * 10
+
+        assert compress(data, "zlib", min_size=512) == data
+        assert compress(data * 100, None) == data * 100
+        assert decompress(data) == data
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            compress(b"payment", "lz4")
+
+    @pytest.mark.parametrize("data", [b"\x00z", b"\x00s payment", b"\x00r", b"\x00"])
+    def test_leading_nul_stored_as_is(self, data):
+        stored = compress(data, "zlib", min_size=512)
+
+        assert stored == RAW_HEADER + data
+        assert decompress(stored) == data
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi import FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from common.idempotency import (
+    IDEMPOTENT_ROUTE,
+    IdempotencyMiddleware,
+    MemoryResponseStore,
+    RedisResponseStore,
+    StoredResponse,
+)
+
+
+def make_app(calls: list, store: MemoryResponseStore | None = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/orders", status_code=201, openapi_extra=IDEMPOTENT_ROUTE)
+    async def create_order(order: dict):
+        calls.append(order)
+        await asyncio.sleep(0.01)
+        if order.get("fail"):
+            raise HTTPException(status_code=503)
+        return {"id": len(calls)}
+
+    @app.post("/other")
+    async def other():
+        calls.append(None)
+        return {}
+
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=store or MemoryResponseStore(maxsize=10, ttl=10),
+        ttl_seconds=10,
+    )
+    return app
+
+
+class TestIdempotencyMiddleware:
+    @pytest.mark.asyncio
+    async def test_replays_stored_response(self):
+        calls = []
+        async with AsyncClient(
+            transport=ASGITransport(make_app(calls)), base_url="http://test"
+        ) as ac:
+            headers = {"Idempotency-Key": "1"}
+            first = await ac.post("/orders", json={"item": "a"}, headers=headers)
+            second = await ac.post("/orders", json={"item": "a"}, headers=headers)
+            other_body = await ac.post("/orders", json={"item": "b"}, headers=headers)
+            no_header = await ac.post("/orders", json={"item": "a"})
+
+        assert first.status_code == second.status_code == 201
+        assert second.content == first.content
+        assert "idempotent-replayed" not in first.headers
+        assert second.headers["idempotent-replayed"] == "true"
+        assert other_body.status_code == 422
+        assert no_header.status_code == 201
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_run_once(self):
+        calls = []
+        async with AsyncClient(
+            transport=ASGITransport(make_app(calls)), base_url="http://test"
+        ) as ac:
+            responses = await asyncio.gather(
+                *(
+                    ac.post(
+                        "/orders", json={"item": "a"}, headers={"Idempotency-Key": "1"}
+                    )
+                    for _ in range(5)
+                )
+            )
+
+        assert len(calls) == 1
+        assert {res.content for res in responses} == {responses[0].content}
+
+    @pytest.mark.asyncio
+    async def test_server_errors_and_other_routes_are_not_stored(self):
+        calls = []
+        async with AsyncClient(
+            transport=ASGITransport(make_app(calls)), base_url="http://test"
+        ) as ac:
+            headers = {"Idempotency-Key": "1"}
+            for _ in range(2):
+                assert (
+                    await ac.post("/orders", json={"fail": True}, headers=headers)
+                ).status_code == 503
+                assert (await ac.post("/other", headers=headers)).status_code == 200
+
+        assert len(calls) == 4
+
+    @pytest.mark.asyncio
+    async def test_concurrent_server_error_is_not_marked_replayed(self):
+        calls = []
+        async with AsyncClient(
+            transport=ASGITransport(make_app(calls)), base_url="http://test"
+        ) as ac:
+            responses = await asyncio.gather(
+                *(
+                    ac.post(
+                        "/orders", json={"fail": True}, headers={"Idempotency-Key": "1"}
+                    )
+                    for _ in range(5)
+                )
+            )
+
+        assert len(calls) == 1
+        assert {res.status_code for res in responses} == {503}
+        assert all("idempotent-replayed" not in res.headers for res in responses)
+
+    @pytest.mark.asyncio
+    async def test_in_progress_elsewhere_times_out_with_conflict(self):
+        def conflict_timeouts() -> float:
+            labels = {"route": "/orders", "outcome": "conflict_timeout"}
+            return REGISTRY.get_sample_value("idempotent_responses_total", labels) or 0.0
+
+        calls = []
+        store = MemoryResponseStore(maxsize=10, ttl=10, wait_seconds=0.05)
+        # held by a request that never finishes
+        await store.acquire("/orders:1")
+        before = conflict_timeouts()
+        async with AsyncClient(
+            transport=ASGITransport(make_app(calls, store)), base_url="http://test"
+        ) as ac:
+            res = await ac.post(
+                "/orders", json={"item": "a"}, headers={"Idempotency-Key": "1"}
+            )
+
+        assert res.status_code == 409
+        assert "idempotent-replayed" not in res.headers
+        assert calls == []
+        assert conflict_timeouts() == before + 1
+
+
+class TestRedisResponseStore:
+    @pytest.mark.asyncio
+    async def test_set_and_get(self):
+        store = RedisResponseStore(client=FakeAsyncRedis(server=FakeServer()))
+        response = StoredResponse(
+            status_code=201,
+            headers=[(b"content-type", b"application/json")],
+            body=b'{"id": 1}',
+            request_hash="hash",
+        )
+        await store.set("1", response, ttl=10)
+
+        assert await store.get("1") == response
+        assert await store.get("2") is None
+
+    @pytest.mark.asyncio
+    async def test_acquire_is_exclusive(self):
+        store = RedisResponseStore(
+            client=FakeAsyncRedis(server=FakeServer()), wait_seconds=0.05
+        )
+
+        token = await store.acquire("1")
+        assert token is not None
+        assert await store.acquire("1") is None
+        # holder never stores a response
+        assert await store.wait("1") is None
+        await store.release("1", token)
+        assert await store.acquire("1") is not None
+
+    @pytest.mark.asyncio
+    async def test_release_after_expiry_keeps_new_holder(self):
+        store = RedisResponseStore(client=FakeAsyncRedis(server=FakeServer()))
+        token = await store.acquire("1")
+        # marker expired while the first holder was still running, another node took it
+        await store.client.delete(store.lock_key("1"))
+        assert await store.acquire("1") is not None
+
+        await store.release("1", token)
+        assert await store.acquire("1") is None
@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from apps.transactions.models import Transaction
+from common.repository.base import decode_keyset_cursor, encode_keyset_cursor
+
+columns = Transaction.__table__.c
+
+
+class TestKeysetCursor:
+    def test_round_trip(self):
+        values = [Decimal("12.5000"), datetime(2025, 1, 1, 12), uuid.uuid4()]
+        keys = [columns.transaction_amount, columns.entry_date, columns.transaction_id]
+
+        assert decode_keyset_cursor(encode_keyset_cursor(values), keys) == values
+
+    @pytest.mark.parametrize(
+        "cursor, column",
+        [
+            ('["abc"]', columns.transaction_amount),
+            ('[["A", "B"]]', columns.account_number),
+            ('[{"a": 1}]', columns.account_number),
+            ('["2025-13-01"]', columns.entry_date),
+            ("not json", columns.account_number),
+        ],
+    )
+    def test_invalid_cursor(self, cursor, column):
+        with pytest.raises(HTTPException) as e:
+            decode_keyset_cursor(cursor, [column])
+        assert e.value.status_code == 400
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.payments.models import IdempotencyKey
+from apps.payments.repositories import IdempotencyKeyRepo
+from common.repository.routing import RoutingSession
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    primary, replica = (
+        create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path}/{name}.db", poolclass=NullPool
+        )
+        for name in ("primary", "replica")
+    )
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    yield primary, replica
+
+    await primary.dispose()
+    await replica.dispose()
+
+
+class TestRoutingSession:
+    @pytest.mark.asyncio
+    async def test_reads_go_to_replica_until_a_write(self, engines):
+        primary, replica = engines
+        # the replica lags: it only has "old"
+        async with AsyncSession(replica) as session:
+            session.add(
+                IdempotencyKey(
+                    key="old", request_data="request", response_data="response"
+                )
+            )
+            await session.commit()
+
+        session_factory = sessionmaker(
+            primary,
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            expire_on_commit=False,
+            info={"replicas": [replica.sync_engine]},
+        )
+        async with session_factory() as session:
+            repo = IdempotencyKeyRepo(session=session)
+            assert await repo.get(id="old") is not None
+            assert await repo.get_count() == 1
+
+            await repo.create(
+                obj_in=IdempotencyKey(
+                    key="new", request_data="request", response_data="response"
+                )
+            )
+            # read-your-writes: the primary answers from now on
+            assert await repo.get(id="new") is not None
+            assert await repo.get(id="old") is None
+            assert await repo.get_count() == 1
+
+        # a new session (request) reads from the replica again
+        async with session_factory() as session:
+            repo = IdempotencyKeyRepo(session=session)
+            assert await repo.get(id="new") is None
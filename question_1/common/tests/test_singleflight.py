@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from common.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_run(self):
+        flight: SingleFlight[int] = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return 1
+
+        results = await asyncio.gather(*(flight.do("a", fn) for _ in range(3)))
+
+        assert results == [(True, 1), (False, 1), (False, 1)]
+        assert len(calls) == 1
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        flight: SingleFlight[str] = SingleFlight()
+        started = asyncio.Event()
+
+        async def fn(name: str) -> str:
+            started.set()
+            await asyncio.sleep(0.01)
+            return name
+
+        leader = asyncio.create_task(flight.do("a", lambda: fn("leader")))
+        await started.wait()
+        followers = [
+            asyncio.create_task(flight.do("a", lambda i=i: fn(f"follower {i}")))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # one follower is elected, the others get its result
+        results = await asyncio.gather(*followers)
+        assert results == [
+            (True, "follower 0"),
+            (False, "follower 0"),
+            (False, "follower 0"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_follower_is_cancelled(self):
+        flight: SingleFlight[int] = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            return 1
+
+        leader = asyncio.create_task(flight.do("a", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("a", fn))
+        await asyncio.sleep(0)
+        follower.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert await leader == (True, 1)
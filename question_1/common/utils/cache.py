@@ -0,0 +1,93 @@
+"""
+Small in-process caches, shared by repositories
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+ValueType = TypeVar("ValueType")
+
+
+class TTLCache(Generic[ValueType]):
+    """
+    Bounded LRU cache where every entry carries its own time-to-live.
+
+    * `maxsize`: max number of entries, least recently used is evicted first
+    * `ttl`: default (and max) lifetime of an entry, in seconds
+    * `on_hit` / `on_miss`: called on each counted lookup, e.g. a metrics `Counter.inc`
+
+    Not shared between processes, each worker keeps its own copy.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_hit: Callable[[], Any] | None = None,
+        on_miss: Callable[[], Any] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_hit = on_hit
+        self.on_miss = on_miss
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, ValueType]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[ValueType]:
+        entry = self._data.get(key)
+        if entry is not None:
+            deadline, value = entry
+            if deadline > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                    if self.on_hit is not None:
+                        self.on_hit()
+                return value
+
+            # stale, drop it so it does not take a slot
+            del self._data[key]
+
+        if count:
+            self.misses += 1
+            if self.on_miss is not None:
+                self.on_miss()
+        return None
+
+    def set(self, key: Hashable, value: ValueType, ttl: float | None = None) -> None:
+        """
+        `ttl` is capped by the cache-wide ttl, non positive ttl means do not cache
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
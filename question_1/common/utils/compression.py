@@ -0,0 +1,90 @@
+"""
+Optional compression of stored text, see CompressedText
+"""
+
+import logging
+import zlib
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# compressed values start with a NUL byte, plain (and legacy, uncompressed) values have
+# no header. Text may start with NUL too ("\u0000" in json): stored as is, it gets
+# RAW_HEADER in front so it is never read as compressed
+ZLIB_HEADER = b"\x00z"
+ZSTD_HEADER = b"\x00s"
+RAW_HEADER = b"\x00r"
+
+
+def compress(data: bytes, algorithm: str | None, min_size: int = 0) -> bytes:
+    """
+    `algorithm`: "zlib", "zstd" or None (store as is).
+    Data under `min_size` bytes, or that does not shrink, is stored as is
+    """
+    if algorithm is None or len(data) < min_size:
+        return store_raw(data)
+
+    if algorithm == "zstd":
+        compressed = ZSTD_HEADER + zstandard.ZstdCompressor().compress(data)
+    elif algorithm == "zlib":
+        compressed = ZLIB_HEADER + zlib.compress(data)
+    else:
+        raise ValueError(f"Unknown compression: {algorithm}")
+
+    return compressed if len(compressed) < len(data) else store_raw(data)
+
+
+def store_raw(data: bytes) -> bytes:
+    return RAW_HEADER + data if data.startswith(b"\x00") else data
+
+
+def decompress(data: bytes) -> bytes:
+    if data.startswith(RAW_HEADER):
+        return data[len(RAW_HEADER) :]
+    if data.startswith(ZLIB_HEADER):
+        return zlib.decompress(data[len(ZLIB_HEADER) :])
+    if data.startswith(ZSTD_HEADER):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd compressed values")
+        return zstandard.ZstdDecompressor().decompress(data[len(ZSTD_HEADER) :])
+    return data
+
+
+class CompressedText(TypeDecorator):
+    """
+    `str` in python, binary in the db, compressed when at least `min_size` bytes.
+    Falls back to zlib when zstd is asked for but `zstandard` is not installed
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, algorithm: str | None = "zlib", min_size: int = 512):
+        super().__init__()
+        if algorithm == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, using zlib compression")
+            algorithm = "zlib"
+        self.algorithm = algorithm
+        self.min_size = min_size
+
+    @property
+    def python_type(self) -> type:
+        return str
+
+    def process_bind_param(self, value: str | None, dialect) -> bytes | None:
+        if value is None:
+            return None
+        return compress(value.encode(), self.algorithm, self.min_size)
+
+    def process_result_value(self, value: bytes | str | None, dialect) -> str | None:
+        if value is None or isinstance(value, str):
+            # sqlite keeps rows written before the column became binary as text
+            return value
+        return decompress(bytes(value)).decode()
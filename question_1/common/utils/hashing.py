@@ -0,0 +1,10 @@
+import hashlib
+
+
+def fingerprint(data: str | bytes) -> str:
+    """
+    sha256 hex digest, to compare payloads without storing / reading them whole
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,47 @@
+"""
+"In progress" markers in redis, shared between nodes
+"""
+
+import secrets
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # redis is only imported when a redis store is used
+    from redis.asyncio import Redis
+
+# delete only if the marker still holds our token: once the marker expired and another
+# node took it, a late release must not free that node's marker
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """
+    `SET key token NX PX ttl`, a random token per holder
+    """
+
+    def __init__(self, client: "Redis", ttl_ms: int):
+        self.client = client
+        self.ttl_ms = ttl_ms
+        self.release_script = client.register_script(RELEASE_SCRIPT)
+
+    async def acquire(self, key: str) -> str | None:
+        """
+        Returns the token to release with, None if someone else holds the marker
+        """
+        token = secrets.token_hex(16)
+        acquired = await self.client.set(key, token, nx=True, px=self.ttl_ms)
+        return token if acquired else None
+
+    async def release(self, key: str, token: str) -> bool:
+        """
+        False if the marker was not ours anymore (expired)
+        """
+        return bool(await self.release_script(keys=[key], args=[token]))
+
+    async def is_locked(self, key: str) -> bool:
+        return bool(await self.client.exists(key))
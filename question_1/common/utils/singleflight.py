@@ -0,0 +1,59 @@
+"""
+Coalesce concurrent calls that share a key, inside one worker process
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Tuple, TypeVar
+
+ResultType = TypeVar("ResultType")
+
+
+class SingleFlight(Generic[ResultType]):
+    """
+    The first caller for a key runs `fn`, every concurrent caller with the same key
+    awaits that same run and gets its result (or its exception).
+
+    Once the run finishes the key is forgotten, the next call runs `fn` again.
+    If the leader is cancelled, a follower takes over with its own `fn`.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[ResultType]]
+    ) -> Tuple[bool, ResultType]:
+        """
+        Returns is_leader, result
+        """
+        while (future := self._in_flight.get(key)) is not None:
+            try:
+                # shield: a cancelled follower must not cancel the leader's work
+                return False, await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # the leader was cancelled, not this caller: the first follower to wake
+                # up runs its own `fn`, the others wait for it
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting, avoid "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return True, result
+        finally:
+            self._in_flight.pop(key, None)
@@ -1,35 +1,158 @@
-from typing import AsyncGenerator
+import os
+from typing import Any, AsyncGenerator
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from config.settings import ModeEnum, get_settings
+from common.repository.routing import RoutingSession
+from config.settings import DatabaseBackendEnum, ModeEnum, Settings, get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    url=str(settings.ASYNC_SQLITE_URI),
-    echo=settings.DEBUG,
-)
 
-async_engine = create_async_engine(
-    url=str(settings.ASYNC_SQLITE_URI),
-    echo=settings.DEBUG,
-    poolclass=(
-        NullPool if settings.MODE == ModeEnum.testing else AsyncAdaptedQueuePool
-    ),  # Asincio pytest works with NullPool
-)
+def get_pool_options(settings: Settings) -> dict[str, Any]:
+    if settings.MODE == ModeEnum.testing:
+        # Asincio pytest works with NullPool
+        return {"poolclass": NullPool}
 
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS:
+        # every worker has its own pool, together they stay under the budget
+        per_worker = max(
+            1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY)
+        )
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session: AsyncSession = sessionmaker(
-        async_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_connect_args(settings: Settings) -> dict[str, Any]:
+    if settings.DATABASE_BACKEND == DatabaseBackendEnum.postgres:
+        # reuse server side prepared statements for the repeated repository queries
+        return {"prepared_statement_cache_size": settings.ASYNCPG_STATEMENT_CACHE_SIZE}
+    return {}
+
+
+def set_sqlite_pragmas(engine: Engine, settings: Settings) -> None:
+    """
+    WAL lets readers run alongside the (single) writer,
+    busy_timeout makes concurrent writers wait instead of failing with "database is locked"
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+
+_async_engine: AsyncEngine | None = None
+_replica_engines: list[AsyncEngine] | None = None
+_async_session_factory: sessionmaker | None = None
+
+
+def create_engine_for(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url,
+        echo=settings.DEBUG,
+        connect_args=get_connect_args(settings),
+        **get_pool_options(settings),
     )
+    set_sqlite_pragmas(engine.sync_engine, settings)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Created on first use (normally the app lifespan), not at import:
+    importing the app stays cheap and a forked worker never inherits a pool
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_engine_for(settings.async_database_uri)
+    return _async_engine
+
+
+def get_replica_engines() -> list[AsyncEngine]:
+    """
+    One engine (and pool) per `REPLICA_DATABASE_URIS`
+    """
+    global _replica_engines
+    if _replica_engines is None:
+        _replica_engines = [
+            create_engine_for(url) for url in settings.REPLICA_DATABASE_URIS
+        ]
+    return _replica_engines
 
-    async with async_session() as session:
+
+def get_session_factory() -> sessionmaker:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # built once, a session is cheap to open from it
+        _async_session_factory = sessionmaker(
+            get_async_engine(),
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            expire_on_commit=False,
+            info={"replicas": [engine.sync_engine for engine in get_replica_engines()]},
+        )
+    return _async_session_factory
+
+
+def async_session_factory() -> AsyncSession:
+    return get_session_factory()()
+
+
+def init_db() -> AsyncEngine:
+    get_replica_engines()
+    return get_async_engine()
+
+
+async def dispose_db() -> None:
+    """
+    Close the pool, the next `get_async_engine()` starts a new engine
+    """
+    global _async_engine, _replica_engines, _async_session_factory
+    for engine in [_async_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            await engine.dispose()
+    _async_engine = None
+    _replica_engines = None
+    _async_session_factory = None
+
+
+def reset_after_fork() -> None:
+    """
+    A forked child (gunicorn / uvicorn with preload) must not reuse the parent's
+    connections: drop them without closing (they belong to the parent)
+    and let the child build its own engine
+    """
+    global _async_engine, _replica_engines, _async_session_factory
+    for engine in [_async_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            engine.sync_engine.dispose(close=False)
+    _async_engine = None
+    _replica_engines = None
+    _async_session_factory = None
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_factory() as session:
         yield session
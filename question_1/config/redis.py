@@ -0,0 +1,23 @@
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from config.settings import get_settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> "Redis":
+    """
+    One client (and connection pool) per process, redis is imported on first use
+    """
+    from redis.asyncio import Redis
+
+    settings = get_settings()
+    return Redis.from_url(settings.REDIS_URI)
+
+
+# the client's connections belong to the parent process
+os.register_at_fork(after_in_child=get_redis.cache_clear)
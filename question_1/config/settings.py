@@ -6,7 +6,6 @@ from typing import Any, List, Optional
 from pydantic import Field, PostgresDsn, field_validator
 from pydantic_core.core_schema import ValidationInfo
 from pydantic_settings import BaseSettings, SettingsConfigDict
-import test
 
 
 class ModeEnum(str, Enum):
@@ -17,6 +16,38 @@ class ModeEnum(str, Enum):
     prod = "prod"
 
 
+class DatabaseBackendEnum(str, Enum):
+    sqlite = "sqlite"
+    postgres = "postgres"
+
+
+class IdempotencyStoreEnum(str, Enum):
+    database = "database"
+    redis = "redis"
+
+
+class IdempotencyStorageModeEnum(str, Enum):
+    table = "table"
+    partitioned = "partitioned"
+
+
+class IdempotencyCompressionEnum(str, Enum):
+    none = "none"
+    zlib = "zlib"
+    zstd = "zstd"  # needs `zstandard` (poetry install -E zstd), zlib otherwise
+
+
+class PaymentProcessorModeEnum(str, Enum):
+    async_ = "async"
+    thread = "thread"
+    process = "process"
+
+
+class TransferHotAccountModeEnum(str, Enum):
+    locked = "locked"
+    batched = "batched"
+
+
 class Settings(BaseSettings):
     """
     Application settings pulled from environment variables or a .env file.
@@ -29,8 +60,31 @@ class Settings(BaseSettings):
     MODE: ModeEnum = ModeEnum.dev
 
     # database
+    DATABASE_BACKEND: DatabaseBackendEnum = DatabaseBackendEnum.sqlite
     ASYNC_SQLITE_URI: Optional[str] = ""
 
+    # asyncpg caches prepared statements per connection
+    ASYNCPG_STATEMENT_CACHE_SIZE: int = 500
+
+    # connection pool (not used in testing mode, see config/db.py)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # connections the database allows this service in total, split between the workers.
+    # caps DB_POOL_SIZE + DB_MAX_OVERFLOW of each worker when set
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # sqlite only, how long a writer waits for the lock
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # postgres db
+    DATABASE_USER: Optional[str] = None
+    DATABASE_PASSWORD: Optional[str] = None
+    DATABASE_HOST: Optional[str] = None
+    DATABASE_PORT: Optional[int] = None
+    DATABASE_NAME: Optional[str] = None
+
     # test db
     TEST_DATABASE_USER: Optional[str] = None
     TEST_DATABASE_PASSWORD: Optional[str] = None
@@ -41,9 +95,52 @@ class Settings(BaseSettings):
     DATABASE_URI: PostgresDsn | str = ""
     ASYNC_DATABASE_URI: PostgresDsn | str = ""
 
+    # read replicas (async urls, e.g. "postgresql+asyncpg://..." or "sqlite+aiosqlite:///./replica.db"),
+    # reads marked by the repositories go to one of them, empty: everything on the primary
+    REPLICA_DATABASE_URIS: List[str] = Field(default_factory=list)
+
     # redis
     REDIS_URI: Optional[str] = None
 
+    # where replays / in-flight markers are shared: "database" (no extra layer) or "redis"
+    IDEMPOTENCY_STORE: IdempotencyStoreEnum = IdempotencyStoreEnum.database
+
+    # "table": one table, expired rows deleted by the sweeper.
+    # "partitioned": one partition per creation window, expired windows dropped whole
+    IDEMPOTENCY_STORAGE_MODE: IdempotencyStorageModeEnum = (
+        IdempotencyStorageModeEnum.table
+    )
+
+    # stored request / response bodies from IDEMPOTENCY_COMPRESSION_MIN_BYTES up,
+    # read back whatever the setting was when they were written
+    IDEMPOTENCY_COMPRESSION: IdempotencyCompressionEnum = IdempotencyCompressionEnum.zlib
+    IDEMPOTENCY_COMPRESSION_MIN_BYTES: int = 512
+
+    # background deletion of expired idempotency keys
+    IDEMPOTENCY_SWEEP_ENABLED: bool = True
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: float = 60
+    IDEMPOTENCY_SWEEP_BATCH_SIZE: int = 1000
+
+    # where payment work runs: "async" (event loop), "thread" or "process" pool
+    PAYMENT_PROCESSOR_MODE: PaymentProcessorModeEnum = PaymentProcessorModeEnum.thread
+    PAYMENT_PROCESSOR_WORKERS: int = 4
+    # more queued / running calls are rejected with 503
+    PAYMENT_PROCESSOR_MAX_PENDING: int = 1000
+    # 504 past this
+    PAYMENT_PROCESSOR_TIMEOUT_SECONDS: float = 5
+
+    # transfers touching a hot account (`Account.is_hot`): "locked" (row locks per transfer)
+    # or "batched" (queued per worker, applied in micro-batches under one lock)
+    TRANSFER_HOT_ACCOUNT_MODE: TransferHotAccountModeEnum = (
+        TransferHotAccountModeEnum.batched
+    )
+
+    # server processes (`scripts/serve.py`), each has its own engine / pool / caches
+    WEB_CONCURRENCY: int = 1
+
+    # prometheus `/metrics`, request / query timings
+    METRICS_ENABLED: bool = True
+
     # Add more custom settings as needed
     # e.g. rate_limit_per_minute: int = 30
 
@@ -54,11 +151,48 @@ class Settings(BaseSettings):
         if v == "":
             if mode == ModeEnum.testing:
                 return "sqlite+aiosqlite:///./unittest.db"
-            
+
             return "sqlite+aiosqlite:///./test.db"
 
         return v
 
+    @field_validator("DATABASE_URI", "ASYNC_DATABASE_URI", mode="after")
+    def assemble_postgres_db(cls, v: PostgresDsn | str, info: ValidationInfo) -> Any:
+        # built from DATABASE_* (or TEST_DATABASE_* for unittest) when not given as a whole
+        if v != "":
+            return str(v)
+
+        prefix = (
+            "TEST_DATABASE" if info.data.get("MODE") == ModeEnum.testing else "DATABASE"
+        )
+        if not info.data.get(f"{prefix}_HOST"):
+            return v
+
+        scheme = (
+            "postgresql+asyncpg"
+            if info.field_name == "ASYNC_DATABASE_URI"
+            else "postgresql"
+        )
+        return str(
+            PostgresDsn.build(
+                scheme=scheme,
+                username=info.data.get(f"{prefix}_USER"),
+                password=info.data.get(f"{prefix}_PASSWORD"),
+                host=info.data.get(f"{prefix}_HOST"),
+                port=info.data.get(f"{prefix}_PORT"),
+                path=info.data.get(f"{prefix}_NAME"),
+            )
+        )
+
+    @property
+    def async_database_uri(self) -> str:
+        """
+        Url the app connects to, depends on `DATABASE_BACKEND`
+        """
+        if self.DATABASE_BACKEND == DatabaseBackendEnum.postgres:
+            return str(self.ASYNC_DATABASE_URI)
+        return str(self.ASYNC_SQLITE_URI)
+
     model_config = SettingsConfigDict(
         # `.env.prod` takes priority over `.env`
         env_file=(".env", ".env.prod"),
@@ -1,11 +1,15 @@
 # conftest.py
 import pytest
-from sqlalchemy import NullPool
+from sqlalchemy import NullPool, text
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from apps.accounts.repositories import hot_account_cache
+from apps.payments.models.partitioned import WINDOW_TABLE_PREFIX
+from apps.payments.repositories import idempotency_cache, known_partitions
+from common.repository.base import count_cache
 from config.settings import get_settings
 
 settings = get_settings()
@@ -14,7 +18,7 @@ settings = get_settings()
 @pytest.fixture(scope="session")
 async def async_db_engine():
     async_engine = create_async_engine(
-        url=str(settings.ASYNC_SQLITE_URI),
+        url=settings.async_database_uri,
         echo=False,
         poolclass=NullPool,  # Asincio pytest works with NullPool
     )
@@ -44,3 +48,20 @@ async def truncate_tables(async_db_engine):
     async with async_db_engine.begin() as conn:
         for table in reversed(SQLModel.metadata.sorted_tables):
             await conn.execute(table.delete())
+        # sqlite window tables of IDEMPOTENCY_STORAGE_MODE=partitioned, made at runtime
+        if conn.dialect.name == "sqlite":
+            result = await conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix"),
+                {"prefix": f"{WINDOW_TABLE_PREFIX}%"},
+            )
+            for (name,) in result.all():
+                await conn.execute(text(f'DROP TABLE "{name}"'))
+    known_partitions.clear()
+
+
+# in-process caches outlive a test, reset them with the tables
+@pytest.fixture(autouse=True)
+def clear_caches():
+    idempotency_cache.clear()
+    hot_account_cache.clear()
+    count_cache.clear()
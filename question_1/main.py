@@ -1,12 +1,72 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
+from sqlalchemy import Engine
 
-from config.settings import get_settings
+from apps.accounts.services.transfer_service import get_transfer_batcher
+from apps.payments.constants import (
+    IDEMPOTENCY_CACHE_MAX_SIZE,
+    IDEMPOTENCY_EXPIRY_SECONDS,
+)
+from apps.payments.processors import get_payment_processor
+from apps.payments.services.sweeper import IdempotencyKeySweeper
+from common.idempotency import (
+    IdempotencyMiddleware,
+    MemoryResponseStore,
+    RedisResponseStore,
+    ResponseStore,
+)
+from config.db import async_session_factory, dispose_db, init_db
+from config.metrics import PrometheusMiddleware, instrument_engine, mark_worker_dead
+from config.metrics import router as metrics_router
+from config.redis import get_redis
+from config.settings import IdempotencyStoreEnum, get_settings
 from config.urls import router as root_router
 
 settings = get_settings()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # per worker: engine, pool, processor and sweeper are created here, after any fork
+    init_db()
+    processor = get_payment_processor()
+
+    sweeper = None
+    if settings.IDEMPOTENCY_SWEEP_ENABLED:
+        sweeper = IdempotencyKeySweeper(
+            session_factory=async_session_factory,
+            interval=settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS,
+            batch_size=settings.IDEMPOTENCY_SWEEP_BATCH_SIZE,
+        )
+        sweeper.start()
+    app.state.idempotency_sweeper = sweeper
+
+    yield
+
+    if sweeper is not None:
+        await sweeper.stop()
+    # queued transfers of hot accounts are applied before the pool goes,
+    # if a hot account transfer made this worker create the batcher at all
+    if get_transfer_batcher.cache_info().currsize:
+        await get_transfer_batcher().close()
+        get_transfer_batcher.cache_clear()
+    await processor.close()
+    # a next lifespan (tests) starts a new one
+    get_payment_processor.cache_clear()
+    await dispose_db()
+    mark_worker_dead()
+
+
+def get_response_store() -> ResponseStore:
+    if settings.IDEMPOTENCY_STORE == IdempotencyStoreEnum.redis:
+        return RedisResponseStore(client=get_redis())
+    return MemoryResponseStore(
+        maxsize=IDEMPOTENCY_CACHE_MAX_SIZE, ttl=IDEMPOTENCY_EXPIRY_SECONDS
+    )
+
+
 def create_app() -> FastAPI:
     is_prod = settings.MODE == "prod"
 
@@ -17,10 +77,25 @@ def create_app() -> FastAPI:
         docs_url=None if is_prod else "/docs",
         redoc_url=None if is_prod else "/redoc",
         openapi_url=None if is_prod else "/openapi.json",
+        lifespan=lifespan,
     )
 
     app.include_router(root_router)
 
+    # `Idempotency-Key` header on routes with `openapi_extra=IDEMPOTENT_ROUTE`
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=get_response_store(),
+        ttl_seconds=IDEMPOTENCY_EXPIRY_SECONDS,
+    )
+
+    # outermost, times replays answered by the idempotency middleware too
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router)
+        app.add_middleware(PrometheusMiddleware)
+        # every engine, including the ones created later (lazily, per worker)
+        instrument_engine(Engine)
+
     # add pagination
     add_pagination(app)
 
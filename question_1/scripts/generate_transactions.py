@@ -0,0 +1,94 @@
+"""
+Synthetic account history in `transactions`
+
+Examples:
+>>> poetry run generate_transactions --accounts ACC-1 --transactions 1000000
+>>> python -m scripts.generate_transactions --accounts ACC-1,ACC-2 --transactions 5000 --seed 7
+
+Entry dates go back in time from now, some rows share an entry date
+(postings of one batch) so the `transaction_id` tie breaker is exercised.
+Rows are written with `CRUDBase.bulk_create`, one chunk at a time
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterator
+
+from apps.transactions.models import Transaction
+from apps.transactions.repositories import TransactionRepo
+from config.db import async_session_factory, dispose_db
+
+TRANSACTION_TYPES = ("credit", "debit", "fee", "interest", "transfer")
+
+
+def make_transactions(
+    account_number: str, count: int, rng: random.Random, until: datetime | None = None
+) -> Iterator[Transaction]:
+    entry_date = until or datetime.now()
+    for _ in range(count):
+        # one in ten shares the entry date of the previous one
+        if rng.random() > 0.1:
+            entry_date -= timedelta(seconds=rng.randint(1, 600))
+        yield Transaction(
+            transaction_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            account_number=account_number,
+            transaction_amount=Decimal(rng.randint(-500_000, 500_000)) / 100,
+            transaction_type=rng.choice(TRANSACTION_TYPES),
+            booking_date=entry_date.date(),
+            entry_date=entry_date,
+        )
+
+
+async def generate(
+    account_numbers: list[str], transactions: int, chunk_size: int = 10_000, seed: int = 0
+) -> int:
+    """
+    Returns number of inserted rows
+    """
+    rng = random.Random(seed)
+    inserted = 0
+    async with async_session_factory() as session:
+        repo = TransactionRepo(session=session)
+        for account_number in account_numbers:
+            rows = make_transactions(account_number, transactions, rng)
+            while chunk := [row for _, row in zip(range(chunk_size), rows)]:
+                await repo.bulk_create(
+                    objs_in=chunk, chunk_size=chunk_size, return_objects=False
+                )
+                inserted += len(chunk)
+    return inserted
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Synthetic account history")
+    parser.add_argument(
+        "--accounts", required=True, help="comma separated account numbers"
+    )
+    parser.add_argument("--transactions", type=int, default=1000, help="per account")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    async def run() -> int:
+        try:
+            return await generate(
+                [number.strip() for number in args.accounts.split(",") if number.strip()],
+                args.transactions,
+                chunk_size=args.chunk_size,
+                seed=args.seed,
+            )
+        finally:
+            await dispose_db()
+
+    started = time.perf_counter()
+    inserted = asyncio.run(run())
+    print(f"inserted {inserted} transactions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
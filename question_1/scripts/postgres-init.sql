@@ -0,0 +1,2 @@
+-- separate database for unittest, like unittest.db for sqlite
+CREATE DATABASE tymex_test;
@@ -0,0 +1,151 @@
+"""
+Where the start of a worker goes: slowest imports and startup phases of `main`
+
+Examples:
+>>> poetry run profile_startup
+>>> python -m scripts.profile_startup --top 30 --budget-ms 1500   # exit 1 over budget
+>>> python -m scripts.profile_startup --json > startup.json
+
+Every measure runs in a fresh interpreter, nothing is imported yet
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PHASES_CODE = """
+import asyncio, json, time
+
+timings = {}
+started = time.perf_counter()
+
+t = time.perf_counter()
+import config.settings
+timings["import settings"] = time.perf_counter() - t
+
+t = time.perf_counter()
+import main
+timings["import main (incl. create_app)"] = time.perf_counter() - t
+
+t = time.perf_counter()
+app = main.create_app()
+timings["create_app (warm)"] = time.perf_counter() - t
+
+
+async def lifespan():
+    from sqlalchemy import text
+
+    from config.db import async_session_factory
+
+    context = app.router.lifespan_context(app)
+    t = time.perf_counter()
+    await context.__aenter__()
+    timings["lifespan startup"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    async with async_session_factory() as session:
+        await session.exec(text("SELECT 1"))
+    timings["first db query"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    await context.__aexit__(None, None, None)
+    timings["lifespan shutdown"] = time.perf_counter() - t
+
+
+asyncio.run(lifespan())
+timings["total"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def child_env() -> dict[str, str]:
+    env = os.environ.copy()
+    # a background sweep would only add noise
+    env.setdefault("IDEMPOTENCY_SWEEP_ENABLED", "false")
+    return env
+
+
+def profile_imports(top: int) -> list[dict]:
+    """
+    `python -X importtime`, slowest modules by cumulative time
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+        env=child_env(),
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+
+def profile_phases() -> dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", PHASES_CODE],
+        capture_output=True,
+        text=True,
+        env=child_env(),
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return {phase: seconds * 1000 for phase, seconds in timings.items()}
+
+
+def report(imports: list[dict], phases: dict[str, float]) -> list[str]:
+    lines = ["startup phases (ms)"]
+    lines += [f"{phase:>32} {ms:>10.1f}" for phase, ms in phases.items()]
+    lines += ["", "slowest imports (ms)", f"{'cumulative':>10} {'self':>10}  module"]
+    lines += [
+        f"{module['cumulative_ms']:>10.1f} {module['self_ms']:>10.1f}  "
+        f"{'  ' * module['depth']}{module['module']}"
+        for module in imports
+    ]
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Import time and startup phases of main")
+    parser.add_argument("--top", type=int, default=20, help="slowest imports to show")
+    parser.add_argument(
+        "--budget-ms", type=float, default=None, help="fail when the total startup is slower"
+    )
+    parser.add_argument("--json", action="store_true", help="machine readable output")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    imports = profile_imports(args.top)
+    phases = profile_phases()
+
+    if args.json:
+        print(json.dumps({"phases_ms": phases, "imports": imports}, indent=2))
+    else:
+        print("\n".join(report(imports, phases)))
+        print(f"\nprofiled in {time.perf_counter() - started:.1f}s")
+
+    if args.budget_ms is not None and phases["total"] > args.budget_ms:
+        print(
+            f"startup took {phases['total']:.1f}ms, over the {args.budget_ms}ms budget",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Opening balances for accounts, the only way money enters the ledger
+(`POST /accounts` always opens at 0). Operators only, not exposed over HTTP.
+
+Examples:
+>>> poetry run seed_accounts --accounts ACC-1,ACC-2 --balance 100000
+>>> python -m scripts.seed_accounts --accounts CORP-1 --balance 50000000 --hot
+
+Accounts that already exist are left untouched, so running it twice does not fund twice.
+"""
+
+import argparse
+import asyncio
+
+from sqlmodel import select
+
+from apps.accounts.models import Account
+from config.db import async_session_factory, dispose_db
+
+
+async def seed_accounts(
+    account_numbers: list[str], balance: int, is_hot: bool = False
+) -> list[str]:
+    """
+    `balance` in minor units (cents).
+    Returns the created account numbers
+    """
+    async with async_session_factory() as session:
+        response = await session.exec(
+            select(Account.account_number).where(
+                Account.account_number.in_(account_numbers)
+            )
+        )
+        existing = set(response.all())
+        created = [number for number in account_numbers if number not in existing]
+        session.add_all(
+            Account(account_number=number, balance=balance, is_hot=is_hot)
+            for number in created
+        )
+        await session.commit()
+    return created
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Create funded accounts")
+    parser.add_argument(
+        "--accounts", required=True, help="comma separated account numbers"
+    )
+    parser.add_argument(
+        "--balance", type=int, required=True, help="in cents, per account"
+    )
+    parser.add_argument(
+        "--hot", action="store_true", help="see TRANSFER_HOT_ACCOUNT_MODE"
+    )
+    args = parser.parse_args(argv)
+
+    async def run() -> list[str]:
+        try:
+            return await seed_accounts(
+                [number.strip() for number in args.accounts.split(",") if number.strip()],
+                args.balance,
+                is_hot=args.hot,
+            )
+        finally:
+            await dispose_db()
+
+    created = asyncio.run(run())
+    print(f"created {len(created)} accounts: {', '.join(created)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Production server: uvicorn with one worker process per core
+
+Examples:
+>>> poetry run serve
+>>> python -m scripts.serve --workers 4 --port 8000
+
+Each worker builds its own engine, pool, caches and payment processor in the app lifespan
+(`main.lifespan`) and disposes them on shutdown, nothing is inherited from the parent.
+Pools are sized per worker: set DB_MAX_CONNECTIONS to the connections the database allows
+the whole service, every worker gets its share.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import tempfile
+
+import uvicorn
+
+from config.settings import DatabaseBackendEnum, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_metrics_dir() -> None:
+    """
+    Prometheus multiprocess mode, set before any worker imports prometheus_client
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path is None:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="tymex-prometheus-"
+        )
+        return
+
+    # samples of a previous run would be added to this one, only those files are removed
+    os.makedirs(path, exist_ok=True)
+    for sample_file in glob.glob(os.path.join(path, "*.db")):
+        os.remove(sample_file)
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(
+        description="Run the app with several worker processes"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=(
+            settings.WEB_CONCURRENCY if settings.WEB_CONCURRENCY > 1 else os.cpu_count()
+        ),
+        help="default: WEB_CONCURRENCY, or the number of cores",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # read by the workers' settings, pools are sized with it
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    if args.workers > 1 and settings.METRICS_ENABLED:
+        prepare_metrics_dir()
+    if args.workers > 1 and settings.DATABASE_BACKEND == DatabaseBackendEnum.sqlite:
+        logger.warning(
+            "%s workers share one sqlite file: writes are serialized (WAL, busy_timeout)",
+            args.workers,
+        )
+
+    # workers are spawned, not forked: no engine / pool / loop is shared with this process
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        lifespan="on",
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from main import app
+from scripts.serve import prepare_metrics_dir
+
+PAYMENTS_ROUTE = "/api/payment/v1/payments"
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    @pytest.mark.asyncio
+    async def test_metrics(self, db_session):
+        created = sample("idempotency_requests_total", outcome="created")
+        replayed = sample("idempotency_requests_total", outcome="replayed")
+        requests = sample(
+            "http_requests_total", method="POST", route=PAYMENTS_ROUTE, status="201"
+        )
+        cache_hits = sample("idempotency_cache_hits_total")
+        cache_misses = sample("idempotency_cache_misses_total")
+
+        async with AsyncClient(
+            transport=ASGITransport(app), base_url="http://test"
+        ) as ac:
+            payload = {"idempotency_id": "1", "request_data": "request_data"}
+            assert (await ac.post(PAYMENTS_ROUTE, json=payload)).status_code == 201
+            assert (await ac.post(PAYMENTS_ROUTE, json=payload)).status_code == 200
+            res = await ac.get("/metrics")
+
+        assert res.status_code == 200
+        assert "http_request_duration_seconds_bucket" in res.text
+        assert sample("idempotency_requests_total", outcome="created") == created + 1
+        assert sample("idempotency_requests_total", outcome="replayed") == replayed + 1
+        assert (
+            sample(
+                "http_requests_total", method="POST", route=PAYMENTS_ROUTE, status="201"
+            )
+            == requests + 1
+        )
+        assert sample("http_requests_in_flight", method="POST") == 0
+        # first request misses the idempotency cache, the replay hits it
+        assert sample("idempotency_cache_misses_total") == cache_misses + 1
+        assert sample("idempotency_cache_hits_total") == cache_hits + 1
+        assert sample("db_queries_total", operation="INSERT") > 0
+
+    def test_prepare_metrics_dir_only_removes_samples(self, tmp_path, monkeypatch):
+        (tmp_path / "counter_1.db").write_bytes(b"")
+        (tmp_path / "notes.txt").write_text("kept")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        prepare_metrics_dir()
+
+        assert [path.name for path in tmp_path.iterdir()] == ["notes.txt"]
@@ -4,3 +4,10 @@ from enum import Enum
 class NotificationChannel(str, Enum):
     EMAIL = "email"
     SMS = "sms"
+
+
+# async fan-out
+SEND_TIMEOUT_SECONDS = 10
+MAX_CONCURRENT_SENDS = 100
+# recipients per `send_batch` call (or per round of concurrent single sends)
+SEND_BATCH_SIZE = 1000
@@ -1,7 +1,26 @@
-from typing import List
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Tuple
 
-from notif.constants import NotificationChannel
-from notif.senders import EmailSender, NotificationSender, SMSSender
+from notif.constants import (
+    MAX_CONCURRENT_SENDS,
+    SEND_BATCH_SIZE,
+    SEND_TIMEOUT_SECONDS,
+    NotificationChannel,
+)
+from notif.senders import (
+    AsyncNotificationSender,
+    EmailSender,
+    NotificationSender,
+    SMSSender,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class UserPreference:
@@ -10,18 +29,328 @@ class UserPreference:
         self.preferred_channels = preferred_channels
 
 
+def group_by_channel(
+    users: Iterable[UserPreference], channels: Iterable[NotificationChannel]
+) -> Dict[NotificationChannel, List[str]]:
+    channel_user_ids = {channel: [] for channel in channels}
+    for user_pref in users:
+        for channel in dict.fromkeys(user_pref.preferred_channels):
+            if channel in channel_user_ids:
+                channel_user_ids[channel].append(user_pref.user_id)
+    return {
+        channel: user_ids for channel, user_ids in channel_user_ids.items() if user_ids
+    }
+
+
+def log_chunk_failed(channel: NotificationChannel, failed: List[str], total: int) -> None:
+    if failed:
+        logger.error(
+            "%s notification failed for %s of %s recipients",
+            channel.value,
+            len(failed),
+            total,
+        )
+
+
+class AsyncNotifier:
+    """
+    Sends to all preferred channels at once, a slow provider only delays its own channel.
+
+    `channel_senders` may mix async senders and blocking ones (run in `executor`, the
+    loop's default one if not given).
+    One semaphore per notifier bounds the sends in flight across all `notify` calls.
+    `timeouts` overrides `timeout` per channel.
+    """
+
+    def __init__(
+        self,
+        channel_senders: (
+            Dict[NotificationChannel, AsyncNotificationSender | NotificationSender] | None
+        ) = None,
+        timeout: float = SEND_TIMEOUT_SECONDS,
+        max_concurrency: int = MAX_CONCURRENT_SENDS,
+        batch_size: int = SEND_BATCH_SIZE,
+        timeouts: Dict[NotificationChannel, float] | None = None,
+        executor: ThreadPoolExecutor | None = None,
+    ):
+        if channel_senders is None:
+            channel_senders = {
+                NotificationChannel.EMAIL: EmailSender(),
+                NotificationChannel.SMS: SMSSender(),
+            }
+        self.channel_senders = channel_senders
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.batch_size = batch_size
+        self.executor = executor
+
+    def get_timeout(self, channel: NotificationChannel) -> float:
+        return self.timeouts.get(channel, self.timeout)
+
+    async def call(self, channel: NotificationChannel, func: Callable, **kwargs) -> None:
+        async with self.semaphore:
+            if inspect.iscoroutinefunction(func):
+                call = func(**kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self.executor, partial(func, **kwargs))
+            # a timed out thread keeps running, its result is just not waited for
+            await asyncio.wait_for(call, timeout=self.get_timeout(channel))
+
+    async def send(
+        self, channel: NotificationChannel, user_id: str, message: str
+    ) -> None:
+        sender = self.channel_senders[channel]
+        await self.call(channel, sender.send, user_id=user_id, message=message)
+
+    async def notify(
+        self, user_pref: UserPreference, message: str
+    ) -> Dict[NotificationChannel, Exception]:
+        """
+        Failed (or timed out) channels do not stop the others.
+
+        Returns the error of each failed channel
+        """
+        channels = [
+            channel
+            for channel in dict.fromkeys(user_pref.preferred_channels)
+            if channel in self.channel_senders
+        ]
+        results = await asyncio.gather(
+            *(self.send(channel, user_pref.user_id, message) for channel in channels),
+            return_exceptions=True,
+        )
+
+        errors = {}
+        for channel, result in zip(channels, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "%s notification to %s failed: %r",
+                    channel.value,
+                    user_pref.user_id,
+                    result,
+                )
+                errors[channel] = result
+            elif isinstance(result, BaseException):
+                # cancelled
+                raise result
+        return errors
+
+    async def notify_channel(
+        self, channel: NotificationChannel, user_ids: List[str], message: str
+    ) -> List[str]:
+        """
+        Chunks of `batch_size` recipients, one after another: a `send_batch` call each,
+        or concurrent single sends if the sender has no `send_batch`.
+
+        Returns ids of the failed recipients
+        """
+        send_batch = getattr(self.channel_senders[channel], "send_batch", None)
+        failed = []
+        for start in range(0, len(user_ids), self.batch_size):
+            chunk = user_ids[start : start + self.batch_size]
+            if send_batch is not None:
+                # one call, the whole chunk succeeds or fails
+                try:
+                    await self.call(channel, send_batch, user_ids=chunk, message=message)
+                    results = [None] * len(chunk)
+                except Exception as e:
+                    results = [e] * len(chunk)
+            else:
+                results = await asyncio.gather(
+                    *(self.send(channel, user_id, message) for user_id in chunk),
+                    return_exceptions=True,
+                )
+
+            chunk_failed = []
+            for user_id, result in zip(chunk, results):
+                if isinstance(result, Exception):
+                    chunk_failed.append(user_id)
+                elif isinstance(result, BaseException):
+                    raise result
+            log_chunk_failed(channel, chunk_failed, len(chunk))
+            failed += chunk_failed
+        return failed
+
+    async def notify_many(
+        self, users: Iterable[UserPreference], message: str
+    ) -> Dict[NotificationChannel, List[str]]:
+        """
+        Same message to many users, recipients grouped by channel.
+        Channels are sent concurrently.
+
+        Returns ids of the failed recipients, per channel
+        """
+        channel_user_ids = group_by_channel(users, self.channel_senders)
+        results = await asyncio.gather(
+            *(
+                self.notify_channel(channel, user_ids, message)
+                for channel, user_ids in channel_user_ids.items()
+            )
+        )
+        return {
+            channel: failed
+            for channel, failed in zip(channel_user_ids, results)
+            if failed
+        }
+
+
+def run_sender(func: Callable, **kwargs) -> None:
+    if inspect.iscoroutinefunction(func):
+        asyncio.run(func(**kwargs))
+    else:
+        func(**kwargs)
+
+
 class Notifier:
-    def __init__(self):
+    """
+    Blocking API, sends run concurrently in a thread pool owned by the notifier.
+
+    A send past its channel's timeout is reported as a `TimeoutError` and left running
+    in its thread, `notify` does not wait for it. It keeps its slot of `max_concurrency`
+    until the provider returns
+    """
+
+    def __init__(
+        self,
+        timeout: float = SEND_TIMEOUT_SECONDS,
+        max_concurrency: int = MAX_CONCURRENT_SENDS,
+        batch_size: int = SEND_BATCH_SIZE,
+        timeouts: Dict[NotificationChannel, float] | None = None,
+    ):
         self.channel_senders = {
             NotificationChannel.EMAIL: EmailSender(),
             NotificationChannel.SMS: SMSSender(),
         }
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="notifier"
+        )
+        # a free slot means a free worker, so a send starts (and its timeout with it)
+        # as soon as it is submitted
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+    def __enter__(self) -> "Notifier":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # no join, timed out sends finish in the background
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_timeout(self, channel: NotificationChannel) -> float:
+        return self.timeouts.get(channel, self.timeout)
+
+    def call_all(
+        self, calls: List[Tuple[NotificationChannel, Callable, dict]]
+    ) -> List[Exception | None]:
+        """
+        Runs `(channel, func, kwargs)` calls concurrently, waiting for each at most
+        its channel's timeout.
+
+        Returns the error (or None) of each call
+        """
+        started = []
+        for channel, func, kwargs in calls:
+            self.slots.acquire()
+            future = self.executor.submit(run_sender, func, **kwargs)
+            future.add_done_callback(lambda _: self.slots.release())
+            started.append((future, time.monotonic() + self.get_timeout(channel)))
+
+        errors = []
+        for (channel, _, _), (future, deadline) in zip(calls, started):
+            done, _ = wait([future], timeout=max(deadline - time.monotonic(), 0))
+            if done:
+                errors.append(future.exception())
+            else:
+                timeout = self.get_timeout(channel)
+                errors.append(TimeoutError(f"{channel.value} send timed out after {timeout}s"))
+        return errors
 
     def notify(self, user_pref: UserPreference, message: str) -> None:
-        for channel in user_pref.preferred_channels:
-            sender: NotificationSender = self.channel_senders.get(channel)
-            if sender:
-                sender.send(
-                    user_id=user_pref.user_id,
-                    message=message,
+        """
+        All channels are sent, then the error of the first failed one
+        (in preference order) is raised
+        """
+        channels = [
+            channel
+            for channel in dict.fromkeys(user_pref.preferred_channels)
+            if channel in self.channel_senders
+        ]
+        errors = self.call_all(
+            [
+                (
+                    channel,
+                    self.channel_senders[channel].send,
+                    {"user_id": user_pref.user_id, "message": message},
                 )
+                for channel in channels
+            ]
+        )
+
+        first_error = None
+        for channel, error in zip(channels, errors):
+            if error is not None:
+                logger.error(
+                    "%s notification to %s failed: %r",
+                    channel.value,
+                    user_pref.user_id,
+                    error,
+                )
+                first_error = first_error or error
+        if first_error is not None:
+            raise first_error
+
+    def notify_many(
+        self, users: Iterable[UserPreference], message: str
+    ) -> Dict[NotificationChannel, List[str]]:
+        """
+        Like `AsyncNotifier.notify_many`, but channels move chunk by chunk together:
+        the next round of chunks starts once the current one is done (or timed out)
+        """
+        channel_user_ids = group_by_channel(users, self.channel_senders)
+        failed = {channel: [] for channel in channel_user_ids}
+        longest = max(
+            (len(user_ids) for user_ids in channel_user_ids.values()), default=0
+        )
+        for start in range(0, longest, self.batch_size):
+            calls: List[Tuple[NotificationChannel, Callable, dict]] = []
+            recipients: List[List[str]] = []
+            for channel, user_ids in channel_user_ids.items():
+                chunk = user_ids[start : start + self.batch_size]
+                if not chunk:
+                    continue
+                sender = self.channel_senders[channel]
+                send_batch = getattr(sender, "send_batch", None)
+                if send_batch is not None:
+                    calls.append(
+                        (channel, send_batch, {"user_ids": chunk, "message": message})
+                    )
+                    recipients.append(chunk)
+                else:
+                    for user_id in chunk:
+                        calls.append(
+                            (
+                                channel,
+                                sender.send,
+                                {"user_id": user_id, "message": message},
+                            )
+                        )
+                        recipients.append([user_id])
+
+            chunk_failed = {channel: [] for channel in channel_user_ids}
+            for (channel, _, _), user_ids, error in zip(
+                calls, recipients, self.call_all(calls)
+            ):
+                if error is not None:
+                    chunk_failed[channel] += user_ids
+            for channel, user_ids in channel_user_ids.items():
+                chunk_size = len(user_ids[start : start + self.batch_size])
+                log_chunk_failed(channel, chunk_failed[channel], chunk_size)
+                failed[channel] += chunk_failed[channel]
+        return {channel: user_ids for channel, user_ids in failed.items() if user_ids}
@@ -1,5 +1,4 @@
-
-from typing import Protocol
+from typing import List, Protocol
 
 
 class NotificationSender(Protocol):
@@ -7,6 +6,23 @@ class NotificationSender(Protocol):
         ...
 
 
+class AsyncNotificationSender(Protocol):
+    async def send(self, user_id: str, message: str) -> None:
+        ...
+
+
+# `send_batch` is optional, for providers that accept many recipients in one call.
+# Senders without it get chunked concurrent single sends
+class BatchNotificationSender(NotificationSender, Protocol):
+    def send_batch(self, user_ids: List[str], message: str) -> None:
+        ...
+
+
+class AsyncBatchNotificationSender(AsyncNotificationSender, Protocol):
+    async def send_batch(self, user_ids: List[str], message: str) -> None:
+        ...
+
+
 class EmailSender:
     def send(self, user_id: str, message: str) -> None:
         """
@@ -14,6 +30,12 @@ class EmailSender:
         """
         ...
 
+    def send_batch(self, user_ids: List[str], message: str) -> None:
+        """
+        Third party implementation (e.g. SendGrid personalizations)
+        """
+        ...
+
 
 class SMSSender:
     def send(self, user_id: str, message: str) -> None:
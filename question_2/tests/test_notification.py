@@ -1,6 +1,17 @@
+import asyncio
+import logging
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
-from notif.notification import Notifier, NotificationChannel, UserPreference
+import pytest
+
+from notif.notification import (
+    AsyncNotifier,
+    NotificationChannel,
+    Notifier,
+    UserPreference,
+)
 
 
 @patch("notif.notification.SMSSender")
@@ -63,7 +74,7 @@ def test_notify_sms_only(mock_sms_sender):
 @patch("notif.notification.EmailSender")
 def test_notify_multiple_channels(mock_email_sender, mock_sms_sender):
     """
-    If there are multiple prefer channels, send to first prefered 
+    If there are multiple prefer channels, send to first prefered
     """
     mock_sms_obj = MagicMock()
     mock_email_obj = MagicMock()
@@ -88,3 +99,235 @@ def test_notify_multiple_channels(mock_email_sender, mock_sms_sender):
         user_id=user_id,
         message=message,
     )
+
+
+class SlowSender:
+    def __init__(self, delay: float, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send(self, user_id: str, message: str) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            self.sent.append((user_id, message))
+        finally:
+            self.in_flight -= 1
+
+
+def test_async_notify_channels_concurrently():
+    email, sms = SlowSender(0.2), SlowSender(0.2)
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.EMAIL: email, NotificationChannel.SMS: sms}
+    )
+    pref = UserPreference("1", [NotificationChannel.EMAIL, NotificationChannel.SMS])
+
+    start = time.perf_counter()
+    errors = asyncio.run(notifier.notify(pref, "hi"))
+
+    # latency of the slowest channel, not the sum
+    assert time.perf_counter() - start < 0.35
+    assert errors == {}
+    assert email.sent == [("1", "hi")]
+    assert sms.sent == [("1", "hi")]
+
+
+def test_async_notify_timeout_and_error_isolated():
+    email = SlowSender(1)
+    sms = SlowSender(0, error=RuntimeError("provider down"))
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.EMAIL: email, NotificationChannel.SMS: sms},
+        timeout=0.1,
+    )
+    pref = UserPreference("1", [NotificationChannel.EMAIL, NotificationChannel.SMS])
+
+    errors = asyncio.run(notifier.notify(pref, "hi"))
+
+    assert isinstance(errors[NotificationChannel.EMAIL], asyncio.TimeoutError)
+    assert isinstance(errors[NotificationChannel.SMS], RuntimeError)
+
+
+@patch("notif.notification.SMSSender")
+@patch("notif.notification.EmailSender")
+def test_notify_sync_sender_error_raised(mock_email_sender, mock_sms_sender):
+    mock_email_obj = MagicMock()
+    mock_email_obj.send.side_effect = RuntimeError("provider down")
+    mock_sms_obj = MagicMock()
+    mock_email_sender.return_value = mock_email_obj
+    mock_sms_sender.return_value = mock_sms_obj
+    pref = UserPreference("1", [NotificationChannel.EMAIL, NotificationChannel.SMS])
+
+    with pytest.raises(RuntimeError):
+        Notifier().notify(pref, "hi")
+
+    # still sent, the error is raised once all channels are done
+    mock_sms_obj.send.assert_called_once_with(user_id="1", message="hi")
+
+
+@patch("notif.notification.EmailSender")
+def test_notify_inside_running_loop(mock_email_sender):
+    mock_obj = MagicMock()
+    mock_email_sender.return_value = mock_obj
+    pref = UserPreference("1", [NotificationChannel.EMAIL])
+
+    async def handler():
+        Notifier().notify(pref, "hi")
+
+    asyncio.run(handler())
+
+    mock_obj.send.assert_called_once_with(user_id="1", message="hi")
+
+
+def test_async_notify_bounded_concurrency():
+    email = SlowSender(0.01)
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.EMAIL: email}, max_concurrency=3
+    )
+
+    async def notify_all():
+        await asyncio.gather(
+            *(
+                notifier.notify(UserPreference(str(i), [NotificationChannel.EMAIL]), "hi")
+                for i in range(10)
+            )
+        )
+
+    asyncio.run(notify_all())
+
+    assert len(email.sent) == 10
+    assert email.max_in_flight == 3
+
+
+class BatchSender(SlowSender):
+    def __init__(self, delay: float = 0, error: Exception | None = None):
+        super().__init__(delay, error)
+        self.batches = []
+
+    async def send_batch(self, user_ids: list[str], message: str) -> None:
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.batches.append(user_ids)
+
+
+def test_notify_many_batches_per_channel():
+    email, sms = BatchSender(), SlowSender(0)
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.EMAIL: email, NotificationChannel.SMS: sms},
+        batch_size=2,
+    )
+    users = [
+        UserPreference("1", [NotificationChannel.EMAIL, NotificationChannel.SMS]),
+        UserPreference("2", [NotificationChannel.EMAIL]),
+        UserPreference("3", []),
+        UserPreference("4", [NotificationChannel.EMAIL, NotificationChannel.SMS]),
+    ]
+
+    failed = asyncio.run(notifier.notify_many(users, "hi"))
+
+    assert failed == {}
+    assert email.batches == [["1", "2"], ["4"]]
+    # no send_batch, single sends
+    assert sorted(sms.sent) == [("1", "hi"), ("4", "hi")]
+
+
+def test_notify_many_returns_failed_recipients():
+    email = BatchSender(error=RuntimeError("provider down"))
+    sms = SlowSender(0, error=RuntimeError("provider down"))
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.EMAIL: email, NotificationChannel.SMS: sms},
+        batch_size=2,
+    )
+    users = [
+        UserPreference(str(i), [NotificationChannel.EMAIL, NotificationChannel.SMS])
+        for i in range(3)
+    ]
+
+    failed = asyncio.run(notifier.notify_many(users, "hi"))
+
+    assert failed == {
+        NotificationChannel.EMAIL: ["0", "1", "2"],
+        NotificationChannel.SMS: ["0", "1", "2"],
+    }
+
+
+@patch("notif.notification.SMSSender")
+@patch("notif.notification.EmailSender")
+def test_notify_many_sync(mock_email_sender, mock_sms_sender):
+    mock_email_obj = MagicMock()
+    mock_sms_obj = MagicMock(spec=["send"])
+    mock_email_sender.return_value = mock_email_obj
+    mock_sms_sender.return_value = mock_sms_obj
+    users = [
+        UserPreference(str(i), [NotificationChannel.EMAIL, NotificationChannel.SMS])
+        for i in range(3)
+    ]
+
+    Notifier(batch_size=2).notify_many(users, "hi")
+
+    assert mock_email_obj.send_batch.call_count == 2
+    mock_email_obj.send_batch.assert_called_with(user_ids=["2"], message="hi")
+    mock_email_obj.send.assert_not_called()
+    assert mock_sms_obj.send.call_count == 3
+
+
+def test_notify_many_logs_failures_per_chunk(caplog):
+    class FlakySender:
+        async def send(self, user_id: str, message: str) -> None:
+            if user_id in ("12", "15"):
+                raise RuntimeError("provider down")
+
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.SMS: FlakySender()}, batch_size=10
+    )
+    users = [UserPreference(str(i), [NotificationChannel.SMS]) for i in range(20)]
+
+    with caplog.at_level(logging.ERROR, logger="notif.notification"):
+        failed = asyncio.run(notifier.notify_many(users, "hi"))
+
+    assert failed == {NotificationChannel.SMS: ["12", "15"]}
+    assert [record.getMessage() for record in caplog.records] == [
+        "sms notification failed for 2 of 10 recipients"
+    ]
+
+
+def test_async_notify_per_channel_timeout():
+    email, sms = SlowSender(0.2), SlowSender(0.2)
+    notifier = AsyncNotifier(
+        channel_senders={NotificationChannel.EMAIL: email, NotificationChannel.SMS: sms},
+        timeout=1,
+        timeouts={NotificationChannel.SMS: 0.05},
+    )
+    pref = UserPreference("1", [NotificationChannel.EMAIL, NotificationChannel.SMS])
+
+    errors = asyncio.run(notifier.notify(pref, "hi"))
+
+    assert list(errors) == [NotificationChannel.SMS]
+    assert email.sent == [("1", "hi")]
+
+
+@patch("notif.notification.SMSSender")
+@patch("notif.notification.EmailSender")
+def test_notify_blocking_sender_timeout_does_not_wait(mock_email_sender, mock_sms_sender):
+    done = threading.Event()
+    mock_email_obj = MagicMock()
+    mock_email_obj.send.side_effect = lambda **kwargs: done.wait(2)
+    mock_sms_obj = MagicMock()
+    mock_email_sender.return_value = mock_email_obj
+    mock_sms_sender.return_value = mock_sms_obj
+    pref = UserPreference("1", [NotificationChannel.EMAIL, NotificationChannel.SMS])
+
+    with Notifier(timeouts={NotificationChannel.EMAIL: 0.1}) as notifier:
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            notifier.notify(pref, "hi")
+        # returned at the email timeout, the blocked thread is not joined
+        assert time.perf_counter() - start < 0.5
+        mock_sms_obj.send.assert_called_once_with(user_id="1", message="hi")
+    done.set()